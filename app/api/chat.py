@@ -1,12 +1,14 @@
 # app/api/chat.py
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 
 # RAG 비즈니스 로직과 데이터 로더를 임포트합니다.
 from app.business_logic import rag
 from app.utils.data_loader import get_tutorial_full_text, load_tutorial_data_to_cache
+from app.utils.sse import SSE_HEADERS, stream_chat_events
 
 # FastAPI 라우터 인스턴스를 생성합니다.
 router = APIRouter()
@@ -77,6 +79,34 @@ async def chat_with_rag(request: ChatRequest):
         )
 
 
+@router.post("/rag/stream")
+async def chat_with_rag_stream(request: ChatRequest):
+    """
+    /rag 엔드포인트의 스트리밍(SSE) 버전입니다.
+    답변 토큰을 'token' 이벤트로 바로 보내고, 마지막 'done' 이벤트에 /rag와 같은 형식({"response": ...})으로 전체 답변을 담아 보냅니다.
+    """
+    tutorial_full_text = get_tutorial_full_text(request.technique_key)
+    
+    if not tutorial_full_text:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"튜토리얼 키 '{request.technique_key}'에 해당하는 전체 텍스트를 찾을 수 없습니다."
+        )
+
+    token_stream = rag.stream_rag_response(
+        query_text=request.query,
+        technique_key=request.technique_key,
+        messages_from_client=request.messages,
+        technique_name=request.technique_name,
+        tutorial_full_text=tutorial_full_text
+    )
+    return StreamingResponse(
+        stream_chat_events(token_stream, build_payload=lambda text: ChatResponse(response=text).model_dump()), 
+        media_type="text/event-stream", 
+        headers=SSE_HEADERS
+    )
+
+
 # -----------------------------------------------------------------------------
 # 3. 초기화 로직 (FastAPI 시작 시 데이터 캐싱)
 # -----------------------------------------------------------------------------
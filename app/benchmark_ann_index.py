@@ -0,0 +1,100 @@
+# benchmark_ann_index.py
+#
+# HNSW 근사 검색의 recall@k와 지연 시간을 정확한 브루트포스 검색과 비교합니다.
+#
+# 사용 예:
+#   python -m app.benchmark_ann_index --n 5000 --dim 256 --k 10 --ef 16 32 64 128
+#   python -m app.benchmark_ann_index --from-store   # 로컬 벡터 저장소의 실제 벡터 사용
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from app.core.ann_index import HNSWIndex
+
+
+def make_clustered_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """실제 임베딩처럼 군집을 이루는 정규화된 합성 벡터를 만듭니다."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size=n)
+    vectors = centers[assignments] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_store_vectors() -> np.ndarray:
+    """LOCAL_VECTORSTORE_PATH에 저장된 벡터를 읽습니다."""
+    from app.core.settings import get_settings
+    from app.core.local_vectorstore import LocalVectorStore
+
+    settings = get_settings()
+    vectors_path = f"{settings.LOCAL_VECTORSTORE_PATH}/{LocalVectorStore.VECTORS_FILE}"
+    return np.load(vectors_path).astype(np.float32)
+
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    scores = matrix @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])].tolist()
+
+
+def run_benchmark(vectors: np.ndarray, num_queries: int, k: int, ef_values: List[int],
+                  M: int, ef_construction: int, seed: int) -> None:
+    rng = np.random.default_rng(seed + 1)
+    n, dim = vectors.shape
+    print(f"📊 벡터 {n}개, 차원 {dim}, 쿼리 {num_queries}개, k={k}, M={M}, ef_construction={ef_construction}")
+
+    # 1. 인덱스 구축
+    index = HNSWIndex(dim, M=M, ef_construction=ef_construction)
+    started = time.perf_counter()
+    for i in range(n):
+        index.add(str(i), vectors[i])
+    build_seconds = time.perf_counter() - started
+    print(f"🔨 HNSW 구축: {build_seconds:.2f}s ({build_seconds / n * 1000:.2f} ms/벡터)")
+
+    # 2. 쿼리: 데이터 근처에 흔들린 벡터를 사용합니다.
+    picks = rng.integers(0, n, size=num_queries)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    # 3. 정확한 검색 (기준값)
+    started = time.perf_counter()
+    ground_truth = [set(exact_top_k(vectors, q, k)) for q in queries]
+    exact_ms = (time.perf_counter() - started) / num_queries * 1000
+    print(f"🎯 exact (flat): {exact_ms:.3f} ms/쿼리")
+
+    # 4. ef 값별 recall@k / 지연 시간
+    print(f"{'ef':>6} | {'recall@' + str(k):>10} | {'ms/쿼리':>8}")
+    for ef in ef_values:
+        hits = 0
+        started = time.perf_counter()
+        results = [index.search(q, k, ef=ef) for q in queries]
+        ann_ms = (time.perf_counter() - started) / num_queries * 1000
+        for truth, result in zip(ground_truth, results):
+            hits += len(truth & {int(label) for label, _ in result})
+        recall = hits / (num_queries * k)
+        print(f"{ef:>6} | {recall:>10.4f} | {ann_ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HNSW recall@k / latency benchmark")
+    parser.add_argument("--n", type=int, default=5000, help="합성 벡터 수")
+    parser.add_argument("--dim", type=int, default=256, help="합성 벡터 차원")
+    parser.add_argument("--clusters", type=int, default=50, help="합성 벡터 군집 수")
+    parser.add_argument("--queries", type=int, default=200, help="쿼리 수")
+    parser.add_argument("--k", type=int, default=10, help="top-k")
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128], help="비교할 ef_search 값")
+    parser.add_argument("--M", type=int, default=16, help="HNSW M")
+    parser.add_argument("--ef-construction", type=int, default=100, help="HNSW ef_construction")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--from-store", action="store_true", help="로컬 벡터 저장소의 벡터 사용")
+    args = parser.parse_args()
+
+    if args.from_store:
+        data = load_store_vectors()
+    else:
+        data = make_clustered_vectors(args.n, args.dim, args.clusters, args.seed)
+
+    run_benchmark(data, args.queries, args.k, args.ef, args.M, args.ef_construction, args.seed)
@@ -0,0 +1,119 @@
+# app/business_logic/quiz_pregrader.py
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. 규칙 기반 특징 추출 (역할 / 상황 / 목적)
+# -----------------------------------------------------------------------------
+
+# 채점 기준(quiz.SYSTEM_PROMPT)의 세 요소를 나타내는 표현들입니다.
+ROLE_PATTERN = re.compile(
+    r"(당신|너|넌|네가|니가)\s*(은|는|이|가)?\s+[^.!?\n]*?(이다|입니다|이야|야|예요|이에요|이고|로서|으로서|역할)"
+    r"|\S+\s*(으로서|로서)\b|\S+\s*(의|이라는)\s*역할|역할\s*(을|를|은|는|:)"
+    r"|\byou\s+are\b|\bact\s+as\b|\bas\s+an?\b|\brole\b",
+    re.IGNORECASE
+)
+# "에서"/"중에"처럼 어느 문장에나 붙는 조사는 상황의 근거로 보지 않습니다. (대상을 가리키는 "에게"/"한테"는 포함)
+SITUATION_PATTERN = re.compile(
+    r"상황|앞에서|에게|한테|중이|중인|하는\s*중|준비|면접|회의|수업|고객|학생|손님|환자|독자|청중"
+    r"|\bscenario\b|\bsituation\b|\bin\s+a\b|\bto\s+(an?\s+)?\w+\s+(who|that)\b|\baudience\b",
+    re.IGNORECASE
+)
+OBJECTIVE_PATTERN = re.compile(
+    r"(하|해|주|보|써|짜|알려|작성하|설명하|정리하|요약하|제안하|추천하|분석하|만들)(라|세요|십시오|줘|주세요|봐)"
+    r"|위해|위한|목적|목표|하도록|할\s*수\s*있게"
+    r"|\b(explain|write|describe|create|summari[sz]e|help|list|suggest|give)\b",
+    re.IGNORECASE
+)
+
+def extract_features(text: str) -> Dict[str, bool]:
+    """제출된 프롬프트에서 역할/상황/목적 표현이 보이는지 확인합니다."""
+    return {
+        "role": ROLE_PATTERN.search(text) is not None,
+        "situation": SITUATION_PATTERN.search(text) is not None,
+        "objective": OBJECTIVE_PATTERN.search(text) is not None,
+    }
+
+# -----------------------------------------------------------------------------
+# 2. 1차 채점 (단순 지시문만 로컬에서 불합격 판정)
+# -----------------------------------------------------------------------------
+
+def pregrade(text: str) -> Dict[str, Any]:
+    """
+    역할도 상황도 보이지 않는 단순 지시문("인공지능의 장단점을 설명해줘.")은 채점 기준 2번에 따라 'False'로 판정합니다.
+    역할이나 상황 중 하나라도 보이면 표현이 명확한지는 LLM이 판단하도록 넘깁니다. (합격은 로컬에서 판정하지 않음)
+    로컬 판정이 맞는지는 감사(audit) 기록을 summarize_log로 집계하여 확인합니다.
+
+    Output:
+        {"features", "decision": "False" 또는 None(LLM으로 넘김)}
+    """
+    features = extract_features(text)
+    decision = "False" if not features["role"] and not features["situation"] else None
+    return {"features": features, "decision": decision}
+
+# -----------------------------------------------------------------------------
+# 3. 판정 기록 (판정 규칙 점검용 JSONL)
+# -----------------------------------------------------------------------------
+
+_log_lock = threading.Lock()
+
+def log_decision(text: str, pregrade_result: Dict[str, Any], llm_grade: Optional[str], source: str) -> None:
+    """
+    로컬 판정과 LLM 판정을 한 줄씩 JSONL로 남깁니다. (동기 파일 쓰기이므로 asyncio.to_thread로 호출)
+    source: 'local'(로컬 판정), 'llm'(LLM으로 넘김), 'audit'(로컬 판정을 LLM과 대조)
+    """
+    log_path = get_settings().QUIZ_PREGRADER_LOG_PATH
+    if not log_path:
+        return
+
+    record = {
+        "ts": time.time(),
+        "source": source,
+        "text": text,
+        **pregrade_result,
+        "llm": llm_grade,
+    }
+    Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+    with _log_lock, open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def summarize_log(log_path: str) -> List[Dict[str, Any]]:
+    """
+    판정 기록을 특징 조합(역할/상황/목적)별로 모아 LLM 판정 분포와 로컬 판정 일치율을 반환합니다.
+    LLM 판정이 거의 항상 False인 조합만 로컬 판정 대상으로 두었는지 확인하는 데 씁니다.
+    """
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            features = record.get("features", {})
+            key = tuple(bool(features.get(name)) for name in ("role", "situation", "objective"))
+            group = groups.setdefault(key, {"local": 0, "llm_true": 0, "llm_false": 0, "audited": 0, "agreed": 0})
+            if record["source"] == "local":
+                group["local"] += 1
+            elif record.get("llm") in ("True", "False"):
+                group["llm_true" if record["llm"] == "True" else "llm_false"] += 1
+                if record["source"] == "audit":
+                    group["audited"] += 1
+                    group["agreed"] += record["llm"] == record.get("decision")
+
+    return [
+        {"role": role, "situation": situation, "objective": objective, **group}
+        for (role, situation, objective), group in sorted(groups.items())
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 사용법: python -m app.business_logic.quiz_pregrader [기록 파일 경로]
+    path = sys.argv[1] if len(sys.argv) > 1 else get_settings().QUIZ_PREGRADER_LOG_PATH
+    for row in summarize_log(path):
+        print(json.dumps(row, ensure_ascii=False))
@@ -1,8 +1,12 @@
+import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 
 from app.core import llm_client, vectorstore
 from app.core.llm_client import ChatCompletionMessageParam
+from app.core.settings import get_settings
+from app.core.context_selection import select_context_chunks
+from app.core.vectorstore import VectorMatch
 
 # logging 모듈을 임포트하고 로거를 설정합니다.
 logging.basicConfig(
@@ -14,6 +18,10 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO) # INFO 레벨 이상을 출력하도록 설정
 
 
+# system 프롬프트/프롬프트 구성 방식을 바꾸면 올려서 응답 캐시를 무효화합니다.
+RAG_PROMPT_VERSION = "2"
+
+
 # -----------------------------------------------------------------------------
 # 1. 시스템 프롬프트 및 컨텍스트 포맷팅 (역할과 규칙만 정의)
 # -----------------------------------------------------------------------------
@@ -21,25 +29,30 @@ logger.setLevel(logging.INFO) # INFO 레벨 이상을 출력하도록 설정
 def get_base_system_prompt(technique_name: str) -> str:
     """
     RAG 시스템의 기본 역할과, LLM의 행동 규칙을 정의합니다.
-    튜토리얼 내용 및 검색된 지식은 'user' 메시지로 전달됩니다.
+    튜토리얼 내용 및 검색된 지식은 뒤따르는 별도 메시지로 전달됩니다. (build_rag_conversation 참고)
     """
     return f"""
     당신은 '{technique_name}' 기법을 전문적으로 가르쳐주는 친절하고 유능한 튜터 AI입니다.
     사용자는 생성형 AI를 처음 사용해 보는 초보 사용자입니다. 쉽고 재미있게, 단계별로 설명해주세요.
     
     ### [핵심 임무 및 근거 사용 규칙]
-    1. **최우선 근거:** 답변은 반드시 사용자가 마지막으로 전달하는 **[검색된 외부 지식]** 섹션을 **최우선 근거**로 삼아 생성하십시오.
+    1. **최우선 근거:** 답변은 반드시 대화 앞부분에 전달되는 **[검색된 외부 지식]** 섹션을 **최우선 근거**로 삼아 생성하십시오.
     2. **내부 지식 조건부 사용:**
         - **검색된 지식이 있다면:** 오직 검색된 외부 지식만을 사용해야 하며, 당신의 내부 학습 지식을 추가하거나 혼합하여 지어내지 마십시오.
         - **검색된 지식이 없다면:** 당신이 이미 학습한 **내부 지식**을 활용하여 답변을 생성할 수 있습니다.
     3. **주제 이탈 시:** {technique_name}에 관련 없는 질문은 **최대한 간결하게** 답변하고, "우리 {technique_name}에 대한 얘기를 해볼까요?"라고 마무리합니다.
     """
 
-def format_context_for_llm(retrieved_chunks: List[Dict[str, Any]]) -> str:
+def format_context_for_llm(retrieved_chunks: List[VectorMatch], chunk_texts: Optional[List[str]] = None) -> str:
     """
     vectorstore에서 검색된 청크들을 LLM에게 전달할 포맷으로 변환합니다.
     (이 함수는 필터링된 청크를 입력받습니다.)
+    
+    청크 원문은 chunk_texts로 받거나, 없으면 문서 저장소에서 top-k id로 한 번에 조회합니다.
     """
+    if chunk_texts is None:
+        chunk_texts = vectorstore.get_chunk_texts(retrieved_chunks)
+
     context_text = "--- [검색된 외부 지식] ---\n"
     
     if not retrieved_chunks:
@@ -47,10 +60,10 @@ def format_context_for_llm(retrieved_chunks: List[Dict[str, Any]]) -> str:
         context_text += "검색된 관련 외부 지식이 없습니다. LLM은 이 경우 내부 지식을 사용할 수 있습니다.\n"
         return context_text
         
-    for i, match in enumerate(retrieved_chunks):
+    for i, (match, chunk_text) in enumerate(zip(retrieved_chunks, chunk_texts)):
         # 문서 ID도 출력하여 근거의 출처를 명확히 합니다.
         doc_id = match.metadata.get('doc_id', '알 수 없음')
-        chunk_text = match.metadata.get('text', '텍스트를 찾을 수 없음')
+        chunk_text = chunk_text or '텍스트를 찾을 수 없음'
         score = match.score
         # 근거 텍스트를 명확하게 구분합니다.
         context_text += f"[근거 {i+1} - {doc_id} (유사도: {score:.3f})]\n{chunk_text}\n---\n"
@@ -59,90 +72,164 @@ def format_context_for_llm(retrieved_chunks: List[Dict[str, Any]]) -> str:
     context_text = context_text.rstrip('-\n') 
     return context_text
 
+def get_technique_filter(technique_key: str) -> Optional[Dict[str, Any]]:
+    """
+    재료(technique_key)에 해당하는 검색 범위 필터를 반환합니다. (설정에 없으면 None = 전체 검색)
+    """
+    techniques = get_settings().RAG_TECHNIQUE_FILTERS.get(technique_key)
+    if not techniques:
+        return None
+    return {"technique": {"$in": techniques}}
+
 # -----------------------------------------------------------------------------
 # 2. RAG 파이프라인 함수
 # -----------------------------------------------------------------------------
 
-async def generate_rag_response(
+def _retrieve_candidates(query_text: str, technique_key: str) -> Tuple[List[VectorMatch], List[str]]:
+    """후보 청크를 검색하고 원문을 조회합니다. (동기 함수이므로 asyncio.to_thread로 호출)"""
+    matches = vectorstore.query_vectorstore_scoped(
+        query_text,
+        get_technique_filter(technique_key),
+        get_settings().RAG_CANDIDATE_K,
+        include_values=True
+    )
+    return matches, vectorstore.get_chunk_texts(matches)
+
+async def build_rag_conversation(
     query_text: str, 
     technique_key: str, 
     messages_from_client: List[Dict[str, str]],
     technique_name: str,
     tutorial_full_text: str
-) -> str:
+) -> List[ChatCompletionMessageParam]:
     """
-    RAG 파이프라인을 실행하여 답변을 생성합니다.
+    검색(Retrieval)과 프롬프트 구성(Augmentation)을 수행하여 LLM에 보낼 전체 대화 목록을 만듭니다.
+    (일반 응답과 스트리밍 응답이 함께 사용합니다.)
     """
     
     # 1. 지식 근거 검색 (Retrieval)
-    # Pinecone에서 관련 청크를 검색합니다.
-    all_retrieved_chunks = vectorstore.query_vectorstore(query_text)
+    # 현재 기법의 청크로 범위를 좁혀 검색하고, 부족하면 전체 검색으로 채웁니다.
+    # (동기 네트워크 호출과 문서 저장소 조회이므로 이벤트 루프를 막지 않도록 함께 스레드에서 실행)
+    # 후보는 RAG_CANDIDATE_K개를 벡터와 함께 가져옵니다. (MMR 계산용)
+    all_retrieved_chunks, all_chunk_texts = await asyncio.to_thread(
+        _retrieve_candidates, query_text, technique_key
+    )
     
-    # 1-1. ⭐️⭐️ 필터링 로직 제거: 모든 검색 결과를 사용하도록 수정 ⭐️⭐️
-    # 이전의 TARGET_DOC_ID 필터링을 제거하고, 검색된 모든 청크를 사용합니다.
-    retrieved_chunks = all_retrieved_chunks
+    # 1-1. 컨텍스트 선택: 최소 유사도 컷오프 → MMR 중복 제거 → 토큰 예산
+    retrieved_chunks, chunk_texts = select_context_chunks(all_retrieved_chunks, all_chunk_texts)
     
     # ⚠️ 로그 출력 로직 (유지)
     logger.info("-" * 50)
     logger.info(f"RAG 요청 처리 시작 - 질문: {query_text[:50]}...")
-    logger.info(f"검색된 모든 청크 수: {len(retrieved_chunks)}") 
+    logger.info(f"검색된 후보 청크 수: {len(all_retrieved_chunks)}, 선택된 청크 수: {len(retrieved_chunks)}") 
 
     if not retrieved_chunks:
         logger.warning(f"검색된 관련 지식이 없습니다. (총 0개 검색됨)")
     else:
         logger.info(f"총 {len(retrieved_chunks)}개의 청크 검색 성공:")
-        for i, match in enumerate(retrieved_chunks):
+        for i, (match, chunk_text) in enumerate(zip(retrieved_chunks, chunk_texts)):
             doc_id = match.metadata.get('doc_id', '알 수 없음')
-            chunk_text = match.metadata.get('text', '텍스트 없음')
+            chunk_text = chunk_text or '텍스트 없음'
             score = match.score
             logger.info(f"  [{i+1}] DOC ID: {doc_id}, SCORE: {score:.4f}, TEXT: {chunk_text[:70]}...")
 
     logger.info("-" * 50)
 
     # 2. LLM에게 전달할 프롬프트 구성 (Augmentation)
+    # provider의 prefix 캐시에 적중하도록 잘 바뀌지 않는 것부터 순서대로 놓습니다.
+    #   [시스템 프롬프트] → [튜토리얼] → [검색된 지식] → [이전 대화] → [사용자 질문]
+    # 시스템 프롬프트와 튜토리얼은 같은 기법이면 매 턴 바이트 단위로 같아야 하므로
+    # 질문/검색 결과처럼 바뀌는 값을 섞지 않습니다.
     
     # 2-1. 시스템 메시지: 역할과 규칙만 정의 
-    system_prompt_content = get_base_system_prompt(technique_name)
     system_message: ChatCompletionMessageParam = {
         "role": "system", 
-        "content": system_prompt_content
+        "content": get_base_system_prompt(technique_name)
     }
     
-    # 2-2. 검색 결과 및 튜토리얼 텍스트를 User 메시지 컨텍스트에 추가
-    context_content = format_context_for_llm(retrieved_chunks)
+    # 2-2. 튜토리얼 텍스트 (기법마다 고정)
+    tutorial_message: ChatCompletionMessageParam = {
+        "role": "system",
+        "content": f"""### [사용자 숙지 내용]
+사용자는 이미 다음과 같은 내용을 튜토리얼로 숙지한 상황입니다.
+'{tutorial_full_text}'"""
+    }
+    
+    # 2-3. 검색 결과 (질문마다 바뀜)
+    context_message: ChatCompletionMessageParam = {
+        "role": "system",
+        "content": format_context_for_llm(retrieved_chunks, chunk_texts)
+    }
     
     # 기존 대화 기록 포맷 변환
     gpt_conversation = llm_client.format_messages_for_openai(messages_from_client)
     
-    # 사용자 원본 쿼리 텍스트를 사용
-    user_query = query_text 
-    
-    # 새로운 최종 사용자 질문 (RAG에 필요한 모든 정보를 담습니다)
-    final_user_content = f"""
-### [사용자 숙지 내용]
-사용자는 이미 다음과 같은 내용을 튜토리얼로 숙지한 상황입니다.
-'{tutorial_full_text}'
-
----
-
-{context_content}
-
----
-
-### [사용자 질문]
-{user_query}
-"""
-    # 최종 사용자 메시지로 교체
+    # 2-4. 최종 사용자 메시지: 사용자 원본 쿼리 텍스트만 담습니다.
     final_user_message: ChatCompletionMessageParam = {
         "role": "user",
-        "content": final_user_content
+        "content": query_text
     }
     
-    # 최종 대화 목록: [시스템 프롬프트, 이전 대화 기록 (마지막 질문 전까지), 새로운 최종 질문]
-    # 이전 대화 목록에서 마지막 User 질문을 제거하고 새로운 final_user_message로 대체합니다.
-    full_conversation = [system_message] + gpt_conversation[:-1] + [final_user_message]
+    prefix_messages = [system_message, tutorial_message, context_message]
+    
+    # 2-5. 이전 대화 기록 압축: 고정 부분(시스템/튜토리얼/검색 결과 + 최종 질문)을 뺀 나머지 예산 안으로 줄입니다.
+    # 최근 턴은 그대로 두고, 오래된 턴은 누적 요약으로 바꿉니다.
+    history_budget = max(
+        0, get_settings().RAG_MAX_INPUT_TOKENS - llm_client.count_message_tokens(prefix_messages + [final_user_message])
+    )
+    history = await llm_client.compact_history(gpt_conversation[:-1], history_budget)
+    if len(history) != len(gpt_conversation[:-1]):
+        logger.info(f"대화 기록 압축: {len(gpt_conversation) - 1}개 → {len(history)}개 메시지 (예산 {history_budget} 토큰)")
+    
+    # 최종 대화 목록: [시스템 프롬프트, 튜토리얼, 검색된 지식, 이전 대화 기록 (마지막 질문 전까지, 압축됨), 최종 질문]
+    # 이전 대화 목록에서 마지막 User 질문을 제거하고 final_user_message로 대체합니다.
+    full_conversation = prefix_messages + history + [final_user_message]
+    
+    return full_conversation
+
+
+async def generate_rag_response(
+    query_text: str, 
+    technique_key: str, 
+    messages_from_client: List[Dict[str, str]],
+    technique_name: str,
+    tutorial_full_text: str
+) -> str:
+    """
+    RAG 파이프라인을 실행하여 답변을 생성합니다.
+    """
+    full_conversation = await build_rag_conversation(
+        query_text, technique_key, messages_from_client, technique_name, tutorial_full_text
+    )
     
     # 3. LLM 호출 및 답변 생성 (Generation)
-    response_text = await llm_client.generate_response(full_conversation)
+    response_text = await llm_client.generate_response(
+        full_conversation,
+        route=f"rag:{technique_key}",
+        prompt_version=RAG_PROMPT_VERSION
+    )
     
     return response_text
+
+
+async def stream_rag_response(
+    query_text: str, 
+    technique_key: str, 
+    messages_from_client: List[Dict[str, str]],
+    technique_name: str,
+    tutorial_full_text: str
+) -> AsyncIterator[str]:
+    """
+    RAG 파이프라인을 실행하고, 답변 토큰을 생성되는 즉시 순서대로 yield 합니다.
+    """
+    full_conversation = await build_rag_conversation(
+        query_text, technique_key, messages_from_client, technique_name, tutorial_full_text
+    )
+    
+    # 3. LLM 스트리밍 호출 (Generation)
+    async for token in llm_client.stream_response(
+        full_conversation,
+        route=f"rag:{technique_key}",
+        prompt_version=RAG_PROMPT_VERSION
+    ):
+        yield token
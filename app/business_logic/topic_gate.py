@@ -0,0 +1,145 @@
+# app/business_logic/topic_gate.py
+
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core import embeddings
+from app.core.settings import get_settings
+from app.utils.data_loader import load_tutorial_data_to_cache
+
+# -----------------------------------------------------------------------------
+# 1. 재료별 안내 문구 (각 서비스 system 프롬프트의 주제 이탈 멘트)
+# -----------------------------------------------------------------------------
+
+_OFF_TOPIC_PREFIX = "죄송해요, 그 질문은 제가 답변드리기 어려워요. "
+
+def get_redirect(service: ModuleType) -> Optional[str]:
+    """
+    서비스의 system 프롬프트가 쓰는 주제 이탈 멘트로 안내 문구를 만듭니다. (멘트가 없는 서비스는 None)
+    - OFF_TOPIC_REPLY: 프롬프트가 그대로 답하라고 지시하는 문장 (chatbot)
+    - OFF_TOPIC_REDIRECT: 짧게 답한 뒤 붙이는 마무리 멘트 (답변 대신 사과 문장을 앞에 붙입니다)
+    """
+    reply = getattr(service, "OFF_TOPIC_REPLY", None)
+    if reply:
+        return reply
+    redirect = getattr(service, "OFF_TOPIC_REDIRECT", None)
+    return _OFF_TOPIC_PREFIX + redirect if redirect else None
+
+# 튜토리얼 본문 외에 주제 판단의 기준으로 함께 쓰는 문장
+_GENERAL_TOPIC_ANCHOR = "프롬프트 엔지니어링과 생성형 AI(LLM, ChatGPT)에게 질문하고 지시하는 프롬프팅 기법"
+
+# -----------------------------------------------------------------------------
+# 2. 기준 임베딩 (튜토리얼 본문 + 기법 이름)
+# -----------------------------------------------------------------------------
+
+_reference_matrix: Optional[np.ndarray] = None
+_reference_lock = asyncio.Lock()
+
+async def _get_reference_matrix() -> Optional[np.ndarray]:
+    """
+    tutorial_info.json의 모든 튜토리얼 본문과 기법 이름을 임베딩한 정규화 행렬을 반환합니다. (처음 한 번만 계산)
+    다른 기법에 대한 질문은 각 서비스가 짧게 답해 주므로, 어느 기법과도 가깝지 않은 질문만 주제 이탈로 봅니다.
+    """
+    global _reference_matrix
+    async with _reference_lock:
+        if _reference_matrix is None:
+            items = load_tutorial_data_to_cache().values()
+            texts = [_GENERAL_TOPIC_ANCHOR]
+            texts += [item["text"] for item in items if item.get("text")]
+            texts += [item["technique"] for item in items if item.get("technique")]
+            try:
+                vectors = np.asarray(await embeddings.embed_texts_batched(texts), dtype=np.float32)
+            except Exception as e:
+                print(f"Topic gate reference embedding failed: {e}")
+                return None
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            _reference_matrix = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        return _reference_matrix
+
+# -----------------------------------------------------------------------------
+# 3. 주제 이탈 판정
+# -----------------------------------------------------------------------------
+
+# 재료별 판정 횟수 (/cache/stats에서 조회)
+# flagged: 임계값 미만이지만 TOPIC_GATE_ENFORCE가 꺼져 있어 기록만 하고 서비스로 넘긴 질문
+_gate_stats: Dict[str, Dict[str, int]] = {}
+_log_lock = threading.Lock()
+
+def _log_decision(ingredient_name: str, question: str, similarity: float, threshold: float, action: str) -> None:
+    """판정을 JSONL로 한 줄씩 남깁니다. 임계값을 라벨링해 검증하는 데 씁니다. (asyncio.to_thread로 호출)"""
+    log_path = get_settings().TOPIC_GATE_LOG_PATH
+    if not log_path:
+        return
+
+    record = {
+        "ts": time.time(),
+        "ingredient": ingredient_name,
+        "question": question,
+        "similarity": round(similarity, 4),
+        "threshold": threshold,
+        "action": action,
+    }
+    Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+    with _log_lock, open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def is_applicable(service: ModuleType) -> bool:
+    """이 서비스의 첫 질문을 판정하는지 여부 (질문 임베딩이 필요한지 미리 알기 위해 사용)"""
+    return get_settings().TOPIC_GATE_ENABLED and get_redirect(service) is not None
+
+async def check_off_topic(
+    ingredient_name: str,
+    service: ModuleType,
+    question: Optional[str],
+    question_vector: Optional[List[float]]
+) -> Optional[str]:
+    """
+    첫 질문이 프롬프팅 주제와 확실히 무관하면 LLM 호출 없이 보낼 안내 문구를 반환합니다. (아니면 None)
+
+    질문 임베딩과 기준 임베딩의 최대 코사인 유사도가 재료별 임계값(TOPIC_GATE_THRESHOLDS) 미만이면 주제 이탈로 봅니다.
+    question/question_vector는 의미 캐시와 같은 첫 질문 임베딩을 받습니다. (이어지는 대화의 짧은 후속 질문은
+    앞 대화 없이 판단할 수 없으므로 호출하는 쪽에서 첫 질문만 넘깁니다)
+    임계값은 아직 라벨링된 질문으로 검증되지 않았으므로, TOPIC_GATE_ENFORCE가 켜져 있을 때만 막고
+    기본값에서는 판정 횟수만 셉니다. (TOPIC_GATE_LOG_PATH를 지정하면 판정을 JSONL로 남깁니다)
+    임베딩이 없으면 판정하지 않고 그대로 서비스로 넘깁니다.
+    """
+    settings = get_settings()
+    redirect = get_redirect(service)
+    if not settings.TOPIC_GATE_ENABLED or redirect is None:
+        return None
+    if question is None or question_vector is None:
+        return None
+
+    references = await _get_reference_matrix()
+    if references is None:
+        return None
+
+    query = np.asarray(question_vector, dtype=np.float32)
+    norm = float(np.linalg.norm(query))
+    similarity = float((references @ query).max() / norm) if norm > 0 else 0.0
+
+    threshold = settings.TOPIC_GATE_THRESHOLDS.get(ingredient_name, settings.TOPIC_GATE_DEFAULT_THRESHOLD)
+    stats = _gate_stats.setdefault(ingredient_name, {"gated": 0, "flagged": 0, "passed": 0})
+    if similarity >= threshold:
+        action = "passed"
+    else:
+        action = "gated" if settings.TOPIC_GATE_ENFORCE else "flagged"
+    stats[action] += 1
+
+    if settings.TOPIC_GATE_LOG_PATH:
+        try:
+            await asyncio.to_thread(_log_decision, ingredient_name, question, similarity, threshold, action)
+        except Exception as e:
+            print(f"Topic gate log failed: {e}")
+
+    return redirect if action == "gated" else None
+
+def get_topic_gate_stats() -> Dict[str, Dict[str, int]]:
+    return {ingredient: dict(stats) for ingredient, stats in _gate_stats.items()}
@@ -1,40 +1,385 @@
 # chat_router.py
 
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.business_logic import rag as rag_logic # rag 함수 이름 충돌 방지를 위해 별칭 사용
-from app.utils.data_loader import get_tutorial_full_text # 데이터 로더 임포트
+from app.business_logic import topic_gate
+from app.utils.sse import SSE_HEADERS, stream_chat_events
+from app.core import llm_client
+from app.core.response_cache import get_response_cache
+from app.core import semantic_cache
+from app.core.session_store import get_session_store
+from app.core.settings import get_settings
+from app.core.single_flight import SingleFlight
 
 from app.services import chatbot, few_shot, role_prompting, reflexion, markdown_template, hallucination, rag_logic, quiz
 
 router = APIRouter()
 
-@router.post("/chat/{ingredient_name}")
-async def handle_chat(ingredient_name: str, request: Request):
-    data = await request.json()
-    messages = data.get("messages", [])
+# 재료 이름 -> 서비스 모듈 매핑 (각 모듈은 build_conversation, MODEL_NAME, TEMPERATURE, ROUTE, PROMPT_VERSION 제공)
+INGREDIENT_SERVICES = {
+    "flour": few_shot,
+    "tomato": role_prompting,
+    "cheese": markdown_template,
+    "pepperoni": hallucination,
+    "olive": rag_logic,
+    "basil": reflexion,
+    "quiz": quiz,
+    "chatbot": chatbot,
+}
+
+# 의미 캐시를 사용하지 않는 라우트 (퀴즈 채점은 정확 일치 응답 캐시만 사용)
+SEMANTIC_CACHE_EXCLUDED = {"quiz"}
+
+# Idempotency-Key 헤더가 같은 요청(프론트엔드 재시도 등)은 진행 중이거나 막 끝난 결과를 그대로 돌려줍니다.
+_idempotent_requests = SingleFlight(
+    ttl_seconds=get_settings().IDEMPOTENCY_TTL_SECONDS,
+    max_entries=get_settings().IDEMPOTENCY_MAX_ENTRIES
+)
+
+
+def _uses_semantic_cache(ingredient_name: str) -> bool:
+    return semantic_cache.get_semantic_cache() is not None and ingredient_name not in SEMANTIC_CACHE_EXCLUDED
+
+
+async def _embed_first_question(
+    ingredient_name: str,
+    messages: List[Dict[str, str]]
+) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    첫 질문이면 한 번만 임베딩하여 주제 이탈 판정과 의미 캐시가 함께 사용합니다.
+
+    Output:
+        (질문, 질문 임베딩) — 첫 질문이 아니거나 둘 다 쓰지 않는 재료이면 (None, None).
+    """
+    if not (_uses_semantic_cache(ingredient_name) or topic_gate.is_applicable(INGREDIENT_SERVICES[ingredient_name])):
+        return None, None
+
+    question = semantic_cache.get_first_turn_question(messages)
+    if question is None:
+        return None, None
+
+    question_vector = await semantic_cache.embed_question(question)
+    if question_vector is None:
+        return None, None
+    return question, question_vector
+
+
+async def _lookup_semantic_cache(ingredient_name: str, question_vector: Optional[List[float]]) -> Optional[str]:
+    """첫 질문의 임베딩으로 의미 캐시를 조회합니다. (캐시 대상이 아니거나 miss이면 None)"""
+    if question_vector is None or not _uses_semantic_cache(ingredient_name):
+        return None
+
+    partition = f"{ingredient_name}:{INGREDIENT_SERVICES[ingredient_name].PROMPT_VERSION}"
+    return await asyncio.to_thread(semantic_cache.get_semantic_cache().lookup, partition, question_vector)
+
+
+async def _store_semantic_cache(
+    ingredient_name: str,
+    question: Optional[str],
+    question_vector: Optional[List[float]],
+    answer_text: str
+) -> None:
+    """첫 질문에 대한 새 답변을 의미 캐시에 저장합니다."""
+    if question is None or question_vector is None or not answer_text or not _uses_semantic_cache(ingredient_name):
+        return
+    cache = semantic_cache.get_semantic_cache()
+
+    partition = f"{ingredient_name}:{INGREDIENT_SERVICES[ingredient_name].PROMPT_VERSION}"
+    try:
+        await asyncio.to_thread(cache.store, partition, question, question_vector, answer_text)
+    except Exception as e:
+        print(f"Semantic cache store failed: {e}")
+
+
+def _resolve_session_messages(
+    ingredient_name: str,
+    data: Dict[str, Any]
+) -> Tuple[List[Dict[str, str]], Optional[str], bool]:
+    """
+    요청 본문에서 이번 턴의 전체 대화를 구성합니다.
+
+    - {"session_id"(선택), "message"}: 서버 세션에 저장된 대화 뒤에 새 사용자 메시지만 붙입니다. (권장)
+      session_id가 없으면 새 세션을 만들어 응답으로 돌려줍니다.
+    - {"messages", "session_id"}: 전체 대화를 그대로 사용하고, 세션을 이 대화로 덮어씁니다.
+    - {"messages"}만 보낸 기존 클라이언트: 세션을 만들거나 저장하지 않습니다. (session_id는 None)
+
+    Output:
+        (전체 대화, session_id, 새 메시지만 받은 요청인지) — 세션 저장소가 꺼져 있으면 session_id는 None.
+    """
+    messages = data.get("messages")
+    store = get_session_store()
+    if store is None:
+        return messages or [], None, False
 
+    new_message = data.get("message")
+    if messages or new_message is None:
+        # 세션을 쓰겠다고 명시한 요청(session_id)만 저장합니다. (매 턴 고아 세션이 쌓이지 않도록)
+        return messages or [], data.get("session_id"), False
+
+    session_id = data.get("session_id") or store.new_session_id()
+
+    if isinstance(new_message, str):
+        new_message = {"type": "user", "text": new_message}
+
+    history: Optional[List[Dict[str, str]]] = []
+    if data.get("session_id"):
+        history = store.get(ingredient_name, session_id)
+        if history is None:
+            # 만료/재시작 등으로 세션이 없으면 클라이언트가 전체 대화를 다시 보내야 합니다.
+            raise HTTPException(status_code=409, detail="세션을 찾을 수 없습니다. 전체 대화(messages)를 보내주세요.")
+
+    return history + [new_message], session_id, True
+
+
+def _save_session_turn(
+    ingredient_name: str,
+    session_id: Optional[str],
+    messages: List[Dict[str, str]],
+    is_delta: bool,
+    answer_text: str
+) -> None:
+    """이번 턴의 질문과 답변을 세션에 기록합니다."""
+    store = get_session_store()
+    if store is None or session_id is None:
+        return
+
+    bot_message = {"type": "bot", "text": answer_text}
+    if is_delta:
+        store.append(ingredient_name, session_id, [messages[-1], bot_message])
+    else:
+        store.set(ingredient_name, session_id, messages + [bot_message])
+
+
+async def _dispatch_chat(ingredient_name: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    """재료 이름에 맞는 서비스를 호출합니다."""
     if ingredient_name == "flour": # 밀가루 -> Few-Shot
-        response_text = await few_shot.generate_response(messages)
+        return await few_shot.generate_response(messages)
     elif ingredient_name == "tomato": # 토마토 -> 역할 지정
-        response_text = await role_prompting.generate_response(messages)
+        return await role_prompting.generate_response(messages)
     elif ingredient_name == "cheese": # 치즈 -> 마크다운 템플릿
-        response_text = await markdown_template.generate_response(messages)
+        return await markdown_template.generate_response(messages)
     elif ingredient_name == "pepperoni": # 페퍼로니 -> 할루시네이션 유도
-        response_text = await hallucination.generate_response(messages)
+        return await hallucination.generate_response(messages)
     elif ingredient_name == "olive": # 올리브 -> RAG
-        response_text = await rag_logic.generate_response(messages)
+        return await rag_logic.generate_response(messages)
     elif ingredient_name == "basil": # 바질 -> Reflexion
-        response_text = await reflexion.generate_response(messages)
+        return await reflexion.generate_response(messages)
     elif ingredient_name == "quiz": # 주관식 퀴즈 채점
-        response_text = await quiz.evaluate_prompt(messages)
+        return await quiz.evaluate_prompt(messages)
     elif ingredient_name == "chatbot": # 챗봇 일반 대화
-        response_text = await chatbot.generate_response(messages)    
+        return await chatbot.generate_response(messages)    
+    else:
+        raise HTTPException(status_code=404, detail="재료를 찾을 수 없습니다.")
+
+
+@router.post("/chat/{ingredient_name}")
+async def handle_chat(ingredient_name: str, request: Request):
+    data = await request.json()
+
+    if ingredient_name not in INGREDIENT_SERVICES:
+        raise HTTPException(status_code=404, detail="재료를 찾을 수 없습니다.")
+
+    # 같은 Idempotency-Key로 다시 들어온 요청은 새로 처리하지 않고 기존 결과를 기다립니다.
+    # (세션에 같은 턴이 두 번 기록되거나 LLM이 두 번 호출되지 않습니다)
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        return await _idempotent_requests.do(
+            f"{ingredient_name}:{idempotency_key}", lambda: _run_chat(ingredient_name, data)
+        )
+    return await _run_chat(ingredient_name, data)
+
+
+def _chat_response(answer_text: str, session_id: Optional[str]) -> Dict[str, Any]:
+    """
+    /chat 응답 형식을 만듭니다. 스트리밍 엔드포인트의 'done' 이벤트도 같은 형식을 사용합니다.
+    (data.text에 서비스 응답 {success, data: {text}}가 그대로 담기는 기존 형식을 유지합니다)
+    """
+    result_data: Dict[str, Any] = {
+        "text": {
+            "success": True,
+            "data": {
+                "text": answer_text
+            }
+        }
+    }
+    if session_id is not None:
+        result_data["session_id"] = session_id
+
+    return {
+        "success": True,
+        "data": result_data
+    }
+
+
+async def _run_chat(ingredient_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """handle_chat의 본문: 세션/의미 캐시/서비스 호출을 거쳐 응답을 만듭니다."""
+    # 0. 세션에 저장된 대화 + 새 메시지로 전체 대화를 구성합니다. (전체 messages도 그대로 지원)
+    messages, session_id, is_delta = _resolve_session_messages(ingredient_name, data)
+
+    # 1. 첫 질문이 프롬프팅 주제와 무관하면 LLM 호출 없이 안내 문구로 답합니다.
+    #    (질문 임베딩은 한 번만 계산하여 의미 캐시와 함께 사용)
+    question, question_vector = await _embed_first_question(ingredient_name, messages)
+    cached_answer = await topic_gate.check_off_topic(
+        ingredient_name, INGREDIENT_SERVICES[ingredient_name], question, question_vector
+    )
+
+    # 2. 첫 질문이면 의미 캐시에서 비슷한 질문의 답변을 먼저 찾습니다.
+    if cached_answer is None:
+        cached_answer = await _lookup_semantic_cache(ingredient_name, question_vector)
+
+    if cached_answer is not None:
+        response_text = {
+            "success": True,
+            "data": {
+                "text": cached_answer
+            }
+        }
     else:
+        # 3. 캐시 miss -> 서비스 호출 후 의미 캐시에 저장
+        response_text = await _dispatch_chat(ingredient_name, messages)
+        await _store_semantic_cache(ingredient_name, question, question_vector, response_text["data"]["text"])
+
+    _save_session_turn(ingredient_name, session_id, messages, is_delta, response_text["data"]["text"])
+
+    return _chat_response(response_text["data"]["text"], session_id)
+
+
+@router.post("/quiz/batch")
+async def handle_quiz_batch(request: Request):
+    """
+    여러 Role Prompting 제출물을 한 번에 채점합니다. (강사용 일괄 재채점)
+
+    요청: {"submissions": ["프롬프트1", "프롬프트2", ...]} (항목은 문자열 또는 {"text": "..."})
+    응답: 입력 순서대로 항목별 {"index", "success", "text"(True/False) 또는 "error"}
+    """
+    data = await request.json()
+    submissions = data.get("submissions", [])
+
+    if not isinstance(submissions, list):
+        raise HTTPException(status_code=400, detail="submissions는 목록이어야 합니다.")
+    if len(submissions) > get_settings().QUIZ_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail="한 번에 채점할 수 있는 제출물 수를 넘었습니다.")
+
+    texts = [item.get("text", "") if isinstance(item, dict) else str(item or "") for item in submissions]
+    results = await quiz.evaluate_prompts_batch(texts)
+
+    return {
+        "success": True,
+        "data": {
+            "results": results,
+            "total": len(results),
+            "failed": sum(1 for result in results if not result["success"])
+        }
+    }
+
+
+async def _single_chunk_stream(text: str) -> AsyncIterator[str]:
+    """캐시된 답변을 하나의 토큰 조각으로 내보냅니다."""
+    yield text
+
+
+async def _quiz_grade_stream(messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """퀴즈 채점 결과(True/False)를 하나의 토큰 조각으로 내보냅니다."""
+    result = await quiz.evaluate_prompt(messages)
+    yield result["data"]["text"]
+
+
+@router.post("/chat/{ingredient_name}/stream")
+async def handle_chat_stream(ingredient_name: str, request: Request):
+    """
+    handle_chat의 스트리밍(SSE) 버전입니다.
+    토큰을 'token' 이벤트로 바로 흘려보내고, 마지막 'done' 이벤트에 /chat과 같은 형식의 응답을 담아 보냅니다.
+
+    Idempotency-Key 헤더가 있으면 /chat과 같은 키 공간에서 한 번만 실행하고,
+    결과를 하나의 'token' 조각과 'done' 이벤트로 보냅니다. (이 경우 토큰 단위로 흘려보내지 않습니다)
+    """
+    data = await request.json()
+
+    service = INGREDIENT_SERVICES.get(ingredient_name)
+    if service is None:
         raise HTTPException(status_code=404, detail="재료를 찾을 수 없습니다.")
 
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        result: Dict[str, Any] = {}
+
+        async def idempotent_stream() -> AsyncIterator[str]:
+            result.update(await _idempotent_requests.do(
+                f"{ingredient_name}:{idempotency_key}", lambda: _run_chat(ingredient_name, data)
+            ))
+            yield result["data"]["text"]["data"]["text"]
+
+        events = stream_chat_events(idempotent_stream(), build_payload=lambda _: result)
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+    messages, session_id, is_delta = _resolve_session_messages(ingredient_name, data)
+
+    def done_payload(answer_text: str) -> Dict[str, Any]:
+        return _chat_response(answer_text, session_id)
+
+    async def save_turn(answer_text: str) -> None:
+        _save_session_turn(ingredient_name, session_id, messages, is_delta, answer_text)
+
+    question, question_vector = await _embed_first_question(ingredient_name, messages)
+    cached_answer = await topic_gate.check_off_topic(ingredient_name, service, question, question_vector)
+    if cached_answer is None:
+        cached_answer = await _lookup_semantic_cache(ingredient_name, question_vector)
+
+    if cached_answer is not None:
+        events = stream_chat_events(_single_chunk_stream(cached_answer), on_complete=save_turn, build_payload=done_payload)
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+    async def store_answer(answer_text: str) -> None:
+        await _store_semantic_cache(ingredient_name, question, question_vector, answer_text)
+        await save_turn(answer_text)
+
+    if ingredient_name == "quiz":
+        # 채점 결과는 True/False 한 단어이므로 중간 토큰 없이 최종 결과만 보냅니다.
+        # (일반 채점과 같이 로컬 1차 채점기를 거칩니다)
+        events = stream_chat_events(
+            _quiz_grade_stream(messages), emit_tokens=False, on_complete=save_turn, build_payload=done_payload
+        )
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+    full_conversation = service.build_conversation(messages)
+    token_stream = llm_client.stream_response(
+        full_conversation,
+        model_name=service.MODEL_NAME,
+        temperature=service.TEMPERATURE,
+        route=service.ROUTE,
+        prompt_version=service.PROMPT_VERSION
+    )
+
+    if ingredient_name == "chatbot":
+        events = stream_chat_events(token_stream, finalize=str.strip, on_complete=store_answer, build_payload=done_payload)
+    else:
+        events = stream_chat_events(token_stream, on_complete=store_answer, build_payload=done_payload)
+
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    LLM 응답 캐시와 의미 캐시의 hit/miss 카운터와 사용량,
+    라우트별 provider prompt 캐시 적중 토큰(cached_tokens)을 반환합니다.
+    """
+    response_cache = get_response_cache()
+    answer_cache = semantic_cache.get_semantic_cache()
     return {
         "success": True,
         "data": {
-            "text": response_text
+            "response_cache": response_cache.stats() if response_cache else None,
+            "semantic_cache": answer_cache.stats() if answer_cache else None,
+            "prompt_cache": llm_client.get_prompt_usage_stats(),
+            "sessions": get_session_store().stats() if get_session_store() else None,
+            "single_flight": llm_client.get_single_flight_stats(),
+            "model_routing": llm_client.get_routing_stats(),
+            "topic_gate": topic_gate.get_topic_gate_stats(),
+            "idempotency": _idempotent_requests.stats()
         }
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,314 @@
+# app/core/ann_index.py
+
+import heapq
+import math
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# 1. HNSW (Hierarchical Navigable Small World) 근사 최근접 이웃 인덱스
+# -----------------------------------------------------------------------------
+
+class HNSWIndex:
+    """
+    NumPy로 구현한 HNSW 인덱스입니다. (코사인 유사도, 정규화된 float32 벡터)
+
+    - 증분 삽입: add()로 벡터를 하나씩 추가할 수 있습니다. (같은 label은 교체)
+    - 삭제: delete()는 tombstone으로 표시하고, 비율이 커지면 compact()로 다시 만듭니다.
+    - recall/지연 시간 조절: ef_search가 클수록 recall이 높고 느려집니다.
+    - 저장/로드: save()/load()로 .npz 파일 하나에 그래프와 벡터를 저장합니다.
+
+    참고: Malkov & Yashunin, "Efficient and robust approximate nearest neighbor
+    search using Hierarchical Navigable Small World graphs" (2016).
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: int = 42
+    ):
+        self.dimension = dimension
+        self.M = M
+        self.M0 = 2 * M # 0층은 이웃을 두 배까지 허용합니다.
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_multiplier = 1.0 / math.log(max(M, 2))
+        self._rng = np.random.default_rng(seed)
+
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._count = 0
+        self._labels: List[str] = []
+        self._levels: List[int] = []
+        self._node_by_label: Dict[str, int] = {}
+        self._deleted: set = set()
+
+        # layer -> {node: [neighbor nodes]}
+        self._graph: List[Dict[int, List[int]]] = []
+        self._entry_point: Optional[int] = None
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        """삭제되지 않은 벡터 수."""
+        return len(self._node_by_label)
+
+    @property
+    def deleted_ratio(self) -> float:
+        return len(self._deleted) / self._count if self._count else 0.0
+
+    def labels(self) -> List[str]:
+        """삭제되지 않은 label 목록."""
+        return list(self._node_by_label.keys())
+
+    # --- 내부 도우미 ---
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _append_vector(self, vector: np.ndarray) -> int:
+        capacity = self._vectors.shape[0]
+        if self._count >= capacity:
+            grown = np.empty((max(64, capacity * 2), self.dimension), dtype=np.float32)
+            grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+        node = self._count
+        self._vectors[node] = vector
+        self._count += 1
+        return node
+
+    def _random_level(self) -> int:
+        return int(-math.log(1.0 - self._rng.random()) * self.level_multiplier)
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: List[int],
+        ef: int,
+        layer: int
+    ) -> List[Tuple[float, int]]:
+        """
+        한 층에서 탐욕적 beam search를 수행하여 (거리, node) 목록을 거리 오름차순으로 반환합니다.
+        이웃 거리는 한 번의 행렬-벡터 곱으로 함께 계산합니다.
+        """
+        layer_graph = self._graph[layer]
+        visited = set(entry_points)
+        entry_distances = 1.0 - self._vectors[entry_points] @ query
+
+        candidates = [(float(d), node) for d, node in zip(entry_distances, entry_points)]
+        heapq.heapify(candidates)
+        results = [(-d, node) for d, node in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0] and len(results) >= ef:
+                break
+
+            neighbors = [n for n in layer_graph.get(node, ()) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+
+            neighbor_distances = (1.0 - self._vectors[neighbors] @ query).tolist()
+            worst = -results[0][0]
+            for neighbor, neighbor_distance in zip(neighbors, neighbor_distances):
+                if len(results) < ef or neighbor_distance < worst:
+                    heapq.heappush(candidates, (neighbor_distance, neighbor))
+                    heapq.heappush(results, (-neighbor_distance, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+                    worst = -results[0][0]
+
+        return sorted((-negative, node) for negative, node in results)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], max_neighbors: int) -> List[int]:
+        """
+        논문의 휴리스틱으로 이웃을 고릅니다: 이미 고른 이웃보다 기준점에 더 가까운 후보만 추가하여
+        한쪽 방향으로 몰리지 않는 다양한 연결을 만들고, 부족하면 가까운 순으로 채웁니다.
+        """
+        selected: List[int] = []
+        pruned: List[int] = []
+
+        for distance, node in candidates:
+            if len(selected) >= max_neighbors:
+                break
+            if selected:
+                distances_to_selected = 1.0 - self._vectors[selected] @ self._vectors[node]
+                if float(distances_to_selected.min()) < distance:
+                    pruned.append(node)
+                    continue
+            selected.append(node)
+
+        for node in pruned:
+            if len(selected) >= max_neighbors:
+                break
+            selected.append(node)
+
+        return selected
+
+    # --- 쓰기 ---
+
+    def add(self, label: str, vector: List[float]) -> None:
+        """벡터를 삽입합니다. 같은 label이 있으면 이전 노드를 삭제 표시하고 새로 삽입합니다."""
+        if label in self._node_by_label:
+            self.delete(label)
+
+        query = self._normalize(vector)
+        node = self._append_vector(query)
+        level = self._random_level()
+
+        self._labels.append(label)
+        self._levels.append(level)
+        self._node_by_label[label] = node
+
+        while len(self._graph) <= level:
+            self._graph.append({})
+        for layer in range(level + 1):
+            self._graph[layer][node] = []
+
+        if self._entry_point is None:
+            self._entry_point = node
+            self._max_level = level
+            return
+
+        # 1. 상위 층에서는 가장 가까운 노드 하나만 따라 내려갑니다.
+        entry_points = [self._entry_point]
+        for layer in range(self._max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        # 2. 삽입 층부터 0층까지 이웃을 연결합니다.
+        for layer in range(min(level, self._max_level), -1, -1):
+            candidates = self._search_layer(query, entry_points, self.ef_construction, layer)
+            neighbors = self._select_neighbors(candidates, self.M)
+            self._graph[layer][node] = neighbors
+
+            max_neighbors = self.M0 if layer == 0 else self.M
+            for neighbor in neighbors:
+                neighbor_links = self._graph[layer][neighbor]
+                neighbor_links.append(node)
+                if len(neighbor_links) > max_neighbors:
+                    # 이웃 수가 넘치면 같은 휴리스틱으로 다시 고릅니다.
+                    link_distances = (1.0 - self._vectors[neighbor_links] @ self._vectors[neighbor]).tolist()
+                    self._graph[layer][neighbor] = self._select_neighbors(
+                        sorted(zip(link_distances, neighbor_links)), max_neighbors
+                    )
+
+            entry_points = [candidate for _, candidate in candidates]
+
+        if level > self._max_level:
+            self._entry_point = node
+            self._max_level = level
+
+    def delete(self, label: str) -> None:
+        """label을 삭제 표시합니다. (그래프 탐색에는 계속 쓰이고 결과에서만 제외됩니다)"""
+        node = self._node_by_label.pop(label, None)
+        if node is not None:
+            self._deleted.add(node)
+
+    def compact(self) -> None:
+        """삭제 표시된 노드를 제외하고 인덱스를 다시 만듭니다."""
+        live = [(label, self._vectors[node].copy()) for label, node in self._node_by_label.items()]
+        rebuilt = HNSWIndex(self.dimension, self.M, self.ef_construction, self.ef_search)
+        for label, vector in live:
+            rebuilt.add(label, vector)
+        self.__dict__.update(rebuilt.__dict__)
+
+    # --- 읽기 ---
+
+    def search(self, vector: List[float], k: int, ef: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        가장 유사한 k개의 (label, 코사인 유사도)를 유사도 내림차순으로 반환합니다.
+
+        Args:
+            ef: 0층 탐색 폭. 지정하지 않으면 ef_search를 사용합니다. (k 이상으로 보정)
+        """
+        if self._entry_point is None or k <= 0:
+            return []
+
+        query = self._normalize(vector)
+        ef = max(ef or self.ef_search, k)
+        # 삭제 표시된 노드만큼 더 넓게 찾아 결과 수가 모자라지 않게 합니다.
+        ef += min(len(self._deleted), ef)
+
+        entry_points = [self._entry_point]
+        for layer in range(self._max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        results = []
+        for distance, node in self._search_layer(query, entry_points, ef, 0):
+            if node in self._deleted:
+                continue
+            results.append((self._labels[node], 1.0 - distance))
+            if len(results) >= k:
+                break
+        return results
+
+    # --- 저장/로드 ---
+
+    def save(self, path: str) -> None:
+        """그래프, 벡터, label을 .npz 파일 하나에 저장합니다."""
+        arrays: Dict[str, np.ndarray] = {
+            "params": np.array([self.dimension, self.M, self.ef_construction, self.ef_search], dtype=np.int64),
+            "state": np.array([
+                -1 if self._entry_point is None else self._entry_point,
+                self._max_level,
+                len(self._graph)
+            ], dtype=np.int64),
+            "vectors": self._vectors[:self._count],
+            "labels": np.array(self._labels, dtype=np.str_),
+            "levels": np.array(self._levels, dtype=np.int32),
+            "deleted": np.array(sorted(self._deleted), dtype=np.int64),
+        }
+        # 각 층의 인접 리스트를 (nodes, offsets, neighbors) 평탄 배열로 저장합니다.
+        for layer, layer_graph in enumerate(self._graph):
+            nodes = list(layer_graph.keys())
+            offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(layer_graph[node]) for node in nodes])
+            neighbors = [n for node in nodes for n in layer_graph[node]]
+            arrays[f"layer{layer}_nodes"] = np.array(nodes, dtype=np.int64)
+            arrays[f"layer{layer}_offsets"] = offsets
+            arrays[f"layer{layer}_neighbors"] = np.array(neighbors, dtype=np.int64)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        Path(tmp_path).replace(path)
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWIndex":
+        """save()로 저장한 파일에서 인덱스를 복원합니다."""
+        with np.load(path, allow_pickle=False) as data:
+            dimension, M, ef_construction, ef_search = (int(x) for x in data["params"])
+            entry_point, max_level, num_layers = (int(x) for x in data["state"])
+
+            index = cls(dimension, M, ef_construction, ef_search)
+            index._vectors = np.ascontiguousarray(data["vectors"], dtype=np.float32)
+            index._count = index._vectors.shape[0]
+            index._labels = data["labels"].tolist()
+            index._levels = data["levels"].tolist()
+            index._deleted = set(data["deleted"].tolist())
+            index._node_by_label = {
+                label: node for node, label in enumerate(index._labels) if node not in index._deleted
+            }
+            index._entry_point = None if entry_point < 0 else entry_point
+            index._max_level = max_level
+
+            for layer in range(num_layers):
+                nodes = data[f"layer{layer}_nodes"].tolist()
+                offsets = data[f"layer{layer}_offsets"].tolist()
+                neighbors = data[f"layer{layer}_neighbors"].tolist()
+                index._graph.append({
+                    node: neighbors[offsets[i]:offsets[i + 1]] for i, node in enumerate(nodes)
+                })
+
+        return index
@@ -0,0 +1,81 @@
+# app/core/context_selection.py
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.settings import get_settings
+from app.core.tokenizer import count_tokens
+from app.core.vectorstore import VectorMatch
+
+# -----------------------------------------------------------------------------
+# 1. 검색 후 컨텍스트 선택 (점수 컷오프 + MMR + 토큰 예산)
+# -----------------------------------------------------------------------------
+
+def select_context_chunks(
+    matches: List[VectorMatch],
+    chunk_texts: List[str],
+    max_chunks: Optional[int] = None,
+    min_score: Optional[float] = None,
+    mmr_lambda: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    duplicate_threshold: Optional[float] = None
+) -> Tuple[List[VectorMatch], List[str]]:
+    """
+    검색된 후보 청크 중 프롬프트에 넣을 청크를 고릅니다.
+
+    1. min_score 미만의 청크는 버립니다.
+    2. MMR(maximal marginal relevance)로 질문과 관련 있으면서 이미 고른 청크와 겹치지 않는 청크를 차례로 고릅니다.
+       청크 간 유사도는 검색 때 함께 받은 벡터(values)로 계산하므로 다시 임베딩하지 않습니다.
+       이미 고른 청크와의 유사도가 duplicate_threshold 이상인 청크(겹침 구간 중복)는 아예 버립니다.
+    3. 고른 청크의 토큰 합이 max_tokens를 넘지 않도록 넘치는 청크는 건너뜁니다.
+
+    Returns:
+        (선택된 청크, 각 청크의 원문) — 선택된 순서(관련도 높은 순).
+    """
+    settings = get_settings()
+    max_chunks = max_chunks if max_chunks is not None else settings.RAG_TOP_K
+    min_score = min_score if min_score is not None else settings.RAG_MIN_SCORE
+    mmr_lambda = mmr_lambda if mmr_lambda is not None else settings.RAG_MMR_LAMBDA
+    max_tokens = max_tokens if max_tokens is not None else settings.RAG_MAX_CONTEXT_TOKENS
+    duplicate_threshold = duplicate_threshold if duplicate_threshold is not None else settings.RAG_DUPLICATE_THRESHOLD
+
+    candidates = [i for i, match in enumerate(matches) if match.score >= min_score and chunk_texts[i]]
+    if not candidates:
+        return [], []
+
+    relevance = np.array([matches[i].score for i in candidates], dtype=np.float32)
+
+    # 청크 간 코사인 유사도 행렬 (벡터가 없는 후보는 다른 청크와 겹치지 않는 것으로 봅니다)
+    dimension = next((len(matches[i].values) for i in candidates if matches[i].values), 0)
+    vectors = np.zeros((len(candidates), max(dimension, 1)), dtype=np.float32)
+    for row, i in enumerate(candidates):
+        if matches[i].values:
+            vectors[row] = matches[i].values
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = vectors @ vectors.T
+
+    selected_rows: List[int] = []
+    remaining = list(range(len(candidates)))
+    used_tokens = 0
+
+    while remaining and len(selected_rows) < max_chunks:
+        if selected_rows:
+            redundancy = similarity[np.ix_(remaining, selected_rows)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        mmr_scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        position = int(np.argmax(mmr_scores))
+        best = remaining.pop(position)
+        if redundancy[position] >= duplicate_threshold:
+            continue # 이미 고른 청크와 거의 같은 내용입니다.
+
+        tokens = count_tokens(chunk_texts[candidates[best]])
+        if used_tokens + tokens > max_tokens:
+            continue # 예산을 넘는 청크는 건너뛰고 다음 후보를 봅니다.
+        used_tokens += tokens
+        selected_rows.append(best)
+
+    selected = [candidates[row] for row in selected_rows]
+    return [matches[i] for i in selected], [chunk_texts[i] for i in selected]
@@ -0,0 +1,119 @@
+# app/core/docstore.py
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. 청크 문서 저장소 (vector id -> 원문 텍스트/메타데이터)
+# -----------------------------------------------------------------------------
+
+class DocStore:
+    """
+    청크 원문을 벡터 id로 저장하는 로컬 SQLite 저장소입니다.
+
+    벡터 저장소에는 필터링에 쓰는 작은 메타데이터(technique, section, page 등)만 남기고,
+    검색 후 top-k id의 원문은 여기서 한 번의 조회로 가져옵니다.
+    """
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._writes = 0 # 이 프로세스에서의 쓰기 횟수 (버전 계산용)
+
+    def put_many(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """(id, text, metadata) 목록을 저장합니다. (같은 id는 덮어씁니다)"""
+        rows = [(vector_id, text, json.dumps(metadata, ensure_ascii=False)) for vector_id, text, metadata in items]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, text, metadata) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._writes += 1
+
+    def get_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """여러 id를 한 번에 조회하여 {id: {"text", "metadata"}}를 반환합니다. (없는 id는 제외)"""
+        found: Dict[str, Dict[str, Any]] = {}
+        unique_ids = list(dict.fromkeys(ids))
+
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나누어 조회합니다.
+            for start in range(0, len(unique_ids), 500):
+                batch = unique_ids[start:start + 500]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self._conn.execute(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", batch
+                ).fetchall()
+                for vector_id, text, metadata in rows:
+                    found[vector_id] = {"text": text, "metadata": json.loads(metadata)}
+
+        return found
+
+    def delete_many(self, ids: List[str]) -> None:
+        if not ids:
+            return
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(vector_id,) for vector_id in ids])
+            self._conn.commit()
+            self._writes += 1
+
+    def all_documents(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """저장된 모든 청크를 (id, text, metadata) 목록으로 반환합니다. (희소 인덱스 구축용)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, text, metadata FROM chunks ORDER BY id").fetchall()
+        return [(vector_id, text, json.loads(metadata)) for vector_id, text, metadata in rows]
+
+    def version(self) -> Tuple[int, int]:
+        """
+        내용이 바뀌면 달라지는 값을 반환합니다.
+        (PRAGMA data_version은 다른 프로세스의 커밋을, _writes는 이 연결의 쓰기를 반영합니다)
+        """
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return data_version, self._writes
+
+# -----------------------------------------------------------------------------
+# 2. 저장소 인스턴스 (싱글톤)
+# -----------------------------------------------------------------------------
+
+_docstore: Optional[DocStore] = None
+
+def get_docstore() -> Optional[DocStore]:
+    """
+    설정에 따라 문서 저장소 싱글톤을 반환합니다. 꺼져 있으면 None을 반환합니다.
+    (이때는 기존처럼 청크 텍스트를 벡터 메타데이터에 저장합니다)
+    DOCSTORE_ENABLED를 지정하지 않으면 벡터와 같은 디스크에 있는 local 백엔드에서만 켭니다.
+    """
+    global _docstore
+    settings = get_settings()
+
+    enabled = settings.DOCSTORE_ENABLED
+    if enabled is None:
+        enabled = settings.VECTORSTORE_BACKEND.lower() == "local"
+    if not enabled:
+        return None
+
+    if _docstore is None:
+        _docstore = DocStore(settings.DOCSTORE_PATH)
+
+    return _docstore
@@ -0,0 +1,98 @@
+# app/core/embedding_cache.py
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple
+
+import numpy as np
+
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. 디스크 기반 임베딩 캐시 (content-addressed)
+# -----------------------------------------------------------------------------
+
+class EmbeddingCache:
+    """
+    (모델, 텍스트)의 sha256 해시를 키로 임베딩 벡터를 저장하는 SQLite 캐시입니다.
+    벡터는 float32 바이트(blob)로 압축 저장되어 3072차원 벡터 하나가 약 12KB를 차지합니다.
+    """
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """모델 이름과 텍스트로 캐시 키를 만듭니다."""
+        return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """여러 키를 한 번에 조회하여 {key: vector} 딕셔너리를 반환합니다. (없는 키는 제외)"""
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나누어 조회합니다.
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]) -> None:
+        """(key, vector) 목록을 저장합니다."""
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+# -----------------------------------------------------------------------------
+# 2. 캐시 인스턴스 (싱글톤)
+# -----------------------------------------------------------------------------
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    설정에 따라 임베딩 캐시 싱글톤을 반환합니다. 캐시가 꺼져 있으면 None을 반환합니다.
+    """
+    global _embedding_cache
+    settings = get_settings()
+
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH)
+
+    return _embedding_cache
@@ -1,8 +1,13 @@
 # app/core/embeddings.py
 
+import asyncio
+import random
 from typing import List, Union, Optional
 from openai import OpenAI
 from app.core.settings import get_settings
+from app.core.embedding_cache import EmbeddingCache, get_embedding_cache
+from app.core.tokenizer import count_tokens
+from app.core import llm_client
 
 # -----------------------------------------------------------------------------
 # 1. OpenAI 클라이언트 초기화 (싱글톤)
@@ -31,11 +36,29 @@ def get_openai_client_for_embedding() -> OpenAI:
 # 2. 임베딩 생성 함수
 # -----------------------------------------------------------------------------
 
+def _request_embeddings(texts_to_embed: List[str]) -> List[List[float]]:
+    """
+    OpenAI 임베딩 API를 한 번 호출하여 입력 순서대로 벡터 리스트를 반환합니다.
+    """
+    client = get_openai_client_for_embedding()
+    settings = get_settings()
+
+    response = client.embeddings.create(
+        model=settings.EMBEDDING_MODEL_NAME, # text-embedding-3-large 사용
+        input=texts_to_embed
+    )
+    
+    # 응답 데이터에서 임베딩 벡터 리스트를 추출합니다.
+    return [data.embedding for data in response.data]
+
 def embed_texts(texts: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
     """
     주어진 텍스트(단일 문자열 또는 문자열 리스트)를 OpenAI 임베딩 API를 사용하여 
     벡터로 변환합니다.
     
+    임베딩 캐시가 켜져 있으면 (모델, 텍스트) 해시로 먼저 디스크 캐시를 조회하고,
+    캐시에 없는 텍스트만 한 번의 API 요청으로 임베딩한 뒤 캐시에 저장합니다.
+    
     Input:
         texts (str | List[str]): 임베딩할 텍스트(들).
         
@@ -43,7 +66,6 @@ def embed_texts(texts: Union[str, List[str]]) -> Union[List[float], List[List[fl
         List[float] | List[List[float]]: 임베딩된 단일 벡터 또는 벡터 리스트.
     """
     
-    client = get_openai_client_for_embedding()
     settings = get_settings()
     is_single_text = isinstance(texts, str)
     
@@ -55,14 +77,25 @@ def embed_texts(texts: Union[str, List[str]]) -> Union[List[float], List[List[fl
         return []
     
     try:
-        # OpenAI 임베딩 API 호출
-        response = client.embeddings.create(
-            model=settings.EMBEDDING_MODEL_NAME, # text-embedding-3-large 사용
-            input=texts_to_embed
-        )
+        cache = get_embedding_cache()
         
-        # 응답 데이터에서 임베딩 벡터 리스트를 추출합니다.
-        embeddings = [data.embedding for data in response.data]
+        if cache is None:
+            embeddings = _request_embeddings(texts_to_embed)
+        else:
+            # 1. 캐시 조회
+            keys = [EmbeddingCache.make_key(settings.EMBEDDING_MODEL_NAME, text) for text in texts_to_embed]
+            cached_vectors = cache.get_many(keys)
+            
+            # 2. 캐시 miss 텍스트만 (중복 제거 후) 한 번에 임베딩
+            missing = {key: text for key, text in zip(keys, texts_to_embed) if key not in cached_vectors}
+            if missing:
+                missing_keys = list(missing.keys())
+                new_vectors = _request_embeddings([missing[key] for key in missing_keys])
+                cache.put_many(zip(missing_keys, new_vectors))
+                cached_vectors.update(zip(missing_keys, new_vectors))
+            
+            # 3. 입력 순서대로 벡터 정렬
+            embeddings = [cached_vectors[key] for key in keys]
         
         # ⚠️ 입력이 단일 텍스트였으면 첫 번째 벡터만 반환합니다. (query_vectorstore에 사용)
         if is_single_text:
@@ -74,4 +107,118 @@ def embed_texts(texts: Union[str, List[str]]) -> Union[List[float], List[List[fl
     except Exception as e:
         print(f"Error during OpenAI embeddings API call: {e}")
         # 임베딩 실패는 RAG 검색 실패로 이어지므로 명확히 에러를 발생시킵니다.
-        raise RuntimeError(f"Failed to generate embeddings: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Failed to generate embeddings: {e}")
+
+# -----------------------------------------------------------------------------
+# 3. 토큰 기준 동시 배치 임베딩 (색인 스크립트용)
+# -----------------------------------------------------------------------------
+
+def split_into_token_batches(
+    texts: List[str],
+    max_tokens_per_batch: int,
+    max_inputs_per_batch: int
+) -> List[List[int]]:
+    """
+    텍스트 인덱스를 토큰 수 합계와 입력 개수 제한을 넘지 않는 배치로 나눕니다.
+    (제한보다 긴 단일 텍스트는 혼자 하나의 배치가 됩니다.)
+    """
+    settings = get_settings()
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text, settings.EMBEDDING_MODEL_NAME)
+        if current and (current_tokens + tokens > max_tokens_per_batch or len(current) >= max_inputs_per_batch):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+async def _embed_batch_with_retry(batch_texts: List[str], max_retries: int) -> List[List[float]]:
+    """
+    공유 비동기 OpenAI 클라이언트로 배치 하나를 임베딩하고, 실패하면 지수 백오프(+jitter)로 재시도합니다.
+    """
+    settings = get_settings()
+    client = llm_client.get_openai_client()
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.embeddings.create(
+                model=settings.EMBEDDING_MODEL_NAME,
+                input=batch_texts
+            )
+            # 응답 순서를 index 기준으로 보장합니다.
+            return [data.embedding for data in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+            print(f"⚠️ 임베딩 배치 실패 ({len(batch_texts)}개, {attempt + 1}회): {e} -> {delay:.1f}s 후 재시도")
+            await asyncio.sleep(delay)
+
+async def embed_texts_batched(
+    texts: List[str],
+    max_tokens_per_batch: Optional[int] = None,
+    max_inputs_per_batch: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    max_retries: Optional[int] = None
+) -> List[List[float]]:
+    """
+    대량의 텍스트를 토큰 수 기준 배치로 나누어 제한된 동시성으로 임베딩합니다.
+    
+    - 임베딩 캐시에 있는 텍스트는 API를 호출하지 않습니다.
+    - 배치는 최대 max_concurrency개까지 동시에 요청되고, 실패한 배치만 재시도합니다.
+    - 반환되는 벡터는 항상 입력 순서와 같습니다.
+    
+    Input:
+        texts (List[str]): 임베딩할 텍스트 리스트.
+        (나머지 인자를 생략하면 settings.py의 EMBEDDING_* 값을 사용합니다.)
+        
+    Output:
+        List[List[float]]: 입력 순서대로 정렬된 벡터 리스트.
+    """
+    settings = get_settings()
+    max_tokens_per_batch = max_tokens_per_batch or settings.EMBEDDING_BATCH_MAX_TOKENS
+    max_inputs_per_batch = max_inputs_per_batch or settings.EMBEDDING_BATCH_MAX_INPUTS
+    max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+    max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+
+    if not texts:
+        return []
+
+    # 1. 캐시 조회 후 miss 텍스트만 (중복 제거하여) 임베딩 대상으로 삼습니다.
+    cache = get_embedding_cache()
+    keys = [EmbeddingCache.make_key(settings.EMBEDDING_MODEL_NAME, text) for text in texts]
+    vectors_by_key = cache.get_many(keys) if cache is not None else {}
+    missing = {key: text for key, text in zip(keys, texts) if key not in vectors_by_key}
+
+    if missing:
+        missing_keys = list(missing.keys())
+        missing_texts = [missing[key] for key in missing_keys]
+        batches = split_into_token_batches(missing_texts, max_tokens_per_batch, max_inputs_per_batch)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_batch(batch_indices: List[int]) -> None:
+            async with semaphore:
+                batch_vectors = await _embed_batch_with_retry(
+                    [missing_texts[i] for i in batch_indices], max_retries
+                )
+            batch_keys = [missing_keys[i] for i in batch_indices]
+            vectors_by_key.update(zip(batch_keys, batch_vectors))
+            if cache is not None:
+                await asyncio.to_thread(cache.put_many, list(zip(batch_keys, batch_vectors)))
+
+        print(f"🔄 임베딩 {len(missing_texts)}개를 {len(batches)}개 배치로 요청합니다. (동시성 {max_concurrency})")
+        try:
+            await asyncio.gather(*(run_batch(batch) for batch in batches))
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate embeddings: {e}")
+
+    # 2. 입력 순서대로 정렬하여 반환
+    return [vectors_by_key[key] for key in keys]
+
@@ -0,0 +1,93 @@
+# app/core/index_manifest.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. 증분 색인용 청크 매니페스트
+# -----------------------------------------------------------------------------
+
+class IndexManifest:
+    """
+    색인된 청크의 (vector id -> 콘텐츠 해시)를 출처(source)별로 기록하는 로컬 JSON 파일입니다.
+
+    색인 스크립트는 새로 만든 청크를 매니페스트와 비교하여
+    - 해시가 같은 청크는 건너뛰고,
+    - 새로 생기거나 바뀐 청크만 임베딩/업로드하고,
+    - 매니페스트에는 있지만 이번에 사라진 id는 벡터 저장소에서 삭제합니다.
+
+    매니페스트는 색인 대상(백엔드 + 인덱스 이름/경로)별로 따로 기록되므로
+    백엔드를 바꾸면 처음부터 다시 색인됩니다.
+    """
+
+    def __init__(self, path: str, target: str):
+        self.path = Path(path)
+        self.target = target
+        self._data: Dict[str, Dict[str, Dict[str, str]]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+
+    @property
+    def _sources(self) -> Dict[str, Dict[str, str]]:
+        return self._data.setdefault(self.target, {})
+
+    @staticmethod
+    def hash_chunk(text: str, metadata: Dict[str, Any]) -> str:
+        """청크 텍스트와 메타데이터로 콘텐츠 해시를 만듭니다. (메타데이터만 바뀌어도 다시 업로드)"""
+        payload = json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def sources(self, prefix: str = "") -> List[str]:
+        """기록된 출처 목록을 반환합니다. (prefix로 색인 스크립트별 출처만 고를 수 있습니다)"""
+        return [source for source in self._sources if source.startswith(prefix)]
+
+    def diff(self, source: str, chunk_hashes: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """
+        출처의 새 청크 해시({id: hash})를 기록과 비교합니다.
+
+        Returns:
+            (changed_ids, stale_ids): 새로 생기거나 바뀐 id, 사라진 id.
+        """
+        previous = self._sources.get(source, {})
+        changed_ids = [vector_id for vector_id, digest in chunk_hashes.items() if previous.get(vector_id) != digest]
+        stale_ids = [vector_id for vector_id in previous if vector_id not in chunk_hashes]
+        return changed_ids, stale_ids
+
+    def ids(self, source: str) -> List[str]:
+        return list(self._sources.get(source, {}).keys())
+
+    def update(self, source: str, chunk_hashes: Dict[str, str]) -> None:
+        """출처의 청크 기록을 교체합니다. (업로드/삭제가 성공한 뒤에 호출)"""
+        self._sources[source] = dict(chunk_hashes)
+
+    def remove(self, source: str) -> None:
+        self._sources.pop(source, None)
+
+    def save(self) -> None:
+        """매니페스트를 원자적으로 저장합니다."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+# -----------------------------------------------------------------------------
+# 2. 매니페스트 로드
+# -----------------------------------------------------------------------------
+
+def load_index_manifest(path: Optional[str] = None) -> IndexManifest:
+    """
+    현재 벡터 저장소 설정에 해당하는 매니페스트를 불러옵니다.
+    """
+    settings = get_settings()
+    if settings.VECTORSTORE_BACKEND == "local":
+        target = f"local:{settings.LOCAL_VECTORSTORE_PATH}"
+    else:
+        target = f"pinecone:{settings.PINECONE_INDEX_NAME}"
+    return IndexManifest(path or settings.INDEX_MANIFEST_PATH, target)
@@ -0,0 +1,117 @@
+# app/core/ingestion.py
+
+import asyncio
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core import embeddings, vectorstore
+from app.core.settings import get_settings
+from app.core.vectorstore import VectorTuple
+
+# (vector id, 청크 텍스트, 메타데이터)
+ChunkRecord = Tuple[str, str, Dict[str, Any]]
+
+_DONE = object() # 큐 종료 표시
+
+# -----------------------------------------------------------------------------
+# 1. 스트리밍 색인 파이프라인 (parse → embed → upsert)
+# -----------------------------------------------------------------------------
+
+def _next_batch(iterator: Iterator[ChunkRecord], size: int) -> List[ChunkRecord]:
+    """이터레이터에서 최대 size개의 레코드를 꺼냅니다. (스레드에서 실행되어 파싱이 이벤트 루프를 막지 않습니다)"""
+    batch = []
+    for record in iterator:
+        batch.append(record)
+        if len(batch) >= size:
+            break
+    return batch
+
+async def run_ingestion_pipeline(
+    records: Iterable[ChunkRecord],
+    embed_batch_size: Optional[int] = None,
+    upsert_batch_size: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    embed_workers: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    청크 레코드를 스트리밍으로 임베딩하고 벡터 저장소에 업로드합니다.
+
+    각 단계는 크기가 제한된 asyncio 큐로 연결됩니다.
+    - parse: records 이터레이터(파싱/청킹)를 스레드에서 embed_batch_size개씩 꺼내 큐에 넣습니다.
+    - embed: embed_workers개의 작업자가 배치를 동시에 임베딩합니다.
+    - upsert: 임베딩된 벡터를 upsert_batch_size개씩 모아 업로드합니다.
+
+    큐가 가득 차면 앞 단계가 기다리므로(backpressure) 메모리에는 항상
+    몇 개의 배치만 올라가고, 전체 소요 시간은 가장 느린 단계에 가까워집니다.
+
+    Returns:
+        Dict[str, int]: {"embedded": 임베딩한 청크 수, "upserted": 업로드한 벡터 수}
+    """
+    settings = get_settings()
+    embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+    upsert_batch_size = upsert_batch_size or settings.INGEST_UPSERT_BATCH_SIZE
+    queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+    embed_workers = embed_workers or settings.EMBEDDING_MAX_CONCURRENCY
+
+    embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = {"embedded": 0, "upserted": 0}
+
+    async def parse_stage() -> None:
+        iterator = iter(records)
+        while True:
+            batch = await asyncio.to_thread(_next_batch, iterator, embed_batch_size)
+            if not batch:
+                break
+            await embed_queue.put(batch)
+        for _ in range(embed_workers):
+            await embed_queue.put(_DONE)
+
+    async def embed_stage() -> None:
+        while True:
+            batch = await embed_queue.get()
+            if batch is _DONE:
+                break
+            # 동시성은 작업자 수로 조절하므로 배치 하나는 요청 하나로 보냅니다.
+            vectors = await embeddings.embed_texts_batched(
+                [text for _, text, _ in batch], max_concurrency=1
+            )
+            stats["embedded"] += len(batch)
+            await upsert_queue.put([
+                (vector_id, vector, metadata) for (vector_id, _, metadata), vector in zip(batch, vectors)
+            ])
+
+    async def upsert_stage() -> None:
+        pending: List[VectorTuple] = []
+        finished_workers = 0
+        while finished_workers < embed_workers:
+            item = await upsert_queue.get()
+            if item is _DONE:
+                finished_workers += 1
+            else:
+                pending.extend(item)
+            # 모인 벡터를 upsert_batch_size 단위로, 마지막에는 남은 것까지 업로드합니다.
+            while len(pending) >= upsert_batch_size or (pending and finished_workers == embed_workers):
+                batch, pending = pending[:upsert_batch_size], pending[upsert_batch_size:]
+                await asyncio.to_thread(vectorstore.upsert_vectors, batch)
+                stats["upserted"] += len(batch)
+                print(f"  📤 누적 {stats['upserted']}개 벡터 업로드 완료.")
+
+    async def embed_worker() -> None:
+        try:
+            await embed_stage()
+        finally:
+            await upsert_queue.put(_DONE)
+
+    tasks = [asyncio.create_task(parse_stage()), asyncio.create_task(upsert_stage())]
+    tasks += [asyncio.create_task(embed_worker()) for _ in range(embed_workers)]
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # 한 단계가 실패하면 나머지 단계도 중단합니다. (큐에서 기다리는 작업이 남지 않도록)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return stats
@@ -1,30 +1,63 @@
 # app/core/llm_client.py
 
-from typing import List, Dict, Any, Optional
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+import httpx
 from fastapi import HTTPException
-from openai import OpenAI
+from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
 from app.core.settings import get_settings
+from app.core.response_cache import ResponseCache, get_response_cache
+from app.core.single_flight import SingleFlight
+from app.core.tokenizer import count_tokens
 
 # -----------------------------------------------------------------------------
-# 1. OpenAI 클라이언트 초기화 (싱글톤)
+# 1. OpenAI 비동기 클라이언트 초기화 (싱글톤 + 커넥션 풀)
 # -----------------------------------------------------------------------------
 
-# 전역 변수로 OpenAI 클라이언트 인스턴스를 저장합니다.
-_openai_client: Optional[OpenAI] = None
+# 전역 변수로 AsyncOpenAI 클라이언트와 공유 HTTP 커넥션 풀을 저장합니다.
+# 모든 서비스(app/services/*)와 RAG 파이프라인이 이 클라이언트 하나를 함께 사용합니다.
+_openai_client: Optional[AsyncOpenAI] = None
+_http_client: Optional[httpx.AsyncClient] = None
 
-def get_openai_client() -> OpenAI:
+def _build_http_client() -> httpx.AsyncClient:
     """
-    OpenAI 클라이언트를 초기화하고 싱글톤 인스턴스를 반환합니다.
+    keep-alive 커넥션을 재사용하는 httpx 비동기 커넥션 풀을 생성합니다.
+    풀 크기와 타임아웃은 settings.py에서 조정합니다.
+    """
+    settings = get_settings()
+
+    limits = httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.LLM_REQUEST_TIMEOUT,
+        connect=settings.LLM_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    AsyncOpenAI 클라이언트를 초기화하고 싱글톤 인스턴스를 반환합니다.
     API 키는 settings.py에서 로드됩니다.
     """
-    global _openai_client
+    global _openai_client, _http_client
     settings = get_settings()
     
     if _openai_client is None:
         try:
-            # settings.py에서 로드된 API 키를 사용하여 클라이언트 초기화
-            _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            # settings.py에서 로드된 API 키와 공유 커넥션 풀로 클라이언트 초기화
+            _http_client = _build_http_client()
+            _openai_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                http_client=_http_client,
+                max_retries=settings.LLM_MAX_RETRIES,
+            )
             # print("OpenAI client initialized.") # 디버깅 시 활용
         except Exception as e:
             # API 키가 유효하지 않거나 로딩에 실패한 경우
@@ -32,13 +65,179 @@ def get_openai_client() -> OpenAI:
             
     return _openai_client
 
+async def close_openai_client() -> None:
+    """
+    애플리케이션 종료 시 공유 커넥션 풀을 닫습니다. (main.py의 shutdown 이벤트에서 호출)
+    """
+    global _openai_client, _http_client
+
+    if _openai_client is not None:
+        await _openai_client.close()
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+
+    _openai_client = None
+    _http_client = None
+
 # -----------------------------------------------------------------------------
-# 2. LLM 응답 생성 함수
+# 2. 모델 라우팅 (요청 난이도에 따른 small / large 모델 선택)
 # -----------------------------------------------------------------------------
 
-async def generate_response(
+# 추론/비교/상세 설명을 요구하는 질문의 단서 (난이도 신호)
+_HARD_QUESTION_PATTERN = re.compile(
+    r"왜|어떻게|차이|비교|원리|단계별|자세히|구체적|분석|장단점|설계|코드|예시를\s*들"
+    r"|\b(why|how|compare|difference|step[- ]by[- ]step|in detail|analy[sz]e|code)\b",
+    re.IGNORECASE
+)
+
+# 라우트별 모델 선택 횟수 / 재시도(escalation) 횟수 (/cache/stats에서 조회)
+_routing_stats: Dict[str, Dict[str, int]] = {}
+
+def _routing_policy(route: Optional[str]) -> str:
+    """라우트의 모델 선택 정책을 반환합니다. ('rag:flour'처럼 ':' 뒤가 붙은 라우트는 앞부분으로도 찾습니다)"""
+    policies = get_settings().LLM_ROUTING_POLICIES
+    if route is not None:
+        for name in (route, route.split(":", 1)[0]):
+            if name in policies:
+                return policies[name]
+    return policies.get("default", "fixed")
+
+def estimate_difficulty(full_conversation: List[ChatCompletionMessageParam]) -> int:
+    """
+    요청 난이도를 0~3으로 대략 추정합니다. (API 호출 없이 마지막 질문과 대화 길이만 봅니다)
+    - 추론/비교/상세 설명을 요구하는 표현이 있으면 +1
+    - 마지막 질문이 길면 +1
+    - 여러 턴 이어진 대화이면 +1
+    """
+    settings = get_settings()
+    user_messages = [str(message.get("content") or "") for message in full_conversation if message.get("role") == "user"]
+    last_question = user_messages[-1] if user_messages else ""
+
+    difficulty = 0
+    if _HARD_QUESTION_PATTERN.search(last_question):
+        difficulty += 1
+    if count_tokens(last_question, settings.LLM_MODEL_NAME) > settings.LLM_ROUTING_LONG_QUESTION_TOKENS:
+        difficulty += 1
+    if len(user_messages) > settings.LLM_ROUTING_MAX_SIMPLE_TURNS:
+        difficulty += 1
+    return difficulty
+
+def select_model(
+    route: Optional[str],
     full_conversation: List[ChatCompletionMessageParam],
     model_name: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    라우트 정책(settings.LLM_ROUTING_POLICIES)에 따라 이번 요청에 사용할 모델을 고릅니다.
+
+    - fixed: 호출한 쪽이 지정한 모델(없으면 LLM_MODEL_NAME)을 그대로 사용
+    - small / large: 항상 작은 / 큰 모델
+    - auto: 프롬프트가 짧고 난이도가 낮으면 작은 모델, 아니면 큰 모델
+
+    Output:
+        (모델 이름, 등급: 'fixed' | 'small' | 'large')
+    """
+    settings = get_settings()
+    requested_model = model_name if model_name else settings.LLM_MODEL_NAME
+
+    policy = _routing_policy(route) if settings.LLM_ROUTING_ENABLED else "fixed"
+    if policy == "auto":
+        is_simple = (
+            count_message_tokens(full_conversation) <= settings.LLM_ROUTING_SMALL_MAX_PROMPT_TOKENS
+            and estimate_difficulty(full_conversation) <= settings.LLM_ROUTING_SMALL_MAX_DIFFICULTY
+        )
+        policy = "small" if is_simple else "large"
+
+    if policy == "small":
+        model, tier = settings.LLM_SMALL_MODEL_NAME, "small"
+    elif policy == "large":
+        model, tier = settings.LLM_LARGE_MODEL_NAME, "large"
+    else:
+        model, tier = requested_model, "fixed"
+    return model, tier
+
+def _record_routing(route: Optional[str], tier: str) -> None:
+    """캐시 miss로 실제 API를 호출한 요청의 모델 등급(또는 'escalated')을 라우트별로 누적합니다."""
+    stats = _routing_stats.setdefault(route or "default", {"fixed": 0, "small": 0, "large": 0, "escalated": 0})
+    stats[tier] += 1
+
+def _is_low_confidence(completion: Any) -> bool:
+    """작은 모델의 응답이 잘렸거나 토큰 평균 logprob이 기준보다 낮으면 확신이 낮은 것으로 봅니다."""
+    choice = completion.choices[0]
+    if choice.finish_reason == "length" and not choice.message.content:
+        return True
+    tokens = choice.logprobs.content if choice.logprobs is not None and choice.logprobs.content else []
+    if not tokens:
+        return False
+    average_logprob = sum(token.logprob for token in tokens) / len(tokens)
+    return average_logprob < get_settings().LLM_ESCALATION_MIN_AVG_LOGPROB
+
+def get_routing_stats() -> Dict[str, Dict[str, int]]:
+    """라우트별 모델 등급 선택 횟수와 큰 모델로 다시 호출한 횟수를 반환합니다."""
+    return {route: dict(stats) for route, stats in _routing_stats.items()}
+
+# -----------------------------------------------------------------------------
+# 3. LLM 응답 생성 함수
+# -----------------------------------------------------------------------------
+
+def _response_cache_key(
+    route: Optional[str],
+    prompt_version: str,
+    target_model: str,
+    full_conversation: List[ChatCompletionMessageParam],
+    temperature: Optional[float],
+    max_tokens: Optional[int] = None
+) -> Optional[str]:
+    """
+    route가 지정되고 응답 캐시가 켜져 있을 때만 캐시 키를 만듭니다. (아니면 None)
+    """
+    if route is None or get_response_cache() is None:
+        return None
+    return ResponseCache.make_key(route, target_model, prompt_version, full_conversation, temperature, max_tokens)
+
+# 진행 중인 동일 요청을 하나의 API 호출로 합칩니다.
+_llm_flight = SingleFlight()
+
+def get_single_flight_stats() -> Dict[str, int]:
+    """동일 요청 합치기(single-flight) 실행/합쳐진 요청 수를 반환합니다."""
+    return _llm_flight.stats()
+
+# 라우트별 프롬프트 토큰 / provider prefix 캐시 적중 토큰 누적값 (/cache/stats에서 조회)
+_prompt_usage: Dict[str, Dict[str, int]] = {}
+
+def _record_usage(route: Optional[str], usage: Any) -> None:
+    """API 응답의 usage에서 prompt_tokens와 cached_tokens를 라우트별로 누적합니다."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+    stats = _prompt_usage.setdefault(route or "default", {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+    stats["requests"] += 1
+    stats["prompt_tokens"] += usage.prompt_tokens or 0
+    stats["cached_tokens"] += cached_tokens
+
+def get_prompt_usage_stats() -> Dict[str, Dict[str, Any]]:
+    """라우트별 프롬프트 토큰 수와 prefix 캐시 적중 비율을 반환합니다."""
+    return {
+        route: {**stats, "cached_ratio": (stats["cached_tokens"] / stats["prompt_tokens"]) if stats["prompt_tokens"] else 0.0}
+        for route, stats in _prompt_usage.items()
+    }
+
+
+# 서비스(app/services/*)는 모듈 상수로 ROUTE, PROMPT_VERSION, MODEL_NAME, TEMPERATURE, SYSTEM_PROMPT를 두고
+# 아래 함수들에 그대로 넘깁니다.
+# - ROUTE: 응답 캐시 키와 라우트별 통계(/cache/stats)에 쓰이는 라우트 이름
+# - PROMPT_VERSION: SYSTEM_PROMPT를 수정하면 올려서 이전 응답 캐시를 무효화합니다.
+# - SYSTEM_PROMPT: 요청마다 다시 만들지 않고 상수로 두어 매번 같은 바이트열을 보냅니다. (provider prefix 캐시 적중)
+
+async def generate_response(
+    full_conversation: List[ChatCompletionMessageParam],
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    route: Optional[str] = None,
+    prompt_version: str = "",
+    max_tokens: Optional[int] = None
 ) -> str:
     """
     구성된 전체 대화 목록(system prompt 포함)을 OpenAI API에 전송하고 
@@ -48,6 +247,11 @@ async def generate_response(
         full_conversation (List[ChatCompletionMessageParam]): 
             {"role": "system"/"user"/"assistant", "content": "..."} 형태의 메시지 목록
         model_name (str, optional): 사용할 모델 이름. 지정하지 않으면 settings.py의 기본값 사용.
+            (라우트 정책이 fixed일 때만 그대로 쓰이며, small/large/auto이면 select_model이 고릅니다.)
+        temperature (float, optional): 샘플링 온도. 지정하지 않으면 API 기본값 사용.
+        route (str, optional): 호출한 라우트 이름 (예: 'few_shot', 'quiz'). 지정하면 응답 캐시를 사용합니다.
+        prompt_version (str): system 프롬프트 버전. 프롬프트를 바꾸면 올려서 이전 캐시를 무효화합니다.
+        max_tokens (int, optional): 응답 최대 토큰 수. 지정하지 않으면 API 기본값 사용.
         
     Output:
         str: LLM의 응답 텍스트.
@@ -55,34 +259,268 @@ async def generate_response(
     client = get_openai_client()
     settings = get_settings()
     
-    # 사용할 모델 결정 (함수 인자가 우선, 없으면 설정값 사용)
-    target_model = model_name if model_name else settings.LLM_MODEL_NAME
+    # 사용할 모델 결정 (라우트 정책에 따라 small/large 선택, 정책이 fixed이면 함수 인자 또는 설정값 사용)
+    target_model, tier = select_model(route, full_conversation, model_name)
+
+    # 작은 모델의 확신이 낮으면 큰 모델로 다시 호출합니다. (확신도 판단용 logprobs 요청)
+    escalate_on_low_confidence = tier == "small" and settings.LLM_ESCALATION_ENABLED
+
+    # 캐시 조회 (같은 라우트/모델/프롬프트 버전/대화이면 저장된 응답을 바로 반환)
+    # 큰 모델로 다시 호출한 응답은 큰 모델 키에 저장되므로, 작은 모델 키에 없으면 그쪽도 찾습니다.
+    cache_key = _response_cache_key(route, prompt_version, target_model, full_conversation, temperature, max_tokens)
+    escalated_cache_key = _response_cache_key(
+        route, prompt_version, settings.LLM_LARGE_MODEL_NAME, full_conversation, temperature, max_tokens
+    ) if escalate_on_low_confidence else None
+    for key in (cache_key, escalated_cache_key):
+        if key is not None:
+            cached_text = get_response_cache().get(key)
+            if cached_text is not None:
+                return cached_text
+
+    completion_kwargs: Dict[str, Any] = {}
+    if temperature is not None:
+        completion_kwargs["temperature"] = temperature
+    if max_tokens is not None:
+        completion_kwargs["max_tokens"] = max_tokens
+
+    async def complete() -> str:
+        _record_routing(route, tier)
+        response_cache_key = cache_key
+        try:
+            # Chat Completion API 호출 (이벤트 루프를 막지 않도록 await)
+            completion = await client.chat.completions.create(
+                model=target_model,
+                messages=full_conversation,
+                **completion_kwargs,
+                **({"logprobs": True} if escalate_on_low_confidence else {})
+            )
+            _record_usage(route, completion.usage)
+
+            if escalate_on_low_confidence and _is_low_confidence(completion):
+                _record_routing(route, "escalated")
+                response_cache_key = escalated_cache_key
+                completion = await client.chat.completions.create(
+                    model=settings.LLM_LARGE_MODEL_NAME,
+                    messages=full_conversation,
+                    **completion_kwargs
+                )
+                _record_usage(route, completion.usage)
+
+            # 응답 텍스트 추출
+            gpt_response_text = completion.choices[0].message.content
+            
+            # 응답이 None일 경우 예외 처리
+            if gpt_response_text is None:
+                 raise ValueError("LLM returned an empty response.")
+            
+            # 응답을 만든 모델의 키로 저장합니다. (큰 모델 응답이 작은 모델 키에 섞이지 않도록)
+            if response_cache_key is not None:
+                get_response_cache().set(response_cache_key, gpt_response_text)
+            
+            return gpt_response_text
+            
+        except Exception as e:
+            # API 통신 오류, 모델 오류 등 발생 시
+            print(f"Error calling OpenAI API ({target_model}): {e}")
+            # 실제 서비스에서는 에러 로깅 후 사용자에게 적절한 메시지를 반환해야 합니다.
+            raise HTTPException(status_code=500, detail="LLM 응답 생성 중 오류가 발생했습니다.")
+
+    if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+        return await complete()
+
+    # 같은 요청이 이미 진행 중이면 새로 호출하지 않고 그 결과를 함께 기다립니다. (수업 중 동시 요청 등)
+    flight_key = ResponseCache.make_key(
+        route or "", target_model, prompt_version, full_conversation, temperature, max_tokens
+    )
+    return await _llm_flight.do(flight_key, complete)
+
+
+async def stream_response(
+    full_conversation: List[ChatCompletionMessageParam],
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    route: Optional[str] = None,
+    prompt_version: str = ""
+) -> AsyncIterator[str]:
+    """
+    generate_response와 같은 대화 목록을 스트리밍 모드로 전송하고,
+    LLM이 생성하는 토큰 조각(delta)을 도착하는 즉시 순서대로 yield 합니다.
+    
+    Input:
+        full_conversation (List[ChatCompletionMessageParam]): system prompt 포함 메시지 목록
+        model_name (str, optional): 사용할 모델 이름. 지정하지 않으면 settings.py의 기본값 사용.
+            (라우트 정책이 fixed일 때만 그대로 쓰이며, small/large/auto이면 select_model이 고릅니다.)
+        temperature (float, optional): 샘플링 온도. 지정하지 않으면 API 기본값 사용.
+        route (str, optional): 호출한 라우트 이름. 지정하면 generate_response와 같은 응답 캐시를 사용합니다.
+        prompt_version (str): system 프롬프트 버전.
+        
+    Output:
+        AsyncIterator[str]: 응답 텍스트 조각.
+    """
+    client = get_openai_client()
+
+    # 스트리밍은 이미 보낸 토큰을 되돌릴 수 없으므로 라우팅만 하고 큰 모델 재호출은 하지 않습니다.
+    target_model, tier = select_model(route, full_conversation, model_name)
+
+    # 캐시 적중 시 저장된 전체 응답을 한 번에 보냅니다.
+    cache_key = _response_cache_key(route, prompt_version, target_model, full_conversation, temperature)
+    if cache_key is not None:
+        cached_text = get_response_cache().get(cache_key)
+        if cached_text is not None:
+            yield cached_text
+            return
+
+    _record_routing(route, tier)
+    collected_tokens: List[str] = []
+
+    completion_kwargs: Dict[str, Any] = {}
+    if temperature is not None:
+        completion_kwargs["temperature"] = temperature
 
     try:
-        # Chat Completion API 호출
-        completion = client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model=target_model,
-            messages=full_conversation
+            messages=full_conversation,
+            stream=True,
+            stream_options={"include_usage": True}, # 마지막 청크로 usage(cached_tokens 포함)를 받습니다.
+            **completion_kwargs
         )
-        
-        # 응답 텍스트 추출
-        gpt_response_text = completion.choices[0].message.content
-        
-        # 응답이 None일 경우 예외 처리
-        if gpt_response_text is None:
-             raise ValueError("LLM returned an empty response.")
-        
-        return gpt_response_text
-        
+
+        async for chunk in stream:
+            if chunk.usage is not None:
+                _record_usage(route, chunk.usage)
+            # usage 전용 청크 등 choices가 비어 있는 청크는 건너뜁니다.
+            if not chunk.choices:
+                continue
+            delta_text = chunk.choices[0].delta.content
+            if delta_text:
+                collected_tokens.append(delta_text)
+                yield delta_text
+
     except Exception as e:
-        # API 통신 오류, 모델 오류 등 발생 시
-        print(f"Error calling OpenAI API ({target_model}): {e}")
-        # 실제 서비스에서는 에러 로깅 후 사용자에게 적절한 메시지를 반환해야 합니다.
+        print(f"Error streaming from OpenAI API ({target_model}): {e}")
         raise HTTPException(status_code=500, detail="LLM 응답 생성 중 오류가 발생했습니다.")
 
+    # 스트림을 끝까지 받은 경우에만 캐시에 저장합니다.
+    if cache_key is not None and collected_tokens:
+        get_response_cache().set(cache_key, "".join(collected_tokens))
+
+
+# -----------------------------------------------------------------------------
+# 4. 대화 기록 압축 (토큰 예산 + 누적 요약)
+# -----------------------------------------------------------------------------
+
+HISTORY_SUMMARY_ROUTE = "history_summary"
+HISTORY_SUMMARY_PROMPT_VERSION = "1"
+HISTORY_SUMMARY_SYSTEM_PROMPT = (
+    "당신은 튜터와 학습자의 대화를 요약하는 도우미입니다. "
+    "이전 요약(있다면)과 이어지는 대화를 합쳐, 학습자가 무엇을 물었고 튜터가 무엇을 설명했는지 "
+    "이후 대화에 필요한 사실만 한국어로 간결하게 요약하세요."
+)
+
+# 요약한 대화 구간(앞부분 메시지들)의 해시 -> 요약문. 같은 세션의 다음 턴은 가장 긴 요약을 이어서 사용합니다.
+_history_summaries: "OrderedDict[str, str]" = OrderedDict()
+
+def count_message_tokens(messages: List[ChatCompletionMessageParam]) -> int:
+    """메시지 목록의 토큰 수를 셉니다. (메시지마다 역할/구분자 몫으로 4토큰을 더합니다)"""
+    settings = get_settings()
+    return sum(count_tokens(str(message.get("content") or ""), settings.LLM_MODEL_NAME) + 4 for message in messages)
+
+def _prefix_hashes(messages: List[ChatCompletionMessageParam]) -> List[str]:
+    """messages[:i+1]마다의 누적 해시 목록을 반환합니다."""
+    digest = hashlib.sha256()
+    hashes = []
+    for message in messages:
+        digest.update(json.dumps([message.get("role"), message.get("content")], ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\x00")
+        hashes.append(digest.hexdigest())
+    return hashes
+
+async def _summarize_history(messages: List[ChatCompletionMessageParam]) -> str:
+    """
+    오래된 대화 구간을 요약합니다. 이전 턴에서 앞부분을 이미 요약했다면 그 요약에 새 메시지만 더해 요약합니다.
+    """
+    settings = get_settings()
+    hashes = _prefix_hashes(messages)
+
+    # 캐시된 가장 긴 앞부분 요약을 찾습니다.
+    previous_summary, start = "", 0
+    for end in range(len(messages), 0, -1):
+        cached = _history_summaries.get(hashes[end - 1])
+        if cached is not None:
+            _history_summaries.move_to_end(hashes[end - 1])
+            previous_summary, start = cached, end
+            break
+
+    if start == len(messages):
+        return previous_summary
+
+    transcript = "\n".join(
+        f"{'학습자' if message.get('role') == 'user' else '튜터'}: {message.get('content')}"
+        for message in messages[start:]
+    )
+    summary = await generate_response(
+        [
+            {"role": "system", "content": HISTORY_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": f"[이전 요약]\n{previous_summary or '(없음)'}\n\n[이어지는 대화]\n{transcript}"},
+        ],
+        model_name=settings.HISTORY_SUMMARY_MODEL,
+        temperature=0,
+        route=HISTORY_SUMMARY_ROUTE,
+        prompt_version=HISTORY_SUMMARY_PROMPT_VERSION,
+        max_tokens=settings.HISTORY_SUMMARY_MAX_TOKENS
+    )
+
+    _history_summaries[hashes[-1]] = summary
+    while len(_history_summaries) > settings.HISTORY_SUMMARY_CACHE_SIZE:
+        _history_summaries.popitem(last=False)
+    return summary
+
+async def compact_history(
+    history: List[ChatCompletionMessageParam],
+    max_tokens: int,
+    keep_last_turns: Optional[int] = None
+) -> List[ChatCompletionMessageParam]:
+    """
+    이전 대화 기록을 토큰 예산 안으로 줄입니다.
+
+    - 예산 안이면 대화가 길어도 그대로 반환합니다. (요약 호출 없음)
+    - 최근 keep_last_turns 턴(user+assistant 쌍)은 그대로 둡니다.
+    - 그보다 오래된 메시지는 누적 요약 하나(system 메시지)로 바꿉니다. 요약은 대화 구간의 해시로 캐시되어
+      다음 턴에는 새로 밀려난 메시지만 더해 요약합니다.
+    - 그래도 예산을 넘으면 가장 오래된 메시지부터 버립니다. (요약이 실패해도 같은 방식으로 줄입니다)
+
+    Output:
+        List[ChatCompletionMessageParam]: [요약(선택)] + 최근 메시지.
+    """
+    settings = get_settings()
+    keep_last_turns = keep_last_turns if keep_last_turns is not None else settings.HISTORY_KEEP_LAST_TURNS
+
+    if not history or count_message_tokens(history) <= max_tokens:
+        return list(history)
+
+    split = max(0, len(history) - keep_last_turns * 2)
+    older, recent = history[:split], list(history[split:])
+
+    compacted: List[ChatCompletionMessageParam] = []
+    if older:
+        try:
+            summary = await _summarize_history(older)
+            compacted.append({"role": "system", "content": f"[이전 대화 요약]\n{summary}"})
+        except Exception as e:
+            print(f"History summarization failed, dropping older turns: {e}")
+
+    # 예산을 넘으면 오래된 메시지부터 버립니다. (요약 → 최근 메시지 순)
+    while compacted and count_message_tokens(compacted + recent) > max_tokens:
+        compacted.pop()
+    while recent and count_message_tokens(recent) > max_tokens:
+        recent.pop(0)
+
+    return compacted + recent
+
 
 # -----------------------------------------------------------------------------
-# 3. 개발 편의를 위한 메시지 포맷 변환 함수
+# 5. 개발 편의를 위한 메시지 포맷 변환 함수
 # -----------------------------------------------------------------------------
 
 def format_messages_for_openai(messages_from_client: List[Dict[str, str]]) -> List[ChatCompletionMessageParam]:
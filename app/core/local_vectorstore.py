@@ -0,0 +1,410 @@
+# app/core/local_vectorstore.py
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.ann_index import HNSWIndex
+
+# -----------------------------------------------------------------------------
+# 1. 메타데이터 필터 (Pinecone 필터 문법의 부분 집합)
+# -----------------------------------------------------------------------------
+
+def matches_filter(metadata: Dict[str, Any], metadata_filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Pinecone 스타일 메타데이터 필터를 평가합니다.
+
+    지원 문법:
+        {"technique": "few_shot"}                       # 같음
+        {"technique": {"$eq": "few_shot"}}
+        {"technique": {"$ne": "general"}}
+        {"technique": {"$in": ["few_shot", "react"]}}
+        {"technique": {"$nin": ["general"]}}
+        {"$and": [...]} / {"$or": [...]}
+    """
+    if not metadata_filter:
+        return True
+
+    for field, condition in metadata_filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+
+    return True
+
+# -----------------------------------------------------------------------------
+# 2. 프로세스 내 NumPy 벡터 저장소
+# -----------------------------------------------------------------------------
+
+class LocalVectorStore:
+    """
+    모든 벡터를 정규화된 float32 연속 행렬 하나에 보관하고,
+    행렬-벡터 곱 한 번으로 코사인 유사도 top-k를 계산하는 브루트포스 벡터 저장소입니다.
+
+    - 수천 개 규모의 3072차원 벡터는 1ms 이내에 검색됩니다.
+    - 변경 사항은 flush() 시 디렉토리(vectors.npy + records.json)에 저장됩니다.
+    - 다른 프로세스(색인 스크립트)가 파일을 갱신하면 다음 조회 때 다시 읽어옵니다.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.json"
+
+    def __init__(self, directory: str, dimension: int):
+        self.directory = Path(directory)
+        self.dimension = dimension
+
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._row_by_id: Dict[str, int] = {}
+        # 필터(JSON) -> 만족하는 행 번호. 기법별 검색처럼 같은 필터가 반복되면 파티션처럼 재사용합니다.
+        self._filter_rows: Dict[str, np.ndarray] = {}
+
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._loaded_mtime: Optional[float] = None
+
+        self._load()
+
+    # --- 저장/로드 ---
+
+    def _records_path(self) -> Path:
+        return self.directory / self.RECORDS_FILE
+
+    def _load(self) -> None:
+        records_path = self._records_path()
+        vectors_path = self.directory / self.VECTORS_FILE
+        if not records_path.exists() or not vectors_path.exists():
+            return
+
+        with open(records_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        matrix = np.load(vectors_path)
+
+        self._ids = records["ids"]
+        self._metadata = records["metadata"]
+        self._row_by_id = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._size = len(self._ids)
+        self._filter_rows.clear()
+        self._loaded_mtime = records_path.stat().st_mtime
+        self._on_loaded()
+
+    def _reload_if_changed(self) -> None:
+        """색인 스크립트가 파일을 갱신했다면 (로컬 변경 사항이 없을 때) 다시 읽습니다."""
+        if self._dirty:
+            return
+        records_path = self._records_path()
+        if not records_path.exists():
+            return
+        mtime = records_path.stat().st_mtime
+        if self._loaded_mtime is None or mtime > self._loaded_mtime:
+            self._load()
+
+    def flush(self) -> None:
+        """변경 사항을 디스크에 원자적으로 저장합니다."""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            vectors_tmp = self.directory / (self.VECTORS_FILE + ".tmp")
+            records_tmp = self.directory / (self.RECORDS_FILE + ".tmp")
+
+            with open(vectors_tmp, "wb") as f:
+                np.save(f, self._matrix[:self._size])
+            with open(records_tmp, "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "metadata": self._metadata}, f, ensure_ascii=False)
+
+            # records 파일을 마지막에 교체하여, 다른 프로세스가 항상 짝이 맞는 파일을 읽도록 합니다.
+            os.replace(vectors_tmp, self.directory / self.VECTORS_FILE)
+            self._on_flush()
+            os.replace(records_tmp, self._records_path())
+
+            self._dirty = False
+            self._loaded_mtime = self._records_path().stat().st_mtime
+
+    # --- 하위 클래스/인덱스 확장용 훅 ---
+
+    def _on_loaded(self) -> None:
+        """파일에서 다시 읽은 뒤 호출됩니다."""
+
+    def _on_flush(self) -> None:
+        """디스크에 저장할 때 records 파일을 교체하기 직전에 호출됩니다."""
+
+    # --- 쓰기 ---
+
+    @staticmethod
+    def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, required_rows: int) -> None:
+        """행렬 용량을 두 배씩 늘려 추가 비용을 상각합니다."""
+        capacity = self._matrix.shape[0]
+        if required_rows <= capacity:
+            return
+        new_capacity = max(required_rows, capacity * 2, 64)
+        grown = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def upsert(self, vectors_to_upsert: List[Tuple[str, List[float], Dict[str, Any]]]) -> None:
+        """(id, vector, metadata) 목록을 추가하거나 같은 id를 덮어씁니다."""
+        if not vectors_to_upsert:
+            return
+
+        values = np.asarray([vector for _, vector, _ in vectors_to_upsert], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dimension}, got {values.shape}")
+        values = self._normalize_rows(values)
+
+        with self._lock:
+            self._reload_if_changed()
+            self._ensure_capacity(self._size + len(vectors_to_upsert))
+
+            for (vector_id, _, metadata), vector in zip(vectors_to_upsert, values):
+                row = self._row_by_id.get(vector_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(vector_id)
+                    self._metadata.append(dict(metadata or {}))
+                    self._row_by_id[vector_id] = row
+                else:
+                    self._metadata[row] = dict(metadata or {})
+                self._matrix[row] = vector
+                self._on_row_written(row)
+
+            self._filter_rows.clear()
+            self._dirty = True
+
+    def delete(self, ids: List[str]) -> None:
+        """id 목록에 해당하는 벡터를 삭제합니다. (마지막 행을 빈 자리로 옮겨 행렬을 연속으로 유지)"""
+        with self._lock:
+            self._reload_if_changed()
+            for vector_id in ids:
+                row = self._row_by_id.pop(vector_id, None)
+                if row is None:
+                    continue
+
+                last = self._size - 1
+                self._on_row_removed(row, last)
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = moved_id
+                    self._metadata[row] = self._metadata[last]
+                    self._row_by_id[moved_id] = row
+
+                self._ids.pop()
+                self._metadata.pop()
+                self._size -= 1
+                self._filter_rows.clear()
+                self._dirty = True
+
+    def _on_row_written(self, row: int) -> None:
+        """행이 추가/갱신된 뒤 호출됩니다."""
+
+    def _on_row_removed(self, row: int, last_row: int) -> None:
+        """행이 삭제되기 직전에 호출됩니다. (last_row가 row 자리로 옮겨집니다)"""
+
+    # --- 읽기 ---
+
+    def _candidate_rows(self, metadata_filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        필터를 만족하는 행 번호 배열을 반환합니다. (필터가 없으면 None = 전체)
+        결과는 저장소가 바뀔 때까지 필터별로 캐시됩니다.
+        """
+        if not metadata_filter:
+            return None
+
+        cache_key = json.dumps(metadata_filter, sort_keys=True, ensure_ascii=False)
+        rows = self._filter_rows.get(cache_key)
+        if rows is None:
+            rows = np.fromiter(
+                (row for row in range(self._size) if matches_filter(self._metadata[row], metadata_filter)),
+                dtype=np.int64
+            )
+            self._filter_rows[cache_key] = rows
+        return rows
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include_values: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        코사인 유사도 top-k 검색을 수행합니다.
+
+        Output:
+            [{"id", "score", "metadata", "values"}] — 유사도 내림차순.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        with self._lock:
+            self._reload_if_changed()
+            if self._size == 0 or top_k <= 0:
+                return []
+
+            rows = self._candidate_rows(metadata_filter)
+            if rows is None:
+                scores = self._matrix[:self._size] @ query
+                candidate_rows = None
+            else:
+                if rows.size == 0:
+                    return []
+                scores = self._matrix[rows] @ query
+                candidate_rows = rows
+
+            k = min(top_k, scores.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for position in top:
+                row = int(candidate_rows[position]) if candidate_rows is not None else int(position)
+                results.append({
+                    "id": self._ids[row],
+                    "score": float(scores[position]),
+                    "metadata": self._metadata[row],
+                    "values": self._matrix[row].tolist() if include_values else None,
+                })
+            return results
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """id 목록의 벡터와 메타데이터를 반환합니다. (없는 id는 제외)"""
+        with self._lock:
+            self._reload_if_changed()
+            fetched = {}
+            for vector_id in ids:
+                row = self._row_by_id.get(vector_id)
+                if row is not None:
+                    fetched[vector_id] = {
+                        "id": vector_id,
+                        "values": self._matrix[row].tolist(),
+                        "metadata": self._metadata[row],
+                    }
+            return fetched
+
+    def ids(self) -> List[str]:
+        """저장된 모든 벡터 id를 반환합니다."""
+        with self._lock:
+            self._reload_if_changed()
+            return list(self._ids)
+
+    def __len__(self) -> int:
+        return self._size
+
+# -----------------------------------------------------------------------------
+# 3. HNSW 근사 검색을 사용하는 로컬 벡터 저장소
+# -----------------------------------------------------------------------------
+
+class HNSWLocalVectorStore(LocalVectorStore):
+    """
+    LocalVectorStore에 HNSW 인덱스(app/core/ann_index.py)를 더한 저장소입니다.
+
+    - 필터 없는 검색은 HNSW로 근사 top-k를 찾습니다. (ef_search로 recall/지연 시간 조절)
+    - 메타데이터 필터가 있는 검색은 후보가 이미 작으므로 정확한 브루트포스를 사용합니다.
+    - upsert/delete는 인덱스에 증분 반영되고, flush() 때 hnsw.npz로 함께 저장됩니다.
+    """
+
+    INDEX_FILE = "hnsw.npz"
+    COMPACT_DELETED_RATIO = 0.25 # 삭제 표시 비율이 이 값을 넘으면 flush 때 인덱스를 다시 만듭니다.
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64
+    ):
+        self.ef_search = ef_search
+        self._index_params = (M, ef_construction, ef_search)
+        self.index = HNSWIndex(dimension, M, ef_construction, ef_search)
+        super().__init__(directory, dimension)
+
+    def _index_path(self) -> Path:
+        return self.directory / self.INDEX_FILE
+
+    def _rebuild_index(self) -> None:
+        self.index = HNSWIndex(self.dimension, *self._index_params)
+        for row in range(self._size):
+            self.index.add(self._ids[row], self._matrix[row])
+
+    def _on_loaded(self) -> None:
+        # 저장된 인덱스가 벡터 파일과 같은 id 집합을 갖고 있으면 그대로 쓰고, 아니면 다시 만듭니다.
+        index_path = self._index_path()
+        if index_path.exists():
+            loaded = HNSWIndex.load(str(index_path))
+            if set(loaded.labels()) == set(self._ids):
+                loaded.ef_search = self.ef_search
+                self.index = loaded
+                return
+        self._rebuild_index()
+
+    def _on_flush(self) -> None:
+        if self.index.deleted_ratio > self.COMPACT_DELETED_RATIO:
+            self.index.compact()
+        self.index.save(str(self._index_path()))
+
+    def _on_row_written(self, row: int) -> None:
+        self.index.add(self._ids[row], self._matrix[row])
+
+    def _on_row_removed(self, row: int, last_row: int) -> None:
+        self.index.delete(self._ids[row])
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include_values: bool = False
+    ) -> List[Dict[str, Any]]:
+        if metadata_filter:
+            return super().query(vector, top_k, metadata_filter, include_values)
+
+        with self._lock:
+            self._reload_if_changed()
+            results = []
+            for vector_id, score in self.index.search(vector, top_k, self.ef_search):
+                row = self._row_by_id[vector_id]
+                results.append({
+                    "id": vector_id,
+                    "score": float(score),
+                    "metadata": self._metadata[row],
+                    "values": self._matrix[row].tolist() if include_values else None,
+                })
+            return results
+
@@ -0,0 +1,216 @@
+# app/core/paper_fetcher.py
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. 논문 PDF / 페이지 텍스트 로컬 캐시 (content-addressed)
+# -----------------------------------------------------------------------------
+
+class PaperCache:
+    """
+    다운로드한 PDF와 추출한 페이지 텍스트를 내용 해시(sha256)로 저장하는 디렉토리 캐시입니다.
+
+    - blobs/<sha256>.pdf : PDF 원본
+    - text/<sha256>.json : 페이지별 텍스트 목록
+    - partial/<id>.part  : 이어받기용 다운로드 중간 파일 (+ .json에 ETag 등 기록)
+    - index.json         : 논문 id -> {url, sha256, etag, last_modified}
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        for sub in ("blobs", "text", "partial"):
+            (self.directory / sub).mkdir(parents=True, exist_ok=True)
+        self._index_path = self.directory / "index.json"
+        self._index: Dict[str, Dict[str, Any]] = {}
+        if self._index_path.exists():
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    def entry(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """캐시된 PDF가 실제로 있을 때만 기록을 반환합니다."""
+        entry = self._index.get(paper_id)
+        if entry and self.blob_path(entry["sha256"]).exists():
+            return entry
+        return None
+
+    def set_entry(self, paper_id: str, entry: Dict[str, Any]) -> None:
+        self._index[paper_id] = entry
+
+    def save(self) -> None:
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._index_path)
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.directory / "blobs" / f"{sha256}.pdf"
+
+    def partial_path(self, paper_id: str) -> Path:
+        safe_id = hashlib.sha256(paper_id.encode("utf-8")).hexdigest()[:32]
+        return self.directory / "partial" / f"{safe_id}.part"
+
+    def store_blob(self, partial_path: Path) -> str:
+        """다운로드가 끝난 파일을 해시하여 blobs/로 옮기고 sha256을 반환합니다."""
+        digest = hashlib.sha256()
+        with open(partial_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        os.replace(partial_path, self.blob_path(sha256))
+        return sha256
+
+    def load_page_texts(self, sha256: str) -> List[str]:
+        """
+        PDF의 페이지별 텍스트를 반환합니다. 처음 한 번만 PDF에서 추출하고 이후에는 캐시를 읽습니다.
+        """
+        text_path = self.directory / "text" / f"{sha256}.json"
+        if text_path.exists():
+            with open(text_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        import pymupdf # PDF 추출이 필요할 때만 불러옵니다.
+        with pymupdf.open(self.blob_path(sha256)) as pdf:
+            page_texts = [page.get_text() for page in pdf]
+
+        tmp_path = f"{text_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(page_texts, f, ensure_ascii=False)
+        os.replace(tmp_path, text_path)
+        return page_texts
+
+# -----------------------------------------------------------------------------
+# 2. 비동기 동시 다운로드 (재검증 + 이어받기)
+# -----------------------------------------------------------------------------
+
+async def _download(client: httpx.AsyncClient, cache: PaperCache, paper: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    논문 하나를 내려받습니다.
+
+    - 캐시에 같은 URL의 PDF가 있으면 If-None-Match / If-Modified-Since로 재검증하고, 304면 그대로 씁니다.
+    - 중간 파일이 있으면 Range 요청으로 이어받고, 서버가 200으로 응답하면 처음부터 다시 받습니다.
+    """
+    paper_id, url = paper["id"], paper["url"]
+    entry = cache.entry(paper_id)
+    partial_path = cache.partial_path(paper_id)
+    partial_meta_path = partial_path.with_suffix(".json")
+
+    headers: Dict[str, str] = {}
+    if entry and entry.get("url") == url:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    # 이어받기: 같은 URL의 중간 파일이 있으면 남은 부분만 요청합니다.
+    resume_from = 0
+    if partial_path.exists() and partial_meta_path.exists():
+        with open(partial_meta_path, "r", encoding="utf-8") as f:
+            partial_meta = json.load(f)
+        # 검증자(ETag/Last-Modified)가 없으면 파일이 바뀌었는지 알 수 없으므로 처음부터 받습니다.
+        validator = partial_meta.get("etag") or partial_meta.get("last_modified")
+        if partial_meta.get("url") == url and validator:
+            resume_from = partial_path.stat().st_size
+            headers["Range"] = f"bytes={resume_from}-"
+            headers["If-Range"] = validator
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and entry:
+            return {"id": paper_id, "status": "unchanged", "sha256": entry["sha256"]}
+        if response.status_code == 416 and resume_from:
+            # 중간 파일이 이미 전체 크기 이상이면 버리고 처음부터 받습니다.
+            partial_path.unlink(missing_ok=True)
+            partial_meta_path.unlink(missing_ok=True)
+            return await _download(client, cache, paper)
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        append = response.status_code == 206 and resume_from > 0
+
+        with open(partial_meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f)
+
+        with open(partial_path, "ab" if append else "wb") as f:
+            async for block in response.aiter_bytes():
+                f.write(block)
+
+    sha256 = await asyncio.to_thread(cache.store_blob, partial_path)
+    partial_meta_path.unlink(missing_ok=True)
+
+    previous_sha = entry["sha256"] if entry else None
+    cache.set_entry(paper_id, {"url": url, "sha256": sha256, "etag": etag, "last_modified": last_modified})
+    status = "new" if previous_sha is None else ("unchanged" if previous_sha == sha256 else "updated")
+    return {"id": paper_id, "status": status, "sha256": sha256}
+
+async def fetch_papers(
+    papers: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> List[Dict[str, Any]]:
+    """
+    papers_metadata.json의 논문 목록을 제한된 동시성으로 내려받아 캐시에 저장합니다.
+
+    Input:
+        papers: {"id", "url", ...} 딕셔너리 리스트.
+
+    Output:
+        입력 순서대로 {"id", "status", "sha256"} 또는 실패 시 {"id", "status": "failed", "error"}.
+        status는 new / updated / unchanged / failed 중 하나입니다.
+    """
+    settings = get_settings()
+    max_concurrency = max_concurrency or settings.PAPER_FETCH_CONCURRENCY
+    cache = get_paper_cache()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.PAPER_FETCH_TIMEOUT, connect=10.0)
+        )
+
+    async def fetch_one(paper: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            for attempt in range(settings.PAPER_FETCH_MAX_RETRIES + 1):
+                try:
+                    result = await _download(client, cache, paper)
+                    print(f"   -> {paper['id']}: {result['status']}")
+                    return result
+                except (httpx.HTTPError, OSError) as e:
+                    # 클라이언트 오류(4xx)는 재시도해도 같으므로 바로 실패 처리합니다.
+                    retryable = not (isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500)
+                    if not retryable or attempt >= settings.PAPER_FETCH_MAX_RETRIES:
+                        print(f"❌ 다운로드 실패 ({paper['id']}): {e}")
+                        return {"id": paper["id"], "status": "failed", "error": str(e)}
+                    await asyncio.sleep(min(30.0, 2 ** attempt) * (0.5 + random.random()))
+
+    try:
+        results = await asyncio.gather(*(fetch_one(paper) for paper in papers))
+    finally:
+        cache.save()
+        if own_client:
+            await client.aclose()
+
+    return list(results)
+
+# -----------------------------------------------------------------------------
+# 3. 캐시 인스턴스 (싱글톤)
+# -----------------------------------------------------------------------------
+
+_paper_cache: Optional[PaperCache] = None
+
+def get_paper_cache() -> PaperCache:
+    global _paper_cache
+    if _paper_cache is None:
+        _paper_cache = PaperCache(get_settings().PAPER_CACHE_DIR)
+    return _paper_cache
@@ -0,0 +1,152 @@
+# app/core/response_cache.py
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. LRU + TTL 응답 캐시
+# -----------------------------------------------------------------------------
+
+class ResponseCache:
+    """
+    (라우트, 모델, 프롬프트 버전, 정규화된 대화) 키로 LLM 응답 텍스트를 저장하는 인메모리 캐시입니다.
+
+    - LRU: 가장 오래 사용되지 않은 항목부터 제거합니다.
+    - TTL: ttl_seconds가 지난 항목은 조회 시 만료 처리합니다.
+    - 메모리 상한: 키와 응답 텍스트의 바이트 합계가 max_bytes를 넘지 않도록 제거합니다.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (응답 텍스트, 저장 시각, 바이트 크기)
+        self._entries: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        route: str,
+        model_name: str,
+        prompt_version: str,
+        conversation: List[Dict[str, Any]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        대화 내용의 공백을 정규화한 뒤 캐시 키(sha256)를 만듭니다.
+        같은 질문이라도 줄바꿈/공백 차이로 캐시가 빗나가지 않도록 합니다.
+        max_tokens가 다르면 응답 길이가 달라지므로 다른 키가 됩니다. (예: 퀴즈 채점의 1토큰 응답)
+        """
+        normalized = [
+            (msg.get("role", ""), " ".join(str(msg.get("content", "")).split()))
+            for msg in conversation
+        ]
+        raw_key = json.dumps(
+            [route, model_name, prompt_version, temperature, max_tokens, normalized],
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """캐시된 응답을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at, size = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                # 만료된 항목은 제거하고 miss로 처리합니다.
+                del self._entries[key]
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+
+            # 최근 사용 항목으로 이동 (LRU)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """응답을 저장하고, 개수/메모리 상한을 넘으면 오래된 항목부터 제거합니다."""
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            # 캐시 전체보다 큰 응답은 저장하지 않습니다.
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[2]
+
+            self._entries[key] = (value, time.monotonic(), size)
+            self._total_bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """모든 항목을 제거합니다. (통계는 유지)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """hit/miss 카운터와 현재 사용량을 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+# -----------------------------------------------------------------------------
+# 2. 캐시 인스턴스 (싱글톤)
+# -----------------------------------------------------------------------------
+
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    설정에 따라 응답 캐시 싱글톤을 반환합니다. 캐시가 꺼져 있으면 None을 반환합니다.
+    """
+    global _response_cache
+    settings = get_settings()
+
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        )
+
+    return _response_cache
@@ -0,0 +1,220 @@
+# app/core/semantic_cache.py
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core.settings import get_settings
+from app.core.embeddings import embed_texts
+
+# -----------------------------------------------------------------------------
+# 1. 파티션 (재료별 질문 임베딩 행렬)
+# -----------------------------------------------------------------------------
+
+class _Partition:
+    """
+    하나의 재료(파티션)에 속한 캐시 항목들을 보관합니다.
+    질문 임베딩은 정규화된 float32 행렬로 유지하여 한 번의 행렬-벡터 곱으로 최근접 질문을 찾습니다.
+    """
+
+    def __init__(self, dimension: int):
+        self.row_ids: List[int] = []
+        self.answers: List[str] = []
+        self.last_used: List[float] = []
+        self.matrix = np.empty((0, dimension), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def add(self, row_id: int, vector: np.ndarray, answer: str, last_used: float) -> None:
+        self.row_ids.append(row_id)
+        self.answers.append(answer)
+        self.last_used.append(last_used)
+        self.matrix = np.vstack([self.matrix, vector[np.newaxis, :]])
+
+    def remove_at(self, position: int) -> int:
+        row_id = self.row_ids.pop(position)
+        self.answers.pop(position)
+        self.last_used.pop(position)
+        self.matrix = np.delete(self.matrix, position, axis=0)
+        return row_id
+
+# -----------------------------------------------------------------------------
+# 2. 임베딩 기반 의미(semantic) 응답 캐시
+# -----------------------------------------------------------------------------
+
+class SemanticCache:
+    """
+    첫 질문의 임베딩으로 재료별로 가장 비슷한 기존 질문을 찾고,
+    코사인 유사도가 threshold 이상이면 저장된 답변을 재사용합니다.
+
+    - 파티션: 재료(및 프롬프트 버전)별로 분리되어 다른 재료의 답변이 섞이지 않습니다.
+    - 크기 제한: 파티션마다 max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    - 영속성: 모든 항목은 SQLite 파일에 저장되어 서버 재시작 후에도 유지됩니다.
+    """
+
+    def __init__(self, db_path: str, threshold: float, max_entries_per_partition: int):
+        self.threshold = threshold
+        self.max_entries_per_partition = max_entries_per_partition
+
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                partition TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self) -> None:
+        """SQLite에 저장된 항목을 읽어 파티션별 행렬을 복원합니다."""
+        rows = self._conn.execute(
+            "SELECT id, partition, answer, embedding, last_used FROM semantic_cache ORDER BY id"
+        ).fetchall()
+
+        for row_id, partition_name, answer, blob, last_used in rows:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            partition = self._partitions.get(partition_name)
+            if partition is None:
+                partition = self._partitions[partition_name] = _Partition(vector.shape[0])
+            partition.add(row_id, vector, answer, last_used)
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def lookup(self, partition_name: str, vector: List[float]) -> Optional[str]:
+        """
+        파티션에서 가장 유사한 질문을 찾아, 유사도가 threshold 이상이면 답변을 반환합니다.
+        """
+        query = self._normalize(vector)
+
+        with self._lock:
+            partition = self._partitions.get(partition_name)
+            if partition is None or len(partition) == 0 or partition.matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            similarities = partition.matrix @ query
+            best = int(np.argmax(similarities))
+
+            if float(similarities[best]) < self.threshold:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            partition.last_used[best] = now
+            self.hits += 1
+            answer = partition.answers[best]
+            self._conn.execute(
+                "UPDATE semantic_cache SET last_used = ? WHERE id = ?",
+                (now, partition.row_ids[best])
+            )
+            self._conn.commit()
+            return answer
+
+    def store(self, partition_name: str, question: str, vector: List[float], answer: str) -> None:
+        """
+        새 질문/답변을 저장하고, 파티션 크기 제한을 넘으면 LRU 항목을 제거합니다.
+        """
+        normalized = self._normalize(vector)
+        now = time.time()
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO semantic_cache (partition, question, answer, embedding, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (partition_name, question, answer, normalized.tobytes(), now)
+            )
+
+            partition = self._partitions.get(partition_name)
+            if partition is None or partition.matrix.shape[1] != normalized.shape[0]:
+                partition = self._partitions[partition_name] = _Partition(normalized.shape[0])
+            partition.add(cursor.lastrowid, normalized, answer, now)
+
+            while len(partition) > self.max_entries_per_partition:
+                oldest = int(np.argmin(partition.last_used))
+                evicted_row_id = partition.remove_at(oldest)
+                self._conn.execute("DELETE FROM semantic_cache WHERE id = ?", (evicted_row_id,))
+
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """hit/miss 카운터와 파티션별 항목 수를 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "partitions": {name: len(p) for name, p in self._partitions.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+# -----------------------------------------------------------------------------
+# 3. 캐시 인스턴스 (싱글톤) 및 비동기 헬퍼
+# -----------------------------------------------------------------------------
+
+_semantic_cache: Optional[SemanticCache] = None
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    설정에 따라 의미 캐시 싱글톤을 반환합니다. 캐시가 꺼져 있으면 None을 반환합니다.
+    """
+    global _semantic_cache
+    settings = get_settings()
+
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache(
+            db_path=settings.SEMANTIC_CACHE_PATH,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries_per_partition=settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_PARTITION,
+        )
+
+    return _semantic_cache
+
+def get_first_turn_question(messages_from_client: List[Dict[str, str]]) -> Optional[str]:
+    """
+    대화가 사용자의 첫 질문 하나로만 이루어진 경우 그 질문을 반환합니다. (아니면 None)
+    이전 대화 맥락이 있는 질문은 같은 문장이라도 답이 달라질 수 있어 캐시하지 않습니다.
+    """
+    user_texts = [msg.get("text", "") for msg in messages_from_client if msg.get("type") == "user"]
+    has_bot_turn = any(msg.get("type") == "bot" for msg in messages_from_client)
+
+    if len(user_texts) != 1 or has_bot_turn or not user_texts[0].strip():
+        return None
+    return user_texts[0].strip()
+
+async def embed_question(question: str) -> Optional[List[float]]:
+    """
+    질문을 임베딩합니다. 임베딩 실패는 캐시 miss로 취급하여 None을 반환합니다.
+    """
+    try:
+        return await asyncio.to_thread(embed_texts, question)
+    except Exception as e:
+        print(f"Semantic cache embedding failed: {e}")
+        return None
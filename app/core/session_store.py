@@ -0,0 +1,176 @@
+# app/core/session_store.py
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.settings import get_settings
+
+# 클라이언트 메시지 형식: {"type": "user" | "bot", "text": "..."}
+ClientMessage = Dict[str, str]
+
+# -----------------------------------------------------------------------------
+# 1. 서버 측 대화 세션 저장소 (메모리 LRU + SQLite spill)
+# -----------------------------------------------------------------------------
+
+class SessionStore:
+    """
+    세션 id별 대화 기록을 서버에 보관합니다.
+    클라이언트는 매 턴 전체 messages 대신 session_id와 새 메시지만 보내고,
+    서버가 이 저장소에서 대화를 다시 구성합니다.
+
+    - 메모리: 최근 사용한 max_sessions개의 세션을 OrderedDict(LRU)로 유지합니다.
+    - spill: db_path가 있으면 메모리에서 밀려난 세션을 SQLite에 옮겨 두고, 다시 요청되면 메모리로 불러옵니다.
+    - 만료: ttl_seconds 동안 사용하지 않은 세션은 없는 것으로 취급하고,
+      SQLite에 남은 만료 세션은 시작할 때와 PRUNE_INTERVAL_SECONDS마다 spill할 때 지웁니다.
+    """
+
+    PRUNE_INTERVAL_SECONDS = 600.0
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, db_path: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_pruned_at = 0.0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    key TEXT PRIMARY KEY,
+                    messages TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+            self._conn.commit()
+            self._prune_spilled()
+
+    @staticmethod
+    def _key(route: str, session_id: str) -> str:
+        # 같은 session_id라도 재료(라우트)가 다르면 다른 대화입니다.
+        return f"{route}:{session_id}"
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def _is_expired(self, updated_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - updated_at > self.ttl_seconds
+
+    def _prune_spilled(self) -> None:
+        """SQLite에 옮겨 둔 세션 중 만료된 세션을 지웁니다. (읽을 때만 지우면 다시 요청되지 않은 세션이 계속 쌓입니다)"""
+        self._last_pruned_at = time.time()
+        if self._conn is None or self.ttl_seconds <= 0:
+            return
+        self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (self._last_pruned_at - self.ttl_seconds,))
+        self._conn.commit()
+
+    def _spill(self, key: str, session: Dict) -> None:
+        if self._conn is None:
+            return
+        if time.time() - self._last_pruned_at > self.PRUNE_INTERVAL_SECONDS:
+            self._prune_spilled()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (key, messages, updated_at) VALUES (?, ?, ?)",
+            (key, json.dumps(session["messages"], ensure_ascii=False), session["updated_at"])
+        )
+        self._conn.commit()
+
+    def _load_spilled(self, key: str) -> Optional[Dict]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT messages, updated_at FROM sessions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+        self._conn.commit()
+        return {"messages": json.loads(row[0]), "updated_at": row[1]}
+
+    def _put(self, key: str, session: Dict) -> None:
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            evicted_key, evicted = self._sessions.popitem(last=False)
+            if not self._is_expired(evicted["updated_at"]):
+                self._spill(evicted_key, evicted)
+
+    def get(self, route: str, session_id: str) -> Optional[List[ClientMessage]]:
+        """세션의 대화 기록(복사본)을 반환합니다. 없거나 만료되었으면 None."""
+        key = self._key(route, session_id)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._load_spilled(key)
+                if session is not None:
+                    self._put(key, session)
+            else:
+                self._sessions.move_to_end(key)
+
+            if session is None:
+                return None
+            if self._is_expired(session["updated_at"]):
+                self._sessions.pop(key, None)
+                return None
+            return list(session["messages"])
+
+    def set(self, route: str, session_id: str, messages: List[ClientMessage]) -> None:
+        """세션의 대화 기록을 통째로 바꿉니다. (전체 messages를 보낸 요청)"""
+        with self._lock:
+            self._put(self._key(route, session_id), {"messages": list(messages), "updated_at": time.time()})
+
+    def append(self, route: str, session_id: str, messages: List[ClientMessage]) -> None:
+        """세션 끝에 메시지를 덧붙입니다. 세션이 없거나 만료되었으면 새로 만듭니다. (get과 같은 기준)"""
+        key = self._key(route, session_id)
+        with self._lock:
+            session = self._sessions.get(key) or self._load_spilled(key)
+            if session is None or self._is_expired(session["updated_at"]):
+                session = {"messages": []}
+            session["messages"] = session["messages"] + list(messages)
+            session["updated_at"] = time.time()
+            self._put(key, session)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            spilled = 0
+            if self._conn is not None:
+                spilled = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return {"in_memory": len(self._sessions), "spilled": spilled, "max_sessions": self.max_sessions}
+
+# -----------------------------------------------------------------------------
+# 2. 저장소 인스턴스 (싱글톤)
+# -----------------------------------------------------------------------------
+
+_session_store: Optional[SessionStore] = None
+
+def get_session_store() -> Optional[SessionStore]:
+    """
+    설정에 따라 세션 저장소 싱글톤을 반환합니다. 꺼져 있으면 None을 반환합니다.
+    (이때는 기존처럼 클라이언트가 매번 전체 messages를 보내야 합니다)
+    """
+    global _session_store
+    settings = get_settings()
+
+    if not settings.SESSION_STORE_ENABLED:
+        return None
+
+    if _session_store is None:
+        _session_store = SessionStore(
+            max_sessions=settings.SESSION_MAX_IN_MEMORY,
+            ttl_seconds=settings.SESSION_TTL_SECONDS,
+            db_path=settings.SESSION_DB_PATH or None,
+        )
+
+    return _session_store
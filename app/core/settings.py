@@ -5,7 +5,7 @@ from pydantic_settings import BaseSettings
 from pathlib import Path
 from dotenv import load_dotenv
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 
 # --- 1. 환경 변수 파일 강제 지정 로직 (사용자 코드 기반) ---
 def load_env():
@@ -21,6 +21,10 @@ def load_env():
     except Exception as e:
         print("Failed to load .env file:", e)
     
+# 프로젝트 루트 (로컬 캐시/인덱스 파일의 기본 위치 계산에 사용)
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+LOCAL_CACHE_DIR = PROJECT_ROOT / ".cache"
+
 # --- 2. Pydantic 설정 모델 정의 ---
 class Settings(BaseSettings):
     """
@@ -30,18 +34,148 @@ class Settings(BaseSettings):
     # 1. LLM (OpenAI) 설정
     OPENAI_API_KEY: str = Field(..., description="OpenAI API Key.")
     LLM_MODEL_NAME: str = "gpt-4o"
+
+    # 1-1. LLM HTTP 커넥션 풀 설정 (AsyncOpenAI가 공유하는 httpx 풀)
+    LLM_MAX_CONNECTIONS: int = Field(500, description="동시에 열어 둘 수 있는 최대 HTTP 커넥션 수.")
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = Field(100, description="재사용을 위해 유지할 keep-alive 커넥션 수.")
+    LLM_KEEPALIVE_EXPIRY: float = Field(30.0, description="유휴 keep-alive 커넥션 유지 시간(초).")
+    LLM_REQUEST_TIMEOUT: float = Field(60.0, description="LLM 요청 전체 타임아웃(초).")
+    LLM_CONNECT_TIMEOUT: float = Field(5.0, description="LLM 서버 연결 타임아웃(초).")
+    LLM_MAX_RETRIES: int = Field(2, description="OpenAI SDK 내부 재시도 횟수.")
+    LLM_SINGLE_FLIGHT_ENABLED: bool = Field(True, description="동시에 들어온 동일 LLM 요청을 하나의 API 호출로 합칠지 여부.")
+    IDEMPOTENCY_TTL_SECONDS: float = Field(300.0, description="Idempotency-Key 요청의 결과를 재시도용으로 보관할 시간(초).")
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(2048, description="보관할 Idempotency-Key 결과 수.")
+    
+    # 1-2. LLM 응답 캐시 설정 (정확히 같은 대화에 대한 응답 재사용)
+    RESPONSE_CACHE_ENABLED: bool = Field(True, description="LLM 응답 캐시 사용 여부.")
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(2048, description="캐시에 보관할 최대 응답 수.")
+    RESPONSE_CACHE_MAX_BYTES: int = Field(32 * 1024 * 1024, description="캐시가 사용할 최대 메모리(바이트).")
+    RESPONSE_CACHE_TTL_SECONDS: float = Field(3600.0, description="캐시 항목 유효 시간(초).")
+
+    # 1-3. 의미(semantic) 응답 캐시 설정 (첫 질문 임베딩 유사도 기반)
+    SEMANTIC_CACHE_ENABLED: bool = Field(True, description="의미 캐시 사용 여부.")
+    SEMANTIC_CACHE_PATH: str = Field(str(LOCAL_CACHE_DIR / "semantic_cache.sqlite3"), description="의미 캐시 SQLite 파일 경로.")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(0.93, description="캐시된 답변을 재사용할 최소 코사인 유사도.")
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_PARTITION: int = Field(500, description="재료(파티션)별 최대 캐시 항목 수.")
+
+    # 1-4. 서버 측 대화 세션 설정 (클라이언트는 session_id와 새 메시지만 전송)
+    SESSION_STORE_ENABLED: bool = Field(True, description="서버 측 대화 세션 저장소 사용 여부.")
+    SESSION_MAX_IN_MEMORY: int = Field(1000, description="메모리에 보관할 최대 세션 수 (넘치면 SQLite로 옮김).")
+    SESSION_TTL_SECONDS: float = Field(6 * 3600.0, description="사용하지 않은 세션의 유효 시간(초).")
+    SESSION_DB_PATH: str = Field(str(LOCAL_CACHE_DIR / "sessions.sqlite3"), description="메모리에서 밀려난 세션을 저장할 SQLite 파일 경로 (빈 값이면 저장하지 않음).")
     
+    # 1-5. 퀴즈 일괄 채점 설정
+    QUIZ_BATCH_MAX_ITEMS: int = Field(500, description="일괄 채점 요청 하나에 담을 수 있는 최대 제출물 수.")
+    QUIZ_BATCH_MAX_CONCURRENCY: int = Field(8, description="일괄 채점 시 동시에 보낼 최대 LLM 요청 수.")
+    QUIZ_PREGRADER_ENABLED: bool = Field(True, description="역할도 상황도 없는 단순 지시문을 GPT 호출 없이 False로 판정할지 여부.")
+    QUIZ_PREGRADER_AUDIT_RATE: float = Field(0.05, description="로컬 판정 중 GPT로도 채점하여 일치 여부를 기록할 비율. (QUIZ_PREGRADER_LOG_PATH가 있을 때만)")
+    QUIZ_PREGRADER_LOG_PATH: str = Field("", description="채점 판정 기록(JSONL) 경로. 제출물 원문이 남으므로 판정 규칙을 점검할 때만 지정합니다. (빈 값이면 기록하지 않음)")
+
+    # 1-6. 모델 라우팅 설정 (요청 난이도에 따라 small / large 모델 선택)
+    LLM_ROUTING_ENABLED: bool = Field(True, description="라우트 정책에 따라 요청마다 모델을 고를지 여부 (끄면 각 서비스의 MODEL_NAME 사용).")
+    LLM_SMALL_MODEL_NAME: str = Field("gpt-4o-mini", description="간단한 요청에 사용할 작은 모델.")
+    LLM_LARGE_MODEL_NAME: str = Field("gpt-4o", description="어려운 요청에 사용할 큰 모델.")
+    # 라우트 -> 정책 (fixed: 서비스가 지정한 모델 | small | large | auto: 난이도에 따라 선택). 'rag:flour'는 'rag'로도 찾습니다.
+    LLM_ROUTING_POLICIES: Dict[str, str] = Field(
+        {
+            "default": "fixed",
+            "chatbot": "auto",
+            "few_shot": "auto",
+            "role_prompting": "auto",
+            "markdown_template": "auto",
+            "hallucination": "auto",
+            "rag_logic": "auto",
+            "reflexion": "auto",
+            "rag": "auto",
+            "quiz": "large",
+        },
+        description="라우트별 모델 선택 정책."
+    )
+    LLM_ROUTING_SMALL_MAX_PROMPT_TOKENS: int = Field(4000, description="auto 정책에서 작은 모델을 쓸 수 있는 최대 프롬프트 토큰 수.")
+    LLM_ROUTING_SMALL_MAX_DIFFICULTY: int = Field(0, description="auto 정책에서 작은 모델을 쓸 수 있는 최대 난이도 점수 (0~3).")
+    LLM_ROUTING_LONG_QUESTION_TOKENS: int = Field(80, description="이보다 긴 질문은 난이도 +1.")
+    LLM_ROUTING_MAX_SIMPLE_TURNS: int = Field(3, description="사용자 질문이 이보다 많이 이어진 대화는 난이도 +1.")
+    LLM_ESCALATION_ENABLED: bool = Field(True, description="작은 모델의 응답 확신도가 낮으면 큰 모델로 다시 호출할지 여부 (스트리밍 제외).")
+    LLM_ESCALATION_MIN_AVG_LOGPROB: float = Field(-0.8, description="작은 모델 응답의 토큰 평균 logprob이 이보다 낮으면 큰 모델로 다시 호출.")
+
+    # 1-7. 주제 이탈 게이트 설정 (튜토리얼 임베딩 유사도로 무관한 첫 질문에 안내 문구로 바로 응답)
+    TOPIC_GATE_ENABLED: bool = Field(True, description="첫 질문의 주제 이탈 여부를 판정할지 여부 (막을지는 TOPIC_GATE_ENFORCE).")
+    TOPIC_GATE_DEFAULT_THRESHOLD: float = Field(0.2, description="튜토리얼과의 최대 코사인 유사도가 이보다 낮으면 주제 이탈로 판정.")
+    TOPIC_GATE_THRESHOLDS: Dict[str, float] = Field({}, description="재료별 주제 이탈 임계값 (없으면 기본값 사용).")
+    TOPIC_GATE_ENFORCE: bool = Field(False, description="주제 이탈 판정 시 실제로 안내 문구로 답할지 여부 (꺼져 있으면 판정만 기록하고 서비스로 넘김).")
+    TOPIC_GATE_LOG_PATH: str = Field("", description="주제 이탈 판정 기록(JSONL) 경로. 사용자 질문 원문이 남으므로 임계값을 조정할 때만 지정합니다. (빈 값이면 기록하지 않음)")
+
     # 2. Embeddings 설정
     EMBEDDING_MODEL_NAME: str = "text-embedding-3-large"
+    EMBEDDING_DIMENSION: int = Field(3072, description="임베딩 벡터 차원 (text-embedding-3-large = 3072).")
+    EMBEDDING_BATCH_MAX_TOKENS: int = Field(100_000, description="임베딩 요청 한 번에 담을 최대 토큰 수.")
+    EMBEDDING_BATCH_MAX_INPUTS: int = Field(512, description="임베딩 요청 한 번에 담을 최대 텍스트 수.")
+    EMBEDDING_MAX_CONCURRENCY: int = Field(4, description="동시에 보낼 임베딩 요청 수.")
+    EMBEDDING_MAX_RETRIES: int = Field(5, description="임베딩 배치 실패 시 재시도 횟수.")
+    EMBEDDING_CACHE_ENABLED: bool = Field(True, description="디스크 임베딩 캐시 사용 여부.")
+    EMBEDDING_CACHE_PATH: str = Field(str(LOCAL_CACHE_DIR / "embeddings.sqlite3"), description="임베딩 캐시 SQLite 파일 경로.")
+    
+    # 3. Vector DB 설정
+    # 'pinecone' (원격 Pinecone 인덱스) 또는 'local' (프로세스 내 NumPy 인덱스)
+    VECTORSTORE_BACKEND: str = Field("pinecone", description="벡터 저장소 백엔드 (pinecone | local).")
+    LOCAL_VECTORSTORE_PATH: str = Field(str(LOCAL_CACHE_DIR / "vectorstore"), description="로컬 벡터 저장소 디렉토리.")
+    # 로컬 백엔드 검색 방식: 'flat' (정확한 브루트포스) 또는 'hnsw' (근사 최근접 이웃)
+    LOCAL_VECTORSTORE_INDEX: str = Field("flat", description="로컬 벡터 검색 인덱스 (flat | hnsw).")
+    HNSW_M: int = Field(16, description="HNSW 노드당 이웃 수 (클수록 recall↑, 메모리↑).")
+    HNSW_EF_CONSTRUCTION: int = Field(100, description="HNSW 삽입 시 탐색 폭.")
+    HNSW_EF_SEARCH: int = Field(64, description="HNSW 검색 시 탐색 폭 (클수록 recall↑, 지연 시간↑).")
+    INGEST_EMBED_BATCH_SIZE: int = Field(64, description="색인 파이프라인에서 임베딩 요청 하나에 담을 청크 수.")
+    INGEST_UPSERT_BATCH_SIZE: int = Field(100, description="색인 파이프라인에서 업로드 한 번에 담을 벡터 수.")
+    INGEST_QUEUE_SIZE: int = Field(4, description="색인 파이프라인 단계 사이 큐의 최대 배치 수 (backpressure).")
+    PAPER_CACHE_DIR: str = Field(str(LOCAL_CACHE_DIR / "papers"), description="다운로드한 논문 PDF/페이지 텍스트 캐시 디렉토리.")
+    PAPER_FETCH_CONCURRENCY: int = Field(4, description="논문 PDF 동시 다운로드 수.")
+    PAPER_FETCH_TIMEOUT: float = Field(120.0, description="논문 PDF 다운로드 읽기 타임아웃 (초).")
+    PAPER_FETCH_MAX_RETRIES: int = Field(3, description="논문 PDF 다운로드 실패 시 재시도 횟수.")
+    INDEX_MANIFEST_PATH: str = Field(str(LOCAL_CACHE_DIR / "index_manifest.json"), description="증분 색인용 청크 해시 매니페스트 파일 경로.")
+    DOCSTORE_ENABLED: Optional[bool] = Field(
+        None,
+        description="청크 원문을 벡터 메타데이터 대신 로컬 문서 저장소에 둘지 여부. "
+                    "비워 두면 local 백엔드에서만 사용합니다. (Pinecone은 색인한 디스크가 없는 API 서버도 원문을 읽도록 메타데이터에 유지)"
+    )
+    DOCSTORE_PATH: str = Field(str(LOCAL_CACHE_DIR / "docstore.sqlite3"), description="청크 문서 저장소(SQLite) 파일 경로.")
+    VECTOR_UPSERT_MAX_BATCH_BYTES: int = Field(1_500_000, description="upsert 요청 하나의 최대 직렬화 크기 (Pinecone 요청 제한 2MB 이하).")
+    VECTOR_UPSERT_MAX_BATCH_VECTORS: int = Field(1000, description="upsert 요청 하나의 최대 벡터 수.")
+    VECTOR_UPSERT_MAX_WORKERS: int = Field(4, description="동시에 보낼 upsert 배치 수.")
+    VECTOR_UPSERT_MAX_RETRIES: int = Field(3, description="upsert 배치 실패 시 재시도 횟수.")
     
-    # 3. Pinecone Vector DB 설정 (추가됨)
-    PINECONE_API_KEY: str = Field(..., description="Pinecone API Key.")
+    # 3-1. Pinecone Vector DB 설정 (VECTORSTORE_BACKEND=pinecone 일 때 필요)
+    PINECONE_API_KEY: Optional[str] = Field(None, description="Pinecone API Key.")
     PINECONE_INDEX_NAME: str = Field("my-tutorial-index", description="Pinecone Index Name.")
     PINECONE_CLOUD: str = Field("aws", description="Pinecone Cloud Provider (예: gcp, aws, azure).")
     PINECONE_REGION: str = Field("us-east-1", description="Pinecone Region (예: us-east1).")
     
     # 4. RAG 및 기타 설정
+    RAG_MAX_INPUT_TOKENS: int = Field(6000, description="RAG 요청 하나의 최대 입력 토큰 수 (넘으면 대화 기록을 압축합니다).")
+    HISTORY_KEEP_LAST_TURNS: int = Field(3, description="요약하지 않고 그대로 보낼 최근 대화 턴 수.")
+    HISTORY_SUMMARY_MODEL: str = Field("gpt-4o-mini", description="오래된 대화 기록 요약에 사용할 모델.")
+    HISTORY_SUMMARY_MAX_TOKENS: int = Field(300, description="대화 기록 요약의 최대 토큰 수.")
+    HISTORY_SUMMARY_CACHE_SIZE: int = Field(1024, description="메모리에 보관할 대화 요약 수.")
     RAG_TOP_K: int = 3 # 유사 청크 검색 시 반환할 개수
+    RAG_CANDIDATE_K: int = Field(8, description="컨텍스트 선택 전에 가져올 후보 청크 수 (여기서 RAG_TOP_K개 이하를 고릅니다).")
+    RAG_MIN_SCORE: float = Field(0.2, description="프롬프트에 넣을 청크의 최소 유사도.")
+    RAG_MMR_LAMBDA: float = Field(0.7, description="MMR 관련도 가중치 (1에 가까울수록 중복 제거보다 관련도 우선).")
+    RAG_DUPLICATE_THRESHOLD: float = Field(0.95, description="이미 고른 청크와 이 유사도 이상이면 중복으로 보고 제외합니다.")
+    RAG_MAX_CONTEXT_TOKENS: int = Field(1200, description="검색된 외부 지식 블록의 최대 토큰 수.")
+    # 재료(technique_key)별로 검색할 청크의 technique 메타데이터 값 (없는 재료는 전체 검색)
+    RAG_TECHNIQUE_FILTERS: Dict[str, List[str]] = Field(
+        {
+            "flour": ["few_shot", "zero_shot"],
+            "tomato": ["role_prompting"],
+            "olive": ["contextual_prompting", "knowledge_generation"],
+            "basil": ["reflection"],
+        },
+        description="재료별 검색 범위 (technique 메타데이터 값 목록)."
+    )
+    HYBRID_SEARCH_ENABLED: bool = Field(True, description="BM25 희소 검색을 밀집 검색과 RRF로 합칠지 여부 (말뭉치는 문서 저장소, 없으면 벡터 메타데이터의 text).")
+    HYBRID_CORPUS_REFRESH_SECONDS: float = Field(3600.0, description="문서 저장소 없이 벡터 메타데이터로 만든 BM25 말뭉치를 다시 불러오는 주기(초).")
+    HYBRID_CANDIDATE_K: int = Field(10, description="하이브리드 검색에서 밀집/희소 검색이 각각 가져올 후보 수.")
+    HYBRID_RRF_K: int = Field(60, description="Reciprocal Rank Fusion 상수 k.")
+    RAG_SCOPED_MIN_SCORE: float = Field(0.25, description="범위 검색 결과로 인정할 최소 유사도. 부족하면 전체 검색으로 채웁니다.")
 
 # --- 3. 싱글톤 설정 인스턴스 관리 ---
 
@@ -0,0 +1,74 @@
+# app/core/single_flight.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+# -----------------------------------------------------------------------------
+# 1. 같은 키의 동시 요청 합치기 (single-flight)
+# -----------------------------------------------------------------------------
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청을 하나의 실행으로 합칩니다.
+
+    - 첫 요청만 fn()을 실행하고, 실행 중에 들어온 같은 키의 요청은 그 결과를 함께 기다립니다.
+    - ttl_seconds > 0이면 성공한 결과를 그 시간 동안 보관하여, 막 끝난 요청의 재시도(멱등 키)에도 같은 결과를 돌려줍니다.
+    - 실행은 별도 태스크로 돌기 때문에 처음 요청한 클라이언트가 연결을 끊어도 기다리던 요청은 영향을 받지 않습니다.
+    - 실패한 실행은 보관하지 않으므로 다음 요청은 새로 실행됩니다.
+    """
+
+    def __init__(self, ttl_seconds: float = 0.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (실행 태스크, 완료 시각 또는 None)
+        self._calls: OrderedDict = OrderedDict()
+
+        self.executions = 0
+        self.coalesced = 0
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        current = self._calls.get(key)
+        if current is None or current[0] is not task:
+            return
+        if task.cancelled() or task.exception() is not None or self.ttl_seconds <= 0:
+            self._calls.pop(key, None)
+        else:
+            self._calls[key] = (task, time.monotonic())
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (_, finished_at) in self._calls.items()
+                    if finished_at is not None and now - finished_at > self.ttl_seconds]:
+            del self._calls[key]
+        # 그래도 넘치면 완료된 항목부터 오래된 순으로 버립니다. (실행 중인 항목은 유지)
+        for key in [key for key, (_, finished_at) in self._calls.items() if finished_at is not None]:
+            if len(self._calls) <= self.max_entries:
+                break
+            del self._calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """key로 fn()을 한 번만 실행하고, 같은 키의 요청은 모두 같은 결과(또는 예외)를 받습니다."""
+        current = self._calls.get(key)
+        if current is not None:
+            task, finished_at = current
+            if finished_at is None or time.monotonic() - finished_at <= self.ttl_seconds:
+                self.coalesced += 1
+                return await asyncio.shield(task)
+
+        self._evict()
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = (task, None)
+        task.add_done_callback(lambda done, key=key: self._on_done(key, done))
+        self.executions += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        in_flight = sum(1 for _, finished_at in self._calls.values() if finished_at is None)
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": in_flight,
+            "retained": len(self._calls) - in_flight,
+        }
@@ -0,0 +1,181 @@
+# app/core/sparse_index.py
+
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.docstore import get_docstore
+from app.core.local_vectorstore import matches_filter
+from app.core.settings import get_settings
+
+# -----------------------------------------------------------------------------
+# 1. 한국어/영어 혼합 토크나이저
+# -----------------------------------------------------------------------------
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[가-힣]+")
+_ENGLISH_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what with".split()
+)
+
+def tokenize_for_search(text: str) -> List[str]:
+    """
+    검색용 토큰 목록을 만듭니다.
+
+    - 영어/숫자: 소문자 단어 단위 (불용어 제외). "Chain-of-Thought" -> chain, thought
+    - 한글: 조사가 붙어도 어간이 겹치도록 음절 bigram 단위. "기법은" -> 기법, 법은 (한 글자 단어는 그대로)
+    """
+    tokens: List[str] = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        elif word not in _ENGLISH_STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+# -----------------------------------------------------------------------------
+# 2. BM25 희소 인덱스
+# -----------------------------------------------------------------------------
+
+class BM25Index:
+    """
+    청크 (id, text, metadata) 목록으로 만든 메모리 내 BM25 역색인입니다.
+
+    각 term의 posting(문서 번호 배열)에 BM25 가중치를 미리 계산해 두므로,
+    검색은 질문 term 수만큼의 NumPy 덧셈과 top-k 선택뿐입니다.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._filter_rows: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def build(self, documents: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """(id, text, metadata) 목록으로 인덱스를 새로 만듭니다."""
+        self._ids = [vector_id for vector_id, _, _ in documents]
+        self._metadata = [metadata for _, _, metadata in documents]
+        self._filter_rows = {}
+
+        term_docs: Dict[str, List[int]] = defaultdict(list)
+        term_freqs: Dict[str, List[int]] = defaultdict(list)
+        lengths = np.zeros(len(documents), dtype=np.float32)
+
+        for doc_index, (_, text, _) in enumerate(documents):
+            counts = Counter(tokenize_for_search(text))
+            lengths[doc_index] = sum(counts.values())
+            for term, freq in counts.items():
+                term_docs[term].append(doc_index)
+                term_freqs[term].append(freq)
+
+        num_docs = len(documents)
+        average_length = float(lengths.mean()) if num_docs else 0.0
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / max(average_length, 1e-9))
+
+        self._postings = {}
+        for term, docs in term_docs.items():
+            doc_indices = np.asarray(docs, dtype=np.int64)
+            freqs = np.asarray(term_freqs[term], dtype=np.float32)
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * freqs * (self.k1 + 1) / (freqs + length_norm[doc_indices])
+            self._postings[term] = (doc_indices, weights.astype(np.float32))
+
+    def _allowed_rows(self, metadata_filter: Dict[str, Any]) -> np.ndarray:
+        cache_key = json.dumps(metadata_filter, sort_keys=True, ensure_ascii=False)
+        rows = self._filter_rows.get(cache_key)
+        if rows is None:
+            rows = np.array([matches_filter(metadata, metadata_filter) for metadata in self._metadata], dtype=bool)
+            self._filter_rows[cache_key] = rows
+        return rows
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """BM25 점수 상위 top_k개의 (id, score)를 반환합니다. (점수가 0인 문서는 제외)"""
+        if not self._ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in set(tokenize_for_search(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                doc_indices, weights = posting
+                scores[doc_indices] += weights
+
+        if metadata_filter:
+            scores[~self._allowed_rows(metadata_filter)] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+        k = min(top_k, candidates.size)
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[i], float(scores[i])) for i in top]
+
+# -----------------------------------------------------------------------------
+# 3. 인덱스 인스턴스 (말뭉치가 바뀌면 다시 구축)
+# -----------------------------------------------------------------------------
+
+_sparse_index: Optional[BM25Index] = None
+_sparse_index_version = None
+_sparse_index_lock = threading.Lock()
+
+def get_sparse_index(
+    load_documents: Optional[Callable[[], List[Tuple[str, str, Dict[str, Any]]]]] = None
+) -> Optional[BM25Index]:
+    """
+    BM25 인덱스를 반환합니다.
+
+    - 문서 저장소가 있으면 그 청크로 만들고, 색인 스크립트 등으로 바뀌면 다음 조회 때 다시 구축합니다.
+    - 없으면 load_documents()(벡터 메타데이터의 text 등)로 만들고, HYBRID_CORPUS_REFRESH_SECONDS마다 다시 불러옵니다.
+    - 둘 다 없거나 불러오기에 실패하면 None (밀집 검색만 사용)
+    """
+    global _sparse_index, _sparse_index_version
+    docstore = get_docstore()
+    if docstore is None and load_documents is None:
+        return None
+
+    with _sparse_index_lock:
+        if docstore is not None:
+            version = docstore.version()
+            stale = _sparse_index is None or version != _sparse_index_version
+        else:
+            version = ("metadata", time.monotonic())
+            stale = (
+                _sparse_index is None
+                or _sparse_index_version is None
+                or _sparse_index_version[0] != "metadata"
+                or version[1] - _sparse_index_version[1] > get_settings().HYBRID_CORPUS_REFRESH_SECONDS
+            )
+        if stale:
+            try:
+                documents = docstore.all_documents() if docstore is not None else load_documents()
+            except Exception as e:
+                # 실패해도 다음 주기까지는 이전 인덱스(없으면 빈 인덱스)를 쓰고, 매 조회마다 다시 시도하지 않습니다.
+                print(f"BM25 corpus load failed: {e}")
+                _sparse_index, _sparse_index_version = _sparse_index or BM25Index(), version
+                return _sparse_index
+            if not documents:
+                print("⚠️ HYBRID_SEARCH_ENABLED이지만 BM25 말뭉치가 비어 있어 밀집 검색만 사용합니다. "
+                      "(청크 text가 문서 저장소나 벡터 메타데이터에 있어야 합니다)")
+            index = BM25Index()
+            index.build(documents)
+            _sparse_index, _sparse_index_version = index, version
+        return _sparse_index
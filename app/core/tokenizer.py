@@ -0,0 +1,44 @@
+# app/core/tokenizer.py
+
+import math
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken # 설치되어 있으면 정확한 토큰 수를 사용합니다.
+except ImportError:
+    tiktoken = None
+
+# -----------------------------------------------------------------------------
+# 1. 토큰 수 계산
+# -----------------------------------------------------------------------------
+
+@lru_cache(maxsize=8)
+def _get_encoding(model_name: Optional[str]):
+    """모델에 맞는 tiktoken 인코딩을 반환합니다. (알 수 없는 모델은 o200k_base)"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name) if model_name else tiktoken.get_encoding("o200k_base")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def estimate_tokens(text: str) -> int:
+    """
+    tiktoken이 없을 때 쓰는 보수적인 추정치입니다.
+    영문/숫자는 약 3.5자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰으로 계산합니다.
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    non_ascii_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 3.5) + non_ascii_chars
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    텍스트의 토큰 수를 반환합니다. tiktoken이 있으면 정확히 세고, 없으면 추정합니다.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -1,12 +1,77 @@
 # app/core/vectorstore.py
 
+import atexit
+import json
+import random
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import numpy as np
 from fastapi import logger
 from pinecone import Pinecone, ServerlessSpec, PodSpec
 from pinecone.exceptions import PineconeException
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 # 이전 단계에서 구현한 모듈들을 임포트합니다.
 from app.core.settings import get_settings
 from app.core.embeddings import embed_texts 
+from app.core.local_vectorstore import LocalVectorStore, HNSWLocalVectorStore
+from app.core.docstore import get_docstore
+from app.core.sparse_index import get_sparse_index
+
+# Pinecone이 요구하는 (id, vector, metadata) 튜플 형식입니다.
+VectorTuple = Tuple[str, List[float], Dict[str, Any]]
+
+# -----------------------------------------------------------------------------
+# 0. 검색 결과 및 백엔드 인터페이스
+# -----------------------------------------------------------------------------
+
+@dataclass
+class VectorMatch:
+    """
+    백엔드와 무관한 검색 결과 한 건입니다. (Pinecone의 ScoredVector와 같은 속성 이름 사용)
+    """
+    id: str
+    score: float
+    metadata: Dict[str, Any]
+    values: Optional[List[float]] = None
+
+class VectorStoreBackend(ABC):
+    """
+    벡터 저장소 백엔드 공통 인터페이스. (Settings.VECTORSTORE_BACKEND로 선택)
+    """
+
+    # 여러 upsert 배치를 동시에 보내도 되는지 여부 (원격 백엔드만 이득이 있습니다)
+    parallel_upserts: bool = True
+
+    @abstractmethod
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include_values: bool = False
+    ) -> List[VectorMatch]:
+        """벡터와 가장 유사한 top_k개의 결과를 유사도 내림차순으로 반환합니다."""
+
+    @abstractmethod
+    def upsert(self, vectors_to_upsert: List[VectorTuple]) -> None:
+        """(id, vector, metadata) 목록을 저장하거나 덮어씁니다."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """id 목록에 해당하는 벡터를 삭제합니다."""
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> Dict[str, VectorMatch]:
+        """id 목록의 벡터와 메타데이터를 조회합니다. (score는 0.0)"""
+
+    @abstractmethod
+    def list_ids(self) -> Iterator[List[str]]:
+        """저장된 모든 벡터 id를 페이지(목록) 단위로 내보냅니다."""
+
+    def flush(self) -> None:
+        """버퍼된 변경 사항을 영구 저장합니다. (원격 백엔드는 할 일이 없습니다)"""
 
 # -----------------------------------------------------------------------------
 # 1. Pinecone 인스턴스 및 인덱스 (싱글톤 패턴)
@@ -23,9 +88,15 @@ def get_pinecone_index() -> Pinecone.Index:
     """
     global _pinecone_client, _pinecone_index
     settings = get_settings()
+
+    # 0. 이미 연결된 인덱스가 있으면 list_indexes 왕복 없이 바로 반환합니다.
+    if _pinecone_index is not None:
+        return _pinecone_index
         
     # 1. Pinecone 클라이언트 초기화 (기존 로직 유지)
     if _pinecone_client is None:
+        if not settings.PINECONE_API_KEY:
+            raise PineconeException("PINECONE_API_KEY is required when VECTORSTORE_BACKEND=pinecone.")
         try:
             _pinecone_client = Pinecone(api_key=settings.PINECONE_API_KEY)
             print("✅ Pinecone client initialized.")
@@ -43,10 +114,10 @@ def get_pinecone_index() -> Pinecone.Index:
     if index_name not in index_names:
         print(f"⚠️ 인덱스 '{index_name}'을 찾을 수 없습니다. 새로운 인덱스를 생성합니다...")
         
-        # 인덱스 생성 (임베딩 모델 차원 1536 사용)
+        # 인덱스 생성 (임베딩 모델 차원 사용)
         _pinecone_client.create_index(
             name=index_name,
-            dimension=3072, # text-embedding-3-large의 차원
+            dimension=settings.EMBEDDING_DIMENSION, # text-embedding-3-large의 차원 3072
             metric='cosine', # 코사인 유사도 사용
             spec=ServerlessSpec("aws", "us-east-1")
         )
@@ -63,73 +134,441 @@ def get_pinecone_index() -> Pinecone.Index:
             raise PineconeException(f"Failed to connect to index {index_name} after creation: {e}")
             
     return _pinecone_index
+
+
+class PineconeVectorStore(VectorStoreBackend):
+    """
+    원격 Pinecone 인덱스 백엔드.
+    """
+
+    def query(self, vector, top_k, metadata_filter=None, include_values=False):
+        index = get_pinecone_index()
+        query_kwargs: Dict[str, Any] = {}
+        if metadata_filter:
+            query_kwargs["filter"] = metadata_filter
+
+        results = index.query(
+            vector=vector,
+            top_k=top_k,
+            include_values=include_values,
+            include_metadata=True, # 원본 텍스트(Metadata)를 함께 가져옵니다.
+            **query_kwargs
+        )
+        return [
+            VectorMatch(
+                id=match.id,
+                score=match.score,
+                metadata=match.metadata or {},
+                values=list(match.values) if include_values and match.values else None
+            )
+            for match in results.get('matches', [])
+        ]
+
+    def upsert(self, vectors_to_upsert):
+        # Pinecone의 upsert 함수는 (id, vector, metadata) 튜플 리스트를 받습니다.
+        get_pinecone_index().upsert(vectors=vectors_to_upsert)
+
+    def delete(self, ids):
+        if ids:
+            get_pinecone_index().delete(ids=ids)
+
+    def fetch(self, ids):
+        if not ids:
+            return {}
+        response = get_pinecone_index().fetch(ids=ids)
+        return {
+            vector_id: VectorMatch(
+                id=vector_id,
+                score=0.0,
+                metadata=vector.metadata or {},
+                values=list(vector.values)
+            )
+            for vector_id, vector in response.vectors.items()
+        }
+
+    def list_ids(self):
+        # 서버리스 인덱스의 list()는 id를 페이지 단위(최대 100개)로 돌려줍니다.
+        yield from get_pinecone_index().list()
+
 # -----------------------------------------------------------------------------
-# 2. 벡터 검색 함수 (RAG의 핵심)
+# 2. 로컬 NumPy 백엔드 (오프라인/저지연 검색용)
 # -----------------------------------------------------------------------------
 
+class LocalNumpyVectorStore(VectorStoreBackend):
+    """
+    프로세스 내 NumPy 행렬 기반 백엔드. (app/core/local_vectorstore.py)
+    WAN 왕복 없이 한 번의 행렬-벡터 곱(flat) 또는 HNSW 근사 검색(hnsw)으로 코사인 top-k를 계산합니다.
+    """
+
+    # 프로세스 내 저장소는 락으로 직렬화되므로 동시에 보내도 이득이 없습니다.
+    parallel_upserts = False
+
+    def __init__(self, store: LocalVectorStore):
+        self.store = store
+
+    def query(self, vector, top_k, metadata_filter=None, include_values=False):
+        return [
+            VectorMatch(**result)
+            for result in self.store.query(vector, top_k, metadata_filter, include_values)
+        ]
+
+    def upsert(self, vectors_to_upsert):
+        self.store.upsert(vectors_to_upsert)
+
+    def delete(self, ids):
+        self.store.delete(ids)
+
+    def fetch(self, ids):
+        return {
+            vector_id: VectorMatch(score=0.0, **record)
+            for vector_id, record in self.store.fetch(ids).items()
+        }
+
+    def list_ids(self):
+        yield self.store.ids()
+
+    def flush(self):
+        self.store.flush()
+
+# -----------------------------------------------------------------------------
+# 3. 백엔드 선택 (싱글톤)
+# -----------------------------------------------------------------------------
+
+_vectorstore_backend: Optional[VectorStoreBackend] = None
+
+def get_vectorstore() -> VectorStoreBackend:
+    """
+    Settings.VECTORSTORE_BACKEND에 따라 벡터 저장소 백엔드 싱글톤을 반환합니다.
+    """
+    global _vectorstore_backend
+    settings = get_settings()
+
+    if _vectorstore_backend is None:
+        backend_name = settings.VECTORSTORE_BACKEND.lower()
+
+        if backend_name == "pinecone":
+            _vectorstore_backend = PineconeVectorStore()
+        elif backend_name == "local":
+            if settings.LOCAL_VECTORSTORE_INDEX.lower() == "hnsw":
+                store = HNSWLocalVectorStore(
+                    settings.LOCAL_VECTORSTORE_PATH,
+                    settings.EMBEDDING_DIMENSION,
+                    M=settings.HNSW_M,
+                    ef_construction=settings.HNSW_EF_CONSTRUCTION,
+                    ef_search=settings.HNSW_EF_SEARCH,
+                )
+            else:
+                store = LocalVectorStore(settings.LOCAL_VECTORSTORE_PATH, settings.EMBEDDING_DIMENSION)
+            _vectorstore_backend = LocalNumpyVectorStore(store)
+            # 색인 스크립트가 flush를 잊어도 종료 시 변경 사항이 저장되도록 합니다.
+            atexit.register(_vectorstore_backend.flush)
+        else:
+            raise ValueError(f"Unknown VECTORSTORE_BACKEND: {settings.VECTORSTORE_BACKEND}")
+
+    return _vectorstore_backend
+
+# -----------------------------------------------------------------------------
+# 4. 벡터 검색 함수 (RAG의 핵심)
+# -----------------------------------------------------------------------------
+
+# BM25 검색을 밀집 검색과 동시에 실행하기 위한 작은 스레드 풀
+_sparse_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sparse-search")
+
+def load_metadata_documents(batch_size: int = 100) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """
+    벡터 메타데이터에 text가 있는 청크를 (id, text, metadata)로 모두 불러옵니다.
+    문서 저장소가 없는 서버(Pinecone 기본 설정)에서 BM25 말뭉치를 만들 때 사용합니다.
+    """
+    backend = get_vectorstore()
+    documents = []
+    for page in backend.list_ids():
+        page = list(page)
+        for start in range(0, len(page), batch_size):
+            for vector_id, match in backend.fetch(page[start:start + batch_size]).items():
+                text = match.metadata.get("text")
+                if text:
+                    documents.append((vector_id, text, {k: v for k, v in match.metadata.items() if k != "text"}))
+    return documents
+
+def _cosine(values: List[float], query_vector: List[float]) -> float:
+    a = np.asarray(values, dtype=np.float32)
+    b = np.asarray(query_vector, dtype=np.float32)
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denominator if denominator > 0 else 0.0
+
+def hybrid_query(
+    query_text: str,
+    query_vector: List[float],
+    top_k: int,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    include_values: bool = False
+) -> List[VectorMatch]:
+    """
+    밀집(벡터) 검색과 BM25 희소 검색을 동시에 실행하고 Reciprocal Rank Fusion으로 합칩니다.
+
+    - 두 검색 모두 HYBRID_CANDIDATE_K개의 후보를 가져오고, RRF 점수 순으로 top_k개를 반환합니다.
+    - 희소 검색에서만 나온 청크는 벡터를 fetch하여 질문과의 코사인 유사도를 score로 채웁니다.
+      (따라서 score는 항상 코사인 유사도이고, 순서만 RRF를 따릅니다)
+    - BM25 말뭉치는 문서 저장소에서, 없으면 벡터 메타데이터의 text에서 만듭니다.
+    - 하이브리드 검색이 꺼져 있거나 말뭉치가 비어 있으면 밀집 검색 결과를 그대로 반환합니다.
+    """
+    settings = get_settings()
+    backend = get_vectorstore()
+
+    sparse_index = get_sparse_index(load_metadata_documents) if settings.HYBRID_SEARCH_ENABLED else None
+    if sparse_index is None or len(sparse_index) == 0:
+        return backend.query(query_vector, top_k, metadata_filter, include_values)
+
+    candidate_k = max(top_k, settings.HYBRID_CANDIDATE_K)
+    sparse_future = _sparse_executor.submit(sparse_index.search, query_text, candidate_k, metadata_filter)
+    dense_matches = backend.query(query_vector, candidate_k, metadata_filter, include_values)
+    sparse_hits = sparse_future.result()
+
+    # Reciprocal Rank Fusion: score(d) = Σ 1 / (k + rank)
+    fused: Dict[str, float] = {}
+    for rank, match in enumerate(dense_matches, start=1):
+        fused[match.id] = fused.get(match.id, 0.0) + 1.0 / (settings.HYBRID_RRF_K + rank)
+    for rank, (vector_id, _) in enumerate(sparse_hits, start=1):
+        fused[vector_id] = fused.get(vector_id, 0.0) + 1.0 / (settings.HYBRID_RRF_K + rank)
+
+    ordered_ids = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    matches_by_id = {match.id: match for match in dense_matches}
+
+    # 희소 검색에서만 나온 청크는 벡터를 한 번에 가져와 코사인 유사도를 계산합니다.
+    sparse_only_ids = [vector_id for vector_id in ordered_ids if vector_id not in matches_by_id]
+    for vector_id, fetched in backend.fetch(sparse_only_ids).items():
+        matches_by_id[vector_id] = VectorMatch(
+            id=vector_id,
+            score=_cosine(fetched.values, query_vector),
+            metadata=fetched.metadata,
+            values=fetched.values if include_values else None
+        )
+
+    # 벡터 저장소에 없는 (삭제된) 청크는 제외합니다.
+    return [matches_by_id[vector_id] for vector_id in ordered_ids if vector_id in matches_by_id]
+
+
 # 참고: embed_texts가 동기 함수이므로 여기서는 await을 제거하거나, 
 # 실제 배포 환경을 고려하여 async 함수로 유지하고 내부 호출을 동기 처리합니다.
-def query_vectorstore(query_text: str) -> List[Dict[str, Any]]:
+def query_vectorstore(
+    query_text: str,
+    top_k: Optional[int] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None
+) -> List[VectorMatch]:
     """
-    사용자 질문을 벡터로 변환하고 Pinecone 인덱스에서 가장 유사한 문서를 검색합니다.
+    사용자 질문을 벡터로 변환하고 벡터 저장소에서 가장 유사한 문서를 검색합니다.
     
     Args:
         query_text (str): 사용자의 질문 텍스트.
+        top_k (int, optional): 반환할 개수. 지정하지 않으면 settings.RAG_TOP_K 사용.
+        metadata_filter (dict, optional): Pinecone 스타일 메타데이터 필터.
         
     Returns:
-        List[Dict[str, Any]]: 검색된 문서(Match) 리스트. 
+        List[VectorMatch]: 검색된 문서(Match) 리스트. 
     """
     settings = get_settings()
-    top_k = settings.RAG_TOP_K 
+    top_k = top_k if top_k is not None else settings.RAG_TOP_K 
     
     try:
         # 1. 질문 텍스트를 벡터로 변환 (embeddings.py 모듈 사용)
         query_vector = embed_texts([query_text])[0]
         
-        # 2. Pinecone 인덱스 객체 가져오기
-        index = get_pinecone_index()
-        
-        # 3. 인덱스에서 유사도 검색 수행
-        results = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_values=False,
-            include_metadata=True # 원본 텍스트(Metadata)를 함께 가져옵니다.
-        )
-        
-        # 4. 검색 결과를 리스트로 정리하여 반환
-        return results.get('matches', [])
+        # 2. 선택된 백엔드에서 유사도 검색 수행 (BM25와 함께 하이브리드 검색)
+        return hybrid_query(query_text, query_vector, top_k, metadata_filter)
 
     except Exception as e:
         # ⚠️ 치명적인 오류가 발생해도 반드시 로그를 출력하고 빈 리스트를 반환
+        print(f"Vector store query failed: {e}")
+        return []
+
+
+def query_vectorstore_scoped(
+    query_text: str,
+    scope_filter: Optional[Dict[str, Any]],
+    top_k: Optional[int] = None,
+    min_score: Optional[float] = None,
+    include_values: bool = False
+) -> List[VectorMatch]:
+    """
+    scope_filter(예: 현재 기법의 technique 값)로 좁혀서 먼저 검색하고,
+    min_score 이상인 결과가 top_k개보다 적으면 전체 검색 결과로 남은 자리를 채웁니다.
+    (질문 임베딩은 한 번만 계산합니다)
+    include_values=True면 결과에 벡터를 포함합니다. (컨텍스트 선택의 MMR에서 사용)
+    
+    Returns:
+        List[VectorMatch]: 범위 검색 결과가 앞에 오고, 부족한 만큼 전체 검색 결과가 뒤에 붙습니다.
+    """
+    settings = get_settings()
+    top_k = top_k if top_k is not None else settings.RAG_TOP_K
+    min_score = min_score if min_score is not None else settings.RAG_SCOPED_MIN_SCORE
+
+    try:
+        query_vector = embed_texts([query_text])[0]
+
+        if not scope_filter:
+            return hybrid_query(query_text, query_vector, top_k, include_values=include_values)
+
+        scoped = [
+            match for match in hybrid_query(query_text, query_vector, top_k, scope_filter, include_values)
+            if match.score >= min_score
+        ]
+        if len(scoped) >= top_k:
+            return scoped
+
+        # 범위 검색 결과가 부족하면 전체 검색으로 채웁니다.
+        seen = {match.id for match in scoped}
+        fallback = [
+            match for match in hybrid_query(query_text, query_vector, top_k + len(scoped), include_values=include_values)
+            if match.id not in seen
+        ]
+        return scoped + fallback[:top_k - len(scoped)]
+
+    except Exception as e:
+        print(f"Vector store query failed: {e}")
         return []
 
 
 # -----------------------------------------------------------------------------
-# 3. 벡터 업로드 함수 (데이터 색인)
+# 5. 벡터 업로드/삭제 함수 (데이터 색인)
 # -----------------------------------------------------------------------------
 
-# Pinecone이 요구하는 (id, vector, metadata) 튜플 형식입니다.
-VectorTuple = Tuple[str, List[float], Dict[str, Any]]
+def split_upsert_batches(
+    vectors_to_upsert: List[VectorTuple],
+    max_batch_bytes: int,
+    max_batch_vectors: int
+) -> List[List[VectorTuple]]:
+    """
+    직렬화(JSON) 크기 합계가 max_batch_bytes, 개수가 max_batch_vectors를 넘지 않도록 배치를 나눕니다.
+    (한 벡터가 제한보다 크면 혼자 하나의 배치가 됩니다.)
+    """
+    batches: List[List[VectorTuple]] = []
+    current: List[VectorTuple] = []
+    current_bytes = 0
+
+    for item in vectors_to_upsert:
+        vector_id, values, metadata = item
+        size = len(json.dumps({"id": vector_id, "values": values, "metadata": metadata}, ensure_ascii=False).encode("utf-8"))
+        if current and (current_bytes + size > max_batch_bytes or len(current) >= max_batch_vectors):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(item)
+        current_bytes += size
+
+    if current:
+        batches.append(current)
+    return batches
 
-def upsert_vectors(vectors_to_upsert: List[VectorTuple]) -> None:
+
+def _upsert_batch_with_retry(backend: VectorStoreBackend, batch_index: int, batch: List[VectorTuple], max_retries: int) -> Dict[str, Any]:
+    """배치 하나를 업로드하고, 실패하면 지수 백오프(+jitter)로 재시도합니다. 결과를 딕셔너리로 반환합니다."""
+    for attempt in range(1, max_retries + 2):
+        try:
+            backend.upsert(batch)
+            return {"batch": batch_index, "count": len(batch), "status": "ok", "attempts": attempt}
+        except Exception as e:
+            if attempt > max_retries:
+                print(f"❌ 배치 {batch_index} ({len(batch)}개) 업로드 실패: {e}")
+                return {"batch": batch_index, "count": len(batch), "status": "failed", "attempts": attempt, "error": str(e)}
+            delay = min(30.0, 2 ** (attempt - 1)) * (0.5 + random.random())
+            print(f"⚠️ 배치 {batch_index} 업로드 실패 ({attempt}회): {e} -> {delay:.1f}s 후 재시도")
+            time.sleep(delay)
+
+
+def upsert_vectors(
+    vectors_to_upsert: List[VectorTuple],
+    raise_on_error: bool = True
+) -> List[Dict[str, Any]]:
     """
-    주어진 벡터들을 Pinecone 인덱스에 저장하거나 업데이트(Upsert)합니다.
+    주어진 벡터들을 벡터 저장소에 저장하거나 업데이트(Upsert)합니다.
+    
+    요청 크기 제한을 넘지 않도록 직렬화 크기 기준으로 배치를 나누고,
+    원격 백엔드에서는 제한된 스레드 풀로 배치를 동시에 보내며 실패한 배치만 재시도합니다.
     
     Args:
         vectors_to_upsert (List[VectorTuple]): 업로드할 (id, vector, metadata) 데이터 리스트.
+        raise_on_error (bool): 재시도 후에도 실패한 배치가 있으면 RuntimeError를 발생시킬지 여부.
+        
+    Returns:
+        List[Dict[str, Any]]: 배치별 결과 {"batch", "count", "status": ok|failed, "attempts", "error"}.
     """
     if not vectors_to_upsert:
+        return []
+
+    settings = get_settings()
+    backend = get_vectorstore()
+
+    # 청크 원문은 문서 저장소에 두고, 벡터에는 작은 메타데이터만 남깁니다.
+    docstore = get_docstore()
+    if docstore is not None:
+        documents, slim_vectors = [], []
+        for vector_id, values, metadata in vectors_to_upsert:
+            small_metadata = {k: v for k, v in metadata.items() if k != "text"}
+            if "text" in metadata:
+                documents.append((vector_id, metadata["text"], small_metadata))
+            slim_vectors.append((vector_id, values, small_metadata))
+        docstore.put_many(documents)
+        vectors_to_upsert = slim_vectors
+    batches = split_upsert_batches(
+        vectors_to_upsert,
+        settings.VECTOR_UPSERT_MAX_BATCH_BYTES,
+        settings.VECTOR_UPSERT_MAX_BATCH_VECTORS
+    )
+    max_workers = settings.VECTOR_UPSERT_MAX_WORKERS if backend.parallel_upserts else 1
+
+    if max_workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            results = list(executor.map(
+                lambda args: _upsert_batch_with_retry(backend, *args, settings.VECTOR_UPSERT_MAX_RETRIES),
+                enumerate(batches)
+            ))
+    else:
+        results = [
+            _upsert_batch_with_retry(backend, i, batch, settings.VECTOR_UPSERT_MAX_RETRIES)
+            for i, batch in enumerate(batches)
+        ]
+
+    failed = [result for result in results if result["status"] == "failed"]
+    if failed and raise_on_error:
+        raise RuntimeError(
+            f"Vector upsert failed for {len(failed)}/{len(results)} batches "
+            f"({sum(result['count'] for result in failed)} vectors): {failed[0]['error']}"
+        )
+    return results
+
+
+def delete_vectors(ids: List[str]) -> None:
+    """
+    id 목록에 해당하는 벡터를 벡터 저장소에서 삭제합니다.
+    """
+    if not ids:
         return
-        
-    index = get_pinecone_index()
-    
+
     try:
-        # Pinecone의 upsert 함수는 (id, vector, metadata) 튜플 리스트를 받습니다.
-        index.upsert(vectors=vectors_to_upsert)
-    except PineconeException as e:
-        print(f"Pinecone upsert failed: {e}")
-        raise
+        get_vectorstore().delete(ids)
     except Exception as e:
-        print(f"An unexpected error occurred during upsert: {e}")
-        raise
\ No newline at end of file
+        print(f"Vector delete failed: {e}")
+        raise
+
+    docstore = get_docstore()
+    if docstore is not None:
+        docstore.delete_many(ids)
+
+
+def get_chunk_texts(matches: List[VectorMatch]) -> List[str]:
+    """
+    검색 결과의 청크 원문을 문서 저장소에서 한 번에 조회하여 같은 순서로 반환합니다.
+    문서 저장소에 없으면 (이전 방식으로 색인된 벡터) 메타데이터의 text를 사용합니다.
+    """
+    docstore = get_docstore()
+    documents = docstore.get_many([match.id for match in matches]) if docstore is not None and matches else {}
+    return [
+        documents[match.id]["text"] if match.id in documents else match.metadata.get("text", "")
+        for match in matches
+    ]
+
+
+def flush_vectorstore() -> None:
+    """
+    로컬 백엔드의 변경 사항을 디스크에 저장합니다. (색인 스크립트 종료 전에 호출)
+    """
+    get_vectorstore().flush()
@@ -3,9 +3,13 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import os
 from pathlib import Path
-from app.core import embeddings, vectorstore
-from app.core.vectorstore import VectorTuple
-from typing import List, Dict, Any
+from app.core import vectorstore
+from app.core.index_manifest import IndexManifest, load_index_manifest
+from app.core.ingestion import ChunkRecord, run_ingestion_pipeline
+from typing import List, Dict, Any, Iterator
+
+# 매니페스트에서 이 스크립트가 관리하는 출처의 접두사
+MANIFEST_PREFIX = "documents/"
 
 def parse_document(file_path: Path) -> List[str]:
     """긴 텍스트 문서를 읽고 재귀적 청킹을 사용하여 분할합니다."""
@@ -30,39 +34,82 @@ def parse_document(file_path: Path) -> List[str]:
     
     return chunks
 
-async def index_documents(data_dir: str):
-    """지정된 디렉토리의 모든 문서를 읽어 Pinecone에 색인합니다."""
-
-    doc_paths = list(Path(data_dir).glob("*.txt")) # .txt 파일만 검색
-    all_vectors_to_upsert: List[VectorTuple] = []
-
-    print(f"총 {len(doc_paths)}개의 문서를 발견했습니다. 색인을 시작합니다.")
-
+def iter_changed_records(
+    doc_paths: List[Path],
+    manifest: IndexManifest,
+    full: bool,
+    hashes_by_source: Dict[str, Dict[str, str]],
+    stale_ids: List[str]
+) -> Iterator[ChunkRecord]:
+    """
+    문서를 하나씩 청킹하여 매니페스트와 비교하고, 새로 생기거나 바뀐 청크만 (id, text, metadata)로 내보냅니다.
+    청크 해시는 hashes_by_source에, 사라진 id는 stale_ids에 기록합니다.
+    """
     for doc_path in doc_paths:
         document_name = doc_path.name
+        source = f"{MANIFEST_PREFIX}{document_name}"
         
         # 1. 문서 청킹
         chunks = parse_document(doc_path)
-        print(f"  -> {document_name}: 총 {len(chunks)}개의 청크 생성 완료.")
-
-        # 2. 청크 임베딩
-        # embed_texts는 텍스트 리스트를 벡터 리스트(List[List[float]])로 반환합니다.
-        vectors = embeddings.embed_texts(chunks) 
 
-        # 3. Upsert 데이터 준비
-        for i, (chunk_text, vector) in enumerate(zip(chunks, vectors)):
+        # 2. 청크별 id/메타데이터/해시 계산 후 매니페스트와 비교
+        records = {}
+        for i, chunk_text in enumerate(chunks):
             vector_id = f"{document_name.replace('.', '_')}_{i}"
-            
             metadata = {
                 "text": chunk_text,
                 "source_doc": document_name, # ⚠️ 출처 메타데이터
                 "key": "research" # ⚠️ 필터링을 위한 공통 키
             }
-            all_vectors_to_upsert.append((vector_id, vector, metadata))
+            records[vector_id] = metadata
+        
+        chunk_hashes = {vector_id: IndexManifest.hash_chunk(meta["text"], meta) for vector_id, meta in records.items()}
+        changed_ids, removed_ids = manifest.diff(source, chunk_hashes)
+        if full:
+            changed_ids = list(records.keys())
+        hashes_by_source[source] = chunk_hashes
+        stale_ids.extend(removed_ids)
+        print(f"  -> {document_name}: 총 {len(chunks)}개 청크 중 변경 {len(changed_ids)}개, 삭제 {len(removed_ids)}개.")
+
+        for vector_id in changed_ids:
+            yield (vector_id, records[vector_id]["text"], records[vector_id])
+
+async def index_documents(data_dir: str, full: bool = False):
+    """
+    지정된 디렉토리의 모든 문서를 읽어 벡터 저장소(Pinecone 또는 로컬)에 색인합니다.
     
-    # 4. Pinecone에 업로드
-    print(f"\n총 {len(all_vectors_to_upsert)}개의 벡터를 Pinecone에 업로드합니다...")
-    vectorstore.upsert_vectors(all_vectors_to_upsert)
+    매니페스트(청크별 콘텐츠 해시)와 비교하여 바뀐 청크만 임베딩/업로드하고,
+    사라진 청크와 삭제된 문서의 벡터는 저장소에서 지웁니다. (full=True면 전체 재색인)
+    청킹 → 임베딩 → 업로드는 스트리밍 파이프라인으로 겹쳐서 실행됩니다.
+    """
+
+    doc_paths = list(Path(data_dir).glob("*.txt")) # .txt 파일만 검색
+    manifest = load_index_manifest()
+    stale_ids: List[str] = []
+    hashes_by_source: Dict[str, Dict[str, str]] = {}
+
+    print(f"총 {len(doc_paths)}개의 문서를 발견했습니다. 색인을 시작합니다.")
+
+    # 1~3. 청킹/임베딩/업로드 (바뀐 청크만)
+    stats = await run_ingestion_pipeline(
+        iter_changed_records(doc_paths, manifest, full, hashes_by_source, stale_ids)
+    )
+
+    # 4. 디렉토리에서 사라진 문서의 벡터도 삭제 대상에 포함
+    for source in manifest.sources(MANIFEST_PREFIX):
+        if source not in hashes_by_source:
+            stale_ids.extend(manifest.ids(source))
+            manifest.remove(source)
+    
+    # 5. 사라진 벡터 삭제 후 저장
+    print(f"\n총 {stats['upserted']}개의 벡터를 업로드했고 {len(stale_ids)}개를 삭제합니다...")
+    vectorstore.delete_vectors(stale_ids)
+    vectorstore.flush_vectorstore() # 로컬 백엔드 사용 시 디스크에 저장
+
+    # 6. 모두 성공한 뒤에 매니페스트 갱신
+    for source, chunk_hashes in hashes_by_source.items():
+        manifest.update(source, chunk_hashes)
+    manifest.save()
     print("✅ 데이터 색인 완료.")
 
 if __name__ == "__main__":
@@ -72,4 +119,5 @@ if __name__ == "__main__":
     
     # 비동기 함수 실행 (FastAPI 환경이 아니므로 단순 실행)
     import asyncio
-    asyncio.run(index_documents(DOCUMENTS_DIR))
\ No newline at end of file
+    import sys
+    asyncio.run(index_documents(DOCUMENTS_DIR, full="--full" in sys.argv))
\ No newline at end of file
@@ -231,16 +231,24 @@
 import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict, Any
-from langchain_community.document_loaders import PyMuPDFLoader
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import numpy as np
+import pymupdf
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from app.core import embeddings, vectorstore
-from app.core.vectorstore import VectorTuple
+from app.core import vectorstore
+from app.core.index_manifest import IndexManifest, load_index_manifest
+from app.core.ingestion import ChunkRecord, run_ingestion_pipeline
+from app.core.paper_fetcher import fetch_papers, get_paper_cache
 
 TEMP_DOC_DIR = "./temp_docs"
 MIN_CHUNK_LENGTH = 80
 PAPER_PATH = Path(__file__).parent.parent / "data" / "Prompt_Engineering.pdf"
+MANIFEST_SOURCE = "pdf/Prompt_Engineering.pdf" # 매니페스트에 기록되는 출처 이름
+PAPER_METADATA_PATH = Path(__file__).parent.parent / "data" / "papers_metadata.json"
+PAPER_MANIFEST_PREFIX = "paper/" # papers_metadata.json 논문의 매니페스트 출처 접두사
 
 # --- 1️⃣ 섹션 제목 패턴 사전 ---
 TECHNIQUE_KEYWORDS = {
@@ -257,97 +265,270 @@ TECHNIQUE_KEYWORDS = {
 }
 
 
-# --- 2️⃣ 노이즈 감지 ---
-def is_noise(text: str) -> bool:
-    text = text.strip()
-    if not text:
-        return True
-    if re.match(r"^(Prompt Engineering|Author:|February 2025|Table of contents)", text):
-        return True
-    if len(text) < 40 and re.match(r"^[\s\dIVXLCDM\.\-]+$", text):
-        return True
-    if text.count("\n") > 6 and sum(len(l) < 25 for l in text.splitlines()) / len(text.splitlines()) > 0.6:
-        return True
-    return False
+# 모든 키워드를 한 번에 찾는 미리 컴파일된 패턴 (그룹 이름 → 키워드)
+_SECTION_GROUPS = {f"s{i}": k for i, k in enumerate(TECHNIQUE_KEYWORDS)}
+SECTION_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{re.escape(k)})" for name, k in _SECTION_GROUPS.items()),
+    re.IGNORECASE
+)
+_SECTION_PRIORITY = {k: i for i, k in enumerate(TECHNIQUE_KEYWORDS)}
+
+# 병렬 파싱 설정
+PAGES_PER_SHARD = 8 # 프로세스 하나가 맡는 페이지 수
+MAX_WORKERS = os.cpu_count() or 1
+
+
+# --- 2️⃣ 노이즈 감지 / 본문 의미 판단 ---
+NOISE_HEADER_PATTERN = re.compile(r"^(Prompt Engineering|Author:|February 2025|Table of contents)")
+NUMBERING_PATTERN = re.compile(r"^[\s\dIVXLCDM\.\-]+$")
+LETTER_PATTERN = re.compile(r"[^\W\d_]") # str.isalpha()와 같은 문자 (유니코드 글자)
+SENTENCE_END_PATTERN = re.compile(r"[.?!]")
+
+def filter_chunks(texts: List[str]) -> np.ndarray:
+    """
+    노이즈가 아니고 의미 있는 본문인 청크만 남기는 마스크를 반환합니다.
+    청크마다 특징(길이, 글자 수, 줄 수 등)만 뽑고, 임계값 비교는 NumPy 배열 연산으로 처리합니다.
+
+    - 노이즈: 빈 청크, 머리글("Prompt Engineering", "Author:" 등)로 시작, 40자 미만의 번호/목차 줄,
+      짧은 줄(25자 미만)이 60%를 넘는 7줄 이상의 청크
+    - 의미 있는 본문: 글자 비율 40% 이상이고 문장 부호(. ? !)가 있는 청크
+    """
+    if not texts:
+        return np.zeros(0, dtype=bool)
+
+    lengths = np.array([len(t) for t in texts])
+    newlines = np.array([t.count("\n") for t in texts])
+    line_counts = np.array([max(1, len(t.splitlines())) for t in texts])
+    short_lines = np.array([sum(len(l) < 25 for l in t.splitlines()) for t in texts])
+    letters = np.array([len(LETTER_PATTERN.findall(t)) for t in texts])
+    has_header = np.array([bool(NOISE_HEADER_PATTERN.match(t)) for t in texts])
+    is_numbering = np.array([bool(NUMBERING_PATTERN.match(t)) for t in texts])
+    has_sentence_end = np.array([bool(SENTENCE_END_PATTERN.search(t)) for t in texts])
+
+    noise = (
+        (lengths == 0)
+        | has_header
+        | ((lengths < 40) & is_numbering)
+        | ((newlines > 6) & (short_lines / line_counts > 0.6))
+    )
+    meaningful = (letters / np.maximum(1, lengths) >= 0.4) & has_sentence_end
+    return ~noise & meaningful
 
 
-# --- 3️⃣ 본문 의미 판단 ---
-def is_meaningful(text: str) -> bool:
-    ratio_letters = sum(c.isalpha() for c in text) / max(1, len(text))
-    if ratio_letters < 0.4:
-        return False
-    if text.count(".") + text.count("?") + text.count("!") < 1:
-        return False
-    return True
+def detect_section(text: str) -> Optional[str]:
+    """
+    청크에 등장하는 섹션 키워드를 한 번의 스캔으로 찾습니다.
+    여러 키워드가 있으면 TECHNIQUE_KEYWORDS에서 앞선 키워드를 고릅니다.
+    """
+    found = {_SECTION_GROUPS[m.lastgroup] for m in SECTION_PATTERN.finditer(text)}
+    return min(found, key=_SECTION_PRIORITY.get) if found else None
 
 
 # --- 4️⃣ PDF 로드 및 청킹 ---
-def parse_pdf_to_chunks(pdf_path: str) -> List[Dict[str, Any]]:
-    loader = PyMuPDFLoader(pdf_path)
-    documents = loader.load()
-
+def chunk_pages(pages: Iterable[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    """
+    (페이지 번호, 페이지 텍스트) 목록을 청킹/필터링하고,
+    청크마다 그 청크에서 감지된 섹션(없으면 None)을 붙여 반환합니다.
+    """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=900,
         chunk_overlap=120,
         separators=["\n\n", "\n", ".", " "],
     )
-    split_docs = splitter.split_documents(documents)
 
-    chunks = []
+    texts, page_numbers = [], []
+    for page_number, page_text in pages:
+        for chunk_text in splitter.split_text(page_text):
+            texts.append(chunk_text.strip())
+            page_numbers.append(page_number)
+
+    keep = filter_chunks(texts)
+    return [
+        {"text": text, "page": page, "detected_section": detect_section(text)}
+        for text, page, kept in zip(texts, page_numbers, keep) if kept
+    ]
+
+
+def carry_sections(chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """감지된 섹션을 다음 청크로 이어 붙여(current_section) 각 청크의 section을 정합니다."""
     current_section = None
-    for doc in split_docs:
-        text = doc.page_content.strip()
-        if is_noise(text):
-            continue
-        if not is_meaningful(text):
-            continue
-
-        # 섹션 제목 감지
-        for k in TECHNIQUE_KEYWORDS.keys():
-            if re.search(k, text, re.IGNORECASE):
-                current_section = k
-                break
-
-        chunks.append({
-            "text": text,
-            "section": current_section or "general",
-            "page": getattr(doc.metadata, "page", None)
-        })
+    for chunk in chunks:
+        current_section = chunk.pop("detected_section") or current_section
+        chunk["section"] = current_section or "general"
+        yield chunk
+
+
+def _parse_page_range(pdf_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """
+    (프로세스 풀 작업자) [start, end) 페이지를 추출하여 chunk_pages로 청킹합니다.
+    섹션 이어 붙이기(current_section)는 순서가 보장되는 메인 프로세스에서 처리합니다.
+    """
+    with pymupdf.open(pdf_path) as pdf:
+        # 페이지 번호는 1부터 시작
+        return chunk_pages((page_index + 1, pdf[page_index].get_text()) for page_index in range(start, end))
+
+
+def iter_pdf_chunks(pdf_path: str, max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    PDF를 페이지 구간으로 나누어 프로세스 풀에서 병렬로 파싱하고, 청크를 페이지 순서대로 내보냅니다.
+    섹션은 이전 청크에서 이어받으므로(current_section) 구간을 나누는 방식과 관계없이 결과가 같습니다.
+    """
+    with pymupdf.open(pdf_path) as pdf:
+        page_count = pdf.page_count
+
+    ranges = [(start, min(start + PAGES_PER_SHARD, page_count)) for start in range(0, page_count, PAGES_PER_SHARD)]
+    if not ranges:
+        return
+    max_workers = min(max_workers or MAX_WORKERS, len(ranges))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map은 제출 순서대로 결과를 돌려주므로 섹션 이어 붙이기가 결정적입니다.
+        starts, ends = zip(*ranges)
+        shards = executor.map(_parse_page_range, repeat(pdf_path), starts, ends)
+        yield from carry_sections(chunk for shard in shards for chunk in shard)
+
 
+def parse_pdf_to_chunks(pdf_path: str) -> List[Dict[str, Any]]:
+    chunks = list(iter_pdf_chunks(pdf_path))
     print(f"✅ 유효 청크 수: {len(chunks)}")
     return chunks
 
 
 # --- 5️⃣ 인덱싱 메인 함수 ---
-async def index_prompt_engineering_pdf():
+async def index_prompt_engineering_pdf(full: bool = False):
     chunks = parse_pdf_to_chunks(str(PAPER_PATH))
-    all_vectors: List[VectorTuple] = []
-
-    print("🔄 임베딩 생성 중...")
-    texts = [c["text"] for c in chunks]
-    vectors = embeddings.embed_texts(texts)
+    manifest = load_index_manifest()
 
-    for i, (vector, chunk) in enumerate(zip(vectors, chunks)):
+    # 청크별 id/메타데이터를 만들고 매니페스트와 비교하여 바뀐 청크만 고릅니다.
+    records = {}
+    for i, chunk in enumerate(chunks):
         section = chunk["section"]
-        meta = {
+        records[f"pe2025_{i}"] = {
             "title": "Prompt Engineering (Google Cloud, 2025)",
             "section": section,
             "technique": TECHNIQUE_KEYWORDS.get(section, "general"),
             "page": str(chunk["page"]) if chunk.get("page") is not None else "unknown",
             "text": chunk["text"]
         }
-        all_vectors.append((f"pe2025_{i}", vector, meta))
 
-    print(f"📤 총 {len(all_vectors)}개 벡터 업로드 중...")
-    BATCH_SIZE = 100
-    for i in range(0, len(all_vectors), BATCH_SIZE):
-        batch = all_vectors[i:i + BATCH_SIZE]
-        vectorstore.upsert_vectors(batch)
-        print(f"✅ 배치 {i//BATCH_SIZE + 1} 완료.")
+    chunk_hashes = {vector_id: IndexManifest.hash_chunk(meta["text"], meta) for vector_id, meta in records.items()}
+    changed_ids, stale_ids = manifest.diff(MANIFEST_SOURCE, chunk_hashes)
+    if full:
+        changed_ids = list(records.keys())
+    print(f"🔍 총 {len(records)}개 청크 중 변경 {len(changed_ids)}개, 삭제 {len(stale_ids)}개.")
 
+    # 바뀐 청크만 스트리밍 파이프라인으로 임베딩/업로드합니다.
+    stats = await run_ingestion_pipeline(
+        (vector_id, records[vector_id]["text"], records[vector_id]) for vector_id in changed_ids
+    )
+    print(f"📤 총 {stats['upserted']}개 벡터 업로드 완료.")
+
+    # 이전 실행보다 청크가 줄었으면 남은 벡터를 삭제합니다.
+    vectorstore.delete_vectors(stale_ids)
+    vectorstore.flush_vectorstore() # 로컬 백엔드 사용 시 디스크에 저장
+
+    manifest.update(MANIFEST_SOURCE, chunk_hashes)
+    manifest.save()
     print("🎯 Prompt Engineering PDF 인덱싱 완료!")
 
 
+# --- 6️⃣ papers_metadata.json 논문 색인 ---
+def iter_paper_records(
+    papers: List[Dict[str, Any]],
+    manifest: IndexManifest,
+    full: bool,
+    hashes_by_source: Dict[str, Dict[str, str]],
+    stale_ids: List[str]
+) -> Iterator[ChunkRecord]:
+    """
+    캐시된 논문의 페이지 텍스트를 청킹하여 매니페스트와 비교하고, 바뀐 청크만 (id, text, metadata)로 내보냅니다.
+    """
+    cache = get_paper_cache()
+    for paper in papers:
+        paper_id = paper["id"]
+        source = f"{PAPER_MANIFEST_PREFIX}{paper_id}"
+        page_texts = cache.load_page_texts(paper["sha256"])
+        chunks = list(carry_sections(chunk_pages(enumerate(page_texts, start=1))))
+
+        records = {}
+        for i, chunk in enumerate(chunks):
+            # JSON의 메타데이터를 함께 저장 (큰 필드는 제외)
+            metadata = {k: v for k, v in paper.items() if k not in ("notes", "sha256")}
+            metadata.update({
+                "text": chunk["text"],
+                "chunk_index": i,
+                "section": chunk["section"],
+                # PDF 색인과 같은 technique 값을 붙여야 재료별 범위 검색(RAG_TECHNIQUE_FILTERS)에 포함됩니다.
+                "technique": TECHNIQUE_KEYWORDS.get(chunk["section"], "general"),
+                "page": str(chunk["page"])
+            })
+            records[f"{paper_id}_{i}"] = metadata
+
+        chunk_hashes = {vector_id: IndexManifest.hash_chunk(meta["text"], meta) for vector_id, meta in records.items()}
+        changed_ids, removed_ids = manifest.diff(source, chunk_hashes)
+        if full:
+            changed_ids = list(records.keys())
+        hashes_by_source[source] = chunk_hashes
+        stale_ids.extend(removed_ids)
+        print(f"  -> {paper_id}: 총 {len(chunks)}개 청크 중 변경 {len(changed_ids)}개, 삭제 {len(removed_ids)}개.")
+
+        for vector_id in changed_ids:
+            yield (vector_id, records[vector_id]["text"], records[vector_id])
+
+
+async def index_papers_from_json(full: bool = False):
+    """
+    papers_metadata.json의 논문을 내려받아 색인합니다.
+
+    다운로드는 동시에 진행되고 PDF/페이지 텍스트는 로컬 캐시에 남으므로,
+    다시 실행하면 새로 추가되거나 바뀐 논문만 내려받고 임베딩합니다.
+    """
+    if not PAPER_METADATA_PATH.exists():
+        print(f"❌ 메타데이터 파일이 없습니다: {PAPER_METADATA_PATH}")
+        return
+
+    with open(PAPER_METADATA_PATH, 'r', encoding='utf-8') as f:
+        paper_metadata_list = json.load(f)
+
+    print(f"총 {len(paper_metadata_list)}개의 논문 메타데이터를 발견했습니다. 다운로드를 시작합니다.")
+    results = await fetch_papers(paper_metadata_list)
+
+    fetched, failed_sources = [], set()
+    for paper, result in zip(paper_metadata_list, results):
+        if result["status"] == "failed":
+            failed_sources.add(f"{PAPER_MANIFEST_PREFIX}{paper['id']}")
+        else:
+            fetched.append({**paper, "sha256": result["sha256"]})
+
+    manifest = load_index_manifest()
+    stale_ids: List[str] = []
+    hashes_by_source: Dict[str, Dict[str, str]] = {}
+
+    stats = await run_ingestion_pipeline(
+        iter_paper_records(fetched, manifest, full, hashes_by_source, stale_ids)
+    )
+
+    # 목록에서 빠진 논문의 벡터는 삭제합니다. (다운로드에 실패한 논문은 기존 벡터를 유지)
+    for source in manifest.sources(PAPER_MANIFEST_PREFIX):
+        if source not in hashes_by_source and source not in failed_sources:
+            stale_ids.extend(manifest.ids(source))
+            manifest.remove(source)
+
+    print(f"📤 총 {stats['upserted']}개 벡터를 업로드했고 {len(stale_ids)}개를 삭제합니다.")
+    vectorstore.delete_vectors(stale_ids)
+    vectorstore.flush_vectorstore()
+
+    for source, chunk_hashes in hashes_by_source.items():
+        manifest.update(source, chunk_hashes)
+    manifest.save()
+    print("✅ 논문 데이터 색인 완료.")
+
+
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(index_prompt_engineering_pdf())
+    import sys
+    # --papers: papers_metadata.json의 논문 색인, 기본: Prompt Engineering PDF 색인
+    if "--papers" in sys.argv:
+        asyncio.run(index_papers_from_json(full="--full" in sys.argv))
+    else:
+        asyncio.run(index_prompt_engineering_pdf(full="--full" in sys.argv))
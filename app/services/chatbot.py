@@ -1,19 +1,11 @@
 import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 import time
-from openai import OpenAI # OpenAI 라이브러리 임포트
 
-
-# ---- 1. API 키 설정 ----
-load_dotenv()
-
-# ---- API 키를 환경 변수에서 가져옵니다. ----
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# API 클라이언트 초기화
-client = OpenAI(api_key=openai_api_key)
+# ---- 1. LLM 클라이언트 ----
+# OpenAI 호출은 app/core/llm_client.py의 공유 비동기 클라이언트(커넥션 풀)를 사용합니다.
+from app.core import llm_client
 
 app = FastAPI()
 
@@ -30,24 +22,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ✅ Role Prompting 전용 챗봇 함수
-async def generate_response(messages_from_client: list):
-    """
-    사용자가 보낸 메시지를 Role Prompting 전용 챗봇으로 전달하여 응답을 생성합니다.
-    """
+# ---- 2. 모델 설정 ----
+ROUTE = "chatbot"
+PROMPT_VERSION = "1"
+MODEL_NAME = "gpt-4o"
+TEMPERATURE = 0.7
 
-    # 메시지 포맷 변환
-    gpt_messages = []
-    for msg in messages_from_client:
-        if msg.get("type") == "user":
-            gpt_messages.append({"role": "user", "content": msg.get("text", "")})
-        elif msg.get("type") == "bot":
-            gpt_messages.append({"role": "assistant", "content": msg.get("text", "")})
 
-    # ✅ Role Prompting 전용 system 프롬프트
-    system_prompt = {
-        "role": "system",
-        "content": """
+OFF_TOPIC_REPLY = "죄송해요. 전 프롬프팅 기법에 관한 질문만 답변할 수 있어요."
+SYSTEM_PROMPT = f"""
 당신은 'Role Prompting' 기법을 전문적으로 가르쳐주는 집사 AI입니다.
 
 🎩 역할:
@@ -61,21 +44,47 @@ async def generate_response(messages_from_client: list):
 2️⃣ Few-shot, Reflection 등 다른 프롬프팅 기법은 짧게 정의만 설명한 뒤 반드시 위 멘트를 덧붙이세요.
 3️⃣ 프롬프팅 기법과 전혀 관련 없는 질문(예: 날씨, 음식, 취미 등)에 대해서는
    반드시 이렇게 대답하세요:
-   👉 "죄송해요. 전 프롬프팅 기법에 관한 질문만 답변할 수 있어요."
+   👉 "{OFF_TOPIC_REPLY}"
 4️⃣ 답변은 항상 자연스러운 대화체로, 존댓말을 사용하세요.
 5️⃣ 'Role Prompting'이라는 단어는 강조 표시로 (예: **Role Prompting**) 해주세요.
         """
-    }
+
+
+def build_conversation(messages_from_client: list):
+    """
+    클라이언트 메시지를 Role Prompting 전용 system 프롬프트가 포함된 GPT 대화 목록으로 변환합니다.
+    (일반 응답과 스트리밍 응답이 함께 사용합니다.)
+    """
+
+    # 메시지 포맷 변환
+    gpt_messages = []
+    for msg in messages_from_client:
+        if msg.get("type") == "user":
+            gpt_messages.append({"role": "user", "content": msg.get("text", "")})
+        elif msg.get("type") == "bot":
+            gpt_messages.append({"role": "assistant", "content": msg.get("text", "")})
+
+    # ✅ Role Prompting 전용 system 프롬프트
+    system_prompt = {"role": "system", "content": SYSTEM_PROMPT}
 
     full_conversation = [system_prompt] + gpt_messages
+    return full_conversation
 
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=full_conversation,
-        temperature=0.7,
-    )
 
-    gpt_response = completion.choices[0].message.content.strip()
+# ✅ Role Prompting 전용 챗봇 함수
+async def generate_response(messages_from_client: list):
+    """
+    사용자가 보낸 메시지를 Role Prompting 전용 챗봇으로 전달하여 응답을 생성합니다.
+    """
+    full_conversation = build_conversation(messages_from_client)
+
+    gpt_response = (await llm_client.generate_response(
+        full_conversation,
+        model_name=MODEL_NAME,
+        temperature=TEMPERATURE,
+        route=ROUTE,
+        prompt_version=PROMPT_VERSION,
+    )).strip()
 
     return {
         "success": True,
@@ -1,19 +1,16 @@
 import os
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 import time
-from openai import OpenAI # OpenAI 라이브러리 임포트
 
-
-# ---- 1. API 키 설정 ----
-load_dotenv()
-
-# ---- API 키를 환경 변수에서 가져옵니다. ----
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# API 클라이언트 초기화
-client = OpenAI(api_key=openai_api_key)
+# ---- 1. LLM 클라이언트 ----
+# OpenAI 호출은 app/core/llm_client.py의 공유 비동기 클라이언트(커넥션 풀)를 사용합니다.
+from app.core import llm_client
+from app.core.settings import get_settings
+from app.business_logic import quiz_pregrader
 
 app = FastAPI()
 
@@ -31,25 +28,15 @@ app.add_middleware(
 )
 
 
-# ---- 5. GPT 채점 함수 ----
-async def evaluate_prompt(messages_from_client: list):
-    """
-    유저가 보낸 Role Prompting 프롬프트를 GPT로 평가하여
-    'True' 또는 'False' 중 하나를 반환.
-    """
-    gpt_messages = []
+# ---- 2. 모델 설정 ----
+ROUTE = "quiz"
+PROMPT_VERSION = "1"
+MODEL_NAME = "gpt-4o"
+TEMPERATURE = 0 # 답변 일관성을 위해 0으로 고정
 
-    # GPT 메시지 포맷으로 변환
-    for msg in messages_from_client:
-        if msg.get("type") == "user":
-            gpt_messages.append({"role": "user", "content": msg.get("text", "")})
-        elif msg.get("type") == "bot":
-            gpt_messages.append({"role": "assistant", "content": msg.get("text", "")})
 
-    # GPT에게 주는 시스템 프롬프트
-    system_prompt = {
-        "role": "system",
-        "content": """
+# ---- 3. 채점 대화 구성 ----
+SYSTEM_PROMPT = """
 당신은 프롬프팅 학습 플랫폼의 채점자입니다.
 사용자가 Role Prompting 프롬프트를 작성했습니다.
 
@@ -62,34 +49,154 @@ async def evaluate_prompt(messages_from_client: list):
 - "당신은 취업 준비생이다. 면접관에게 인공지능의 장단점을 설명하라." → True
 - "인공지능의 장단점을 설명해줘." → False
         """
-    }
+
+
+def build_conversation(messages_from_client: list):
+    """
+    유저가 보낸 Role Prompting 프롬프트를 채점용 system 프롬프트가 포함된
+    GPT 대화 목록으로 변환합니다. (일반 채점과 스트리밍 채점이 함께 사용합니다.)
+    """
+    gpt_messages = []
+
+    # GPT 메시지 포맷으로 변환
+    for msg in messages_from_client:
+        if msg.get("type") == "user":
+            gpt_messages.append({"role": "user", "content": msg.get("text", "")})
+        elif msg.get("type") == "bot":
+            gpt_messages.append({"role": "assistant", "content": msg.get("text", "")})
+
+    # GPT에게 주는 시스템 프롬프트
+    system_prompt = {"role": "system", "content": SYSTEM_PROMPT}
 
     # 전체 대화 구성
     full_conversation = [system_prompt] + gpt_messages
+    return full_conversation
 
-    # GPT 호출
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=full_conversation,
-        temperature=0  # 답변 일관성을 위해 0으로 고정
+
+# ---- 4. 채점 결과 정리 ----
+def normalize_grade(raw_response: str) -> str:
+    """
+    GPT 응답을 'True' 또는 'False' 문자열로 정리합니다. (True/False 외의 다른 답변 방지)
+    """
+    is_valid = raw_response.strip().lower() == "true"
+    return "True" if is_valid else "False"
+
+
+# ---- 5. GPT 채점 함수 ----
+async def _grade_with_llm(messages_from_client: list) -> str:
+    """GPT로 채점합니다. 답은 'True'/'False' 한 단어이므로 토큰 하나만 생성하게 합니다."""
+    full_conversation = build_conversation(messages_from_client)
+
+    raw_response = await llm_client.generate_response(
+        full_conversation,
+        model_name=MODEL_NAME,
+        temperature=TEMPERATURE,
+        route=ROUTE,
+        prompt_version=PROMPT_VERSION,
+        max_tokens=1
+    )
+    return normalize_grade(raw_response)
+
+
+# 감사(audit)용 백그라운드 채점 태스크 (완료 전 GC 방지)
+_audit_tasks: set = set()
+
+
+async def _audit_local_grade(messages_from_client: list, submission: str, pregrade_result: dict) -> None:
+    """로컬에서 판정한 제출물을 LLM으로도 채점하여 일치 여부를 기록합니다. (판정 규칙 점검용)"""
+    try:
+        llm_grade = await _grade_with_llm(messages_from_client)
+        await asyncio.to_thread(quiz_pregrader.log_decision, submission, pregrade_result, llm_grade, "audit")
+    except Exception as e:
+        print(f"Quiz pre-grader audit failed: {e}")
+
+
+async def evaluate_prompt(messages_from_client: list):
+    """
+    유저가 보낸 Role Prompting 프롬프트를 평가하여
+    'True' 또는 'False' 중 하나를 반환.
+
+    역할도 상황도 없는 단순 지시문은 로컬 1차 채점기(quiz_pregrader)가 False로 판정하여 GPT를 호출하지 않고,
+    나머지(합격 후보 포함)는 GPT로 넘깁니다. QUIZ_PREGRADER_LOG_PATH를 지정하면 판정을 JSONL로 기록합니다.
+    """
+    settings = get_settings()
+    submission = next(
+        (msg.get("text", "") for msg in reversed(messages_from_client) if msg.get("type") == "user"), ""
     )
 
-    # GPT 결과 텍스트
-    raw_response = completion.choices[0].message.content.strip()
+    pregrade_result = None
+    if settings.QUIZ_PREGRADER_ENABLED and submission.strip():
+        pregrade_result = quiz_pregrader.pregrade(submission)
+        if pregrade_result["decision"] is not None:
+            await asyncio.to_thread(quiz_pregrader.log_decision, submission, pregrade_result, None, "local")
+            # 기록을 남길 때는 일부를 GPT로도 채점하여 로컬 판정과 얼마나 일치하는지 기록합니다.
+            if settings.QUIZ_PREGRADER_LOG_PATH and random.random() < settings.QUIZ_PREGRADER_AUDIT_RATE:
+                task = asyncio.create_task(_audit_local_grade(messages_from_client, submission, pregrade_result))
+                _audit_tasks.add(task)
+                task.add_done_callback(_audit_tasks.discard)
+            return {
+                "success": True,
+                "data": {
+                    "text": pregrade_result["decision"]
+                }
+            }
 
-    # 문자열 정리 — True/False 외의 다른 답변 방지
-    is_valid = raw_response.lower() == "true"
+    # GPT 호출
+    grade = await _grade_with_llm(messages_from_client)
+    if pregrade_result is not None:
+        await asyncio.to_thread(quiz_pregrader.log_decision, submission, pregrade_result, grade, "llm")
 
     # 결과 반환
     return {
         "success": True,
         "data": {
-            "text": "True" if is_valid else "False"
+            "text": grade
         }
     }
 
 
-# ---- 6. API 엔드포인트 ----
+# ---- 6. 일괄 채점 함수 ----
+def normalize_submission(text: str) -> str:
+    """공백/줄바꿈 차이만 있는 제출물을 같은 것으로 보도록 정규화합니다."""
+    return " ".join(str(text).split())
+
+
+async def evaluate_prompts_batch(submissions: List[str], max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    여러 제출물을 한 번에 채점합니다.
+
+    - 정규화한 내용이 같은 제출물은 한 번만 채점합니다.
+    - 나머지는 max_concurrency개까지 동시에 채점합니다. (단건 채점과 같은 프롬프트/응답 캐시 사용)
+    - 결과는 입력 순서대로, 항목별 성공/실패를 담아 반환합니다.
+
+    Output:
+        [{"index", "success": True, "text": "True"/"False"} 또는 {"index", "success": False, "error"}]
+    """
+    max_concurrency = max_concurrency or get_settings().QUIZ_BATCH_MAX_CONCURRENCY
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    normalized = [normalize_submission(text) for text in submissions]
+    unique_texts = [text for text in dict.fromkeys(normalized) if text]
+
+    async def grade_one(text: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await evaluate_prompt([{"type": "user", "text": text}])
+                return {"success": True, "text": result["data"]["text"]}
+            except Exception as e:
+                print(f"❌ Error while grading submission: {e}")
+                return {"success": False, "error": "채점 중 오류가 발생했습니다."}
+
+    graded = dict(zip(unique_texts, await asyncio.gather(*(grade_one(text) for text in unique_texts))))
+
+    results = []
+    for index, text in enumerate(normalized):
+        outcome = graded.get(text) or {"success": False, "error": "빈 제출물입니다."}
+        results.append({"index": index, **outcome})
+    return results
+
+
+# ---- 7. API 엔드포인트 ----
 @app.post("/api/evaluate/role-prompting")
 async def evaluate_role_prompting(request: Request):
     """
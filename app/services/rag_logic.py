@@ -1,19 +1,11 @@
 import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 import time
-from openai import OpenAI # OpenAI 라이브러리 임포트
 
-
-# ---- 1. API 키 설정 ----
-load_dotenv()
-
-# ---- API 키를 환경 변수에서 가져옵니다. ----
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# API 클라이언트 초기화
-client = OpenAI(api_key=openai_api_key)
+# ---- 1. LLM 클라이언트 ----
+# OpenAI 호출은 app/core/llm_client.py의 공유 비동기 클라이언트(커넥션 풀)를 사용합니다.
+from app.core import llm_client
 
 app = FastAPI()
 
@@ -31,8 +23,26 @@ app.add_middleware(
 )
 
 
-async def generate_response(messages_from_client: list):
-    
+# ---- 2. 모델 설정 ----
+ROUTE = "rag_logic"
+PROMPT_VERSION = "1"
+MODEL_NAME = "gpt-4o"
+TEMPERATURE = None # API 기본값 사용
+
+
+OFF_TOPIC_REDIRECT = "우리 RAG에 대한 얘기를 해볼까요?"
+SYSTEM_PROMPT = f"""당신은 'RAG 기법(Retrieval-Augmented Generation)'에 대해 가르쳐주는 친절한 AI입니다.
+                        사용자는 생성형 AI를 처음 사용해 보는 초보 사용자입니다.
+                        사용자가 "RAG"과 관련된 질문을 하면, 이해할 수 있게 쉽고 재미있게 설명해주세요.
+
+                        **주제 이탈 시:** RAG에 관련 없는 질문은 **최대한 간결하게** 답변하고, "{OFF_TOPIC_REDIRECT}"라고 마무리합니다."""
+
+
+def build_conversation(messages_from_client: list):
+    """
+    클라이언트 메시지를 system 프롬프트가 포함된 GPT 대화 목록으로 변환합니다.
+    (일반 응답과 스트리밍 응답이 함께 사용합니다.)
+    """
     gpt_messages = []
     for msg in messages_from_client:
         # GPT API 호출에 맞게 메시지 포맷을 변환합니다.
@@ -41,24 +51,22 @@ async def generate_response(messages_from_client: list):
         elif msg['type'] == 'bot':
             gpt_messages.append({"role": "assistant", "content": msg['text']})
     
-    system_prompt = {
-            "role": "system",
-            "content": """당신은 'RAG 기법(Retrieval-Augmented Generation)'에 대해 가르쳐주는 친절한 AI입니다.
-                        사용자는 생성형 AI를 처음 사용해 보는 초보 사용자입니다.
-                        사용자가 "RAG"과 관련된 질문을 하면, 이해할 수 있게 쉽고 재미있게 설명해주세요.
-
-                        **주제 이탈 시:** RAG에 관련 없는 질문은 **최대한 간결하게** 답변하고, "우리 RAG에 대한 얘기를 해볼까요?"라고 마무리합니다."""
-        }
+    system_prompt = {"role": "system", "content": SYSTEM_PROMPT}
     
     full_conversation = [system_prompt] + gpt_messages
+    return full_conversation
 
 
-    completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=full_conversation
-        )
+async def generate_response(messages_from_client: list):
+    full_conversation = build_conversation(messages_from_client)
 
-    gpt_response_text = completion.choices[0].message.content
+    gpt_response_text = await llm_client.generate_response(
+            full_conversation,
+            model_name=MODEL_NAME,
+            temperature=TEMPERATURE,
+            route=ROUTE,
+            prompt_version=PROMPT_VERSION
+        )
 
     return {
             "success": True,
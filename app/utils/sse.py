@@ -0,0 +1,78 @@
+# app/utils/sse.py
+
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Optional
+
+# 프록시/브라우저가 이벤트를 모아서 보내지 않도록 버퍼링을 끄는 헤더입니다.
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+def format_sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """
+    하나의 server-sent event 문자열을 만듭니다.
+
+    예시:
+        event: token
+        data: {"text": "안녕"}
+    """
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n"
+
+async def stream_chat_events(
+    token_stream: AsyncIterator[str],
+    finalize: Optional[Callable[[str], str]] = None,
+    emit_tokens: bool = True,
+    on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+    build_payload: Optional[Callable[[str], Dict[str, Any]]] = None
+) -> AsyncIterator[str]:
+    """
+    LLM 토큰 스트림을 SSE 이벤트 스트림으로 변환합니다.
+
+    - 'token' 이벤트: 도착한 토큰 조각 ({"text": "..."})
+    - 'done' 이벤트: 최종 결과. 짝이 되는 일반(비스트리밍) 엔드포인트의 응답과 같은 형식이어야 하므로
+      build_payload로 만듭니다. (지정하지 않으면 {"success": True, "data": {"text": 최종 텍스트}})
+    - 'error' 이벤트: 스트리밍 도중 오류가 발생한 경우
+
+    Input:
+        token_stream: llm_client.stream_response 등이 반환하는 토큰 스트림.
+        finalize: 최종 텍스트를 후처리하는 함수 (예: quiz의 True/False 정리).
+        emit_tokens: False이면 토큰 이벤트 없이 최종 결과만 보냅니다.
+        on_complete: 스트림이 정상 종료되면 최종 텍스트로 호출할 콜백 (예: 캐시 저장).
+        build_payload: 최종 텍스트로 'done' 이벤트 payload를 만드는 함수.
+    """
+    collected_tokens = []
+
+    try:
+        async for token in token_stream:
+            collected_tokens.append(token)
+            if emit_tokens:
+                yield format_sse_event("token", {"text": token})
+
+        final_text = "".join(collected_tokens)
+        if finalize is not None:
+            final_text = finalize(final_text)
+
+        if build_payload is not None:
+            payload = build_payload(final_text)
+        else:
+            payload = {
+                "success": True,
+                "data": {
+                    "text": final_text
+                }
+            }
+        yield format_sse_event("done", payload)
+
+        if on_complete is not None:
+            await on_complete(final_text)
+
+    except Exception as e:
+        # 응답 헤더가 이미 전송된 뒤이므로 HTTP 상태 코드 대신 error 이벤트로 알립니다.
+        print(f"SSE 스트리밍 중 오류 발생: {e}")
+        yield format_sse_event("error", {
+            "success": False,
+            "error": "응답 생성 중 오류가 발생했습니다."
+        })
@@ -11,6 +11,7 @@ from openai import OpenAI
 from getpass import getpass
 
 from app.core.settings import get_settings
+from app.core import llm_client
 
 
 app = FastAPI(
@@ -34,8 +35,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# RAG 라우터(/api/chat/rag)를 먼저 등록해야 chat_router의 /api/chat/{ingredient_name}에 가로채이지 않습니다.
+app.include_router(chat.router, prefix="/api/chat", tags=["rag_chat"])
 app.include_router(chat_router, prefix="/api")
-# app.include_router(chat.router, prefix="/api/chat", tags=["rag_chat"])
+
+# ✅ 종료 시 공유 LLM 커넥션 풀 정리
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_client.close_openai_client()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,9 @@
+# tests/conftest.py
+
+import os
+import sys
+from pathlib import Path
+
+# 저장소 루트에서 app 패키지를 불러오고, 설정 로드에 필요한 값만 채웁니다. (API는 호출하지 않음)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,67 @@
+# tests/test_quiz_pregrader.py
+
+import json
+
+import pytest
+
+from app.business_logic import quiz_pregrader
+
+# -----------------------------------------------------------------------------
+# 1. 채점 기준(quiz.SYSTEM_PROMPT)의 예시
+# -----------------------------------------------------------------------------
+
+def test_rubric_true_example_goes_to_llm():
+    # 합격은 로컬에서 판정하지 않습니다.
+    result = quiz_pregrader.pregrade("당신은 취업 준비생이다. 면접관에게 인공지능의 장단점을 설명하라.")
+    assert result["features"] == {"role": True, "situation": True, "objective": True}
+    assert result["decision"] is None
+
+
+def test_rubric_false_example_is_decided_locally():
+    assert quiz_pregrader.pregrade("인공지능의 장단점을 설명해줘.")["decision"] == "False"
+
+# -----------------------------------------------------------------------------
+# 2. 단순 지시문 / 역할 프롬프트
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("text", [
+    "파이썬 알려줘",
+    "시 한편 써줘",
+    "집에서 할 수 있는 운동 알려줘",
+    "hello",
+    "고양이",
+])
+def test_plain_instructions_are_false(text):
+    assert quiz_pregrader.pregrade(text)["decision"] == "False"
+
+
+@pytest.mark.parametrize("text", [
+    "너는 영어 선생님이야. 현재완료를 설명해줘.",
+    "면접관 역할을 맡아서 질문을 만들어 주세요.",
+    "초등학생에게 광합성을 설명해줘.",
+    "You are a travel agent. Plan a trip for a family of four.",
+    "Act as a code reviewer and list the bugs in this function.",
+])
+def test_prompts_with_role_or_situation_go_to_llm(text):
+    assert quiz_pregrader.pregrade(text)["decision"] is None
+
+# -----------------------------------------------------------------------------
+# 3. 판정 기록 집계
+# -----------------------------------------------------------------------------
+
+def test_summarize_log_groups_by_features(tmp_path):
+    log_path = tmp_path / "quiz_pregrader.jsonl"
+    plain = quiz_pregrader.pregrade("파이썬 알려줘")
+    role = quiz_pregrader.pregrade("당신은 취업 준비생이다. 면접관에게 인공지능의 장단점을 설명하라.")
+    records = [
+        {"source": "local", **plain, "llm": None},
+        {"source": "audit", **plain, "llm": "False"},
+        {"source": "llm", **role, "llm": "True"},
+    ]
+    log_path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+
+    rows = {(row["role"], row["situation"], row["objective"]): row for row in quiz_pregrader.summarize_log(str(log_path))}
+    assert rows[(False, False, True)]["local"] == 1
+    assert rows[(False, False, True)]["audited"] == 1
+    assert rows[(False, False, True)]["agreed"] == 1
+    assert rows[(True, True, True)]["llm_true"] == 1